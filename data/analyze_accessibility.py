@@ -5,10 +5,28 @@ Takes extracted course descriptions and keywords.json to produce accessibility s
 """
 
 import json
+import os
 import re
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 from datetime import datetime
-from collections import defaultdict
+
+from keyword_matcher import KeywordMatcher, normalize_text
+from score_statistics import ScoreStatistics
+from scoring import MATCH_WORD, KeywordScorer, compile_scorer
+
+SILVER_FILE = "silver_data.json"  # Country names for the countryCode of each event
+
+# Base score for each mobility type
+BASE_SCORES = {
+    'racing_chair': 35,
+    'day_chair': 40,
+    'frame_runner': 40,
+    'off_road_chair': 50,
+    'handbike': 50,
+    'walking_frame': 50,
+    'crutches': 50,
+    'walking_stick': 50
+}
 
 
 def load_keywords(filepath: str = "keywords.json") -> Dict:
@@ -17,20 +35,46 @@ def load_keywords(filepath: str = "keywords.json") -> Dict:
         return json.load(f)
 
 
-def normalize_text(text: str) -> str:
-    """Normalize text for keyword matching."""
-    # Convert to lowercase
-    text = text.lower()
-    # Replace common variations
-    text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
-    return text
+def load_country_names(silver_file: Optional[str] = SILVER_FILE) -> Dict[int, str]:
+    """Country name of each bronze countryCode, from silver_file (empty if missing)."""
+    if not silver_file or not os.path.exists(silver_file):
+        return {}
+    with open(silver_file, 'r', encoding='utf-8') as f:
+        return {
+            e['countryCode']: e['country'] for e in json.load(f).get('events', [])
+            if e.get('countryCode') is not None and e.get('country')
+        }
+
 
+def country_label(event: Dict, country_names: Dict[int, str]) -> Optional[str]:
+    """An event's country name, 'Country <code>' if the code has no known name, or None."""
+    if event.get('country'):
+        return event['country']
+    code = event.get('countryCode')
+    if code is None:
+        return None
+    return country_names.get(code, f"Country {code}")
 
-def find_keyword_matches(description: str, keywords_config: Dict) -> List[Dict]:
+
+def find_keyword_matches(description: str, keywords_config: Union[Dict, KeywordMatcher]) -> List[Dict]:
     """
     Find all keyword matches in a description.
     
     Returns list of matches with their impacts for each mobility type.
+    Pass a KeywordMatcher built once from the config when matching many
+    descriptions (a config dict is compiled on every call).
+    """
+    if not isinstance(keywords_config, KeywordMatcher):
+        keywords_config = KeywordMatcher(keywords_config)
+    return keywords_config.find(description)
+
+
+def find_keyword_matches_legacy(description: str, keywords_config: Dict) -> List[Dict]:
+    """
+    Find all keyword matches in a description with one regex per keyword.
+    
+    Reference implementation for benchmark_keywords.py; same output as
+    find_keyword_matches.
     
     Structure of keywords_config:
     {
@@ -79,7 +123,11 @@ def find_keyword_matches(description: str, keywords_config: Dict) -> List[Dict]:
     return matches
 
 
-def calculate_scores(matches: List[Dict], mobility_types: List[str]) -> Dict[str, Dict]:
+def calculate_scores(
+    matches: List[Dict],
+    mobility_types: List[str],
+    base_scores: Dict[str, float] = BASE_SCORES
+) -> Dict[str, Dict]:
     """
     Calculate accessibility scores for all mobility types.
     
@@ -93,18 +141,6 @@ def calculate_scores(matches: List[Dict], mobility_types: List[str]) -> Dict[str
     Impossible course: 0/100
     """
     
-    # Define base scores for each mobility type
-    base_scores = {
-        'racing_chair': 35,
-        'day_chair': 40,
-        'frame_runner': 40,
-        'off_road_chair': 50,
-        'handbike': 50,
-        'walking_frame': 50,
-        'crutches': 50,
-        'walking_stick': 50
-    }
-    
     scores = {}
     
     for mobility_type in mobility_types:
@@ -136,6 +172,44 @@ def calculate_scores(matches: List[Dict], mobility_types: List[str]) -> Dict[str
     return scores
 
 
+def calculate_scores_batch(
+    matched_per_event: List[List[int]],
+    mobility_types: List[str],
+    scorer: KeywordScorer,
+    base_scores: Dict[str, float] = BASE_SCORES,
+    detailed: bool = True
+) -> List[Dict[str, Dict]]:
+    """
+    Calculate scores for many events at once (see scoring.py).
+
+    matched_per_event holds each event's scorer.find() result. Same scores
+    as calculate_scores for the equivalent matches; with detailed=False the
+    per-keyword 'impacts' lists are left empty.
+    """
+    batch = scorer.score(matched_per_event, base_scores)
+    columns = [scorer.mobility_types.index(mt) for mt in mobility_types]
+    final = batch.final[:, columns].tolist()
+    keyword_counts = batch.keyword_counts[:, columns].tolist()
+
+    results = []
+    for event in range(len(batch)):
+        scores = {}
+        for j, mobility_type in enumerate(mobility_types):
+            applied = []
+            if detailed:
+                applied = [
+                    {'keyword': entry.keyword, 'category': entry.category, 'impact': impact}
+                    for entry, impact in batch.breakdown(event, mobility_type)
+                ]
+            scores[mobility_type] = {
+                'score': round(final[event][j], 1),
+                'keyword_count': keyword_counts[event][j],
+                'impacts': applied
+            }
+        results.append(scores)
+    return results
+
+
 def categorize_score(score: float) -> str:
     """Categorize score into accessibility levels."""
     if score >= 80:
@@ -153,10 +227,14 @@ def categorize_score(score: float) -> str:
 def analyze_all_events(
     input_file: str = "parkrun_descriptions_extracted.json",
     keywords_file: str = "keywords.json",
-    output_file: str = "parkrun_accessibility_scores.json"
+    output_file: str = "parkrun_accessibility_scores.json",
+    silver_file: Optional[str] = SILVER_FILE
 ):
     """
     Analyze accessibility for all parkrun events.
+    
+    Extracted events only carry the numeric countryCode; the per-country
+    statistics are labelled with the country names from silver_file.
     """
     
     print("Parkrun Accessibility Analysis")
@@ -171,14 +249,9 @@ def analyze_all_events(
     for mt in mobility_types:
         print(f"   - {mt}")
     
-    # Count total keywords
-    total_keywords = 0
-    for category_name, category_data in keywords_config.items():
-        if category_name != 'metadata':
-            for subcategory_name, subcategory_data in category_data.items():
-                keywords = subcategory_data.get('keywords', [])
-                total_keywords += len(keywords)
-    print(f"   Total keywords: {total_keywords}")
+    # Compile all keywords into one matcher and scorer
+    scorer = compile_scorer(keywords_config, MATCH_WORD)
+    print(f"   Total keywords: {len(scorer)}")
     
     # Load parkrun data
     print(f"\nLoading parkrun data from {input_file}...")
@@ -189,21 +262,24 @@ def analyze_all_events(
     metadata = parkrun_data['metadata']
     print(f"   Found {len(events)} parkrun events")
     
+    country_names = load_country_names(silver_file)
+    if country_names:
+        print(f"   Country names for {len(country_names)} country codes from {silver_file}")
+    
     # Statistics
     stats = {
         'total_events': len(events),
         'analyzed': 0,
         'no_description': 0,
         'keyword_matches_total': 0,
-        'avg_keywords_per_event': 0,
-        'score_distribution': {mt: defaultdict(int) for mt in mobility_types},
-        'best_courses': {mt: [] for mt in mobility_types},
-        'worst_courses': {mt: [] for mt in mobility_types}
+        'avg_keywords_per_event': 0
     }
+    summary = ScoreStatistics(mobility_types, categorize_score)
     
-    # Analyze each event
-    # Process each event
+    # Find keyword matches in each event
     print("\nAnalyzing accessibility...")
+    analyzed_events = []
+    matched_per_event = []
     for i, event in enumerate(events, 1):
         if i % 250 == 0:
             print(f"   Progress: {i}/{len(events)}")
@@ -219,37 +295,32 @@ def analyze_all_events(
             continue
         
         # Find keyword matches
-        matches = find_keyword_matches(description, keywords_config)
-        stats['keyword_matches_total'] += len(matches)
-        
-        # Calculate scores for all mobility types
-        scores = calculate_scores(matches, mobility_types)
-        
+        matched = scorer.find(description)
+        stats['keyword_matches_total'] += len(matched)
+        analyzed_events.append(event)
+        matched_per_event.append(matched)
+    
+    # Calculate scores for all events and mobility types at once
+    all_scores = calculate_scores_batch(matched_per_event, mobility_types, scorer)
+    
+    for event, matched, scores in zip(analyzed_events, matched_per_event, all_scores):
         # Add to event
         event['accessibility'] = {
             'analyzed': True,
             'scores': {mt: scores[mt]['score'] for mt in mobility_types},
             'categories': {mt: categorize_score(scores[mt]['score']) for mt in mobility_types},
-            'keyword_matches': len(matches),
+            'keyword_matches': len(matched),
             'detailed_scores': scores
         }
         
         stats['analyzed'] += 1
         
-        # Update score distribution
-        for mt in mobility_types:
-            category = categorize_score(scores[mt]['score'])
-            stats['score_distribution'][mt][category] += 1
-            
-            # Track best/worst courses
-            stats['best_courses'][mt].append({
-                'name': event['name'],
-                'score': scores[mt]['score']
-            })
-            stats['worst_courses'][mt].append({
-                'name': event['name'],
-                'score': scores[mt]['score']
-            })
+        # Update score distribution, best/worst courses and quantiles
+        summary.add(
+            event['name'],
+            country_label(event, country_names),
+            event['accessibility']['scores']
+        )
     
     # Calculate averages
     if stats['analyzed'] > 0:
@@ -257,18 +328,7 @@ def analyze_all_events(
             stats['keyword_matches_total'] / stats['analyzed'], 1
         )
     
-    # Get top/bottom courses for each mobility type
-    for mt in mobility_types:
-        stats['best_courses'][mt] = sorted(
-            stats['best_courses'][mt],
-            key=lambda x: x['score'],
-            reverse=True
-        )[:5]
-        
-        stats['worst_courses'][mt] = sorted(
-            stats['worst_courses'][mt],
-            key=lambda x: x['score']
-        )[:5]
+    stats.update(summary.to_dict())
     
     # Save results
     print(f"\nSaving results to {output_file}...")
@@ -304,21 +364,33 @@ def analyze_all_events(
     
     for mt in mobility_types:
         print(f"\n{mt.replace('_', ' ').title()}:")
-        dist = stats['score_distribution'][mt]
-        print(f"  Excellent (80-100):      {dist['excellent']}")
-        print(f"  Good (60-79):            {dist['good']}")
-        print(f"  Moderate (40-59):        {dist['moderate']}")
-        print(f"  Challenging (20-39):     {dist['challenging']}")
-        print(f"  Very Challenging (0-19): {dist['very_challenging']}")
+        dist = summary.distribution[mt]
+        print(f"  Excellent (80-100):      {dist.get('excellent', 0)}")
+        print(f"  Good (60-79):            {dist.get('good', 0)}")
+        print(f"  Moderate (40-59):        {dist.get('moderate', 0)}")
+        print(f"  Challenging (20-39):     {dist.get('challenging', 0)}")
+        print(f"  Very Challenging (0-19): {dist.get('very_challenging', 0)}")
+        quantiles = summary.quantiles(mt)
+        print(f"  Quantiles:               p10 {quantiles['p10']}, p50 {quantiles['p50']}, p90 {quantiles['p90']}")
         
-        print(f"\n  Top 5 courses:")
-        for i, course in enumerate(stats['best_courses'][mt], 1):
+        print(f"\n  Top {summary.k} courses:")
+        for i, course in enumerate(summary.best(mt), 1):
             print(f"    {i}. {course['name']}: {course['score']}/100")
         
-        print(f"\n  Bottom 5 courses:")
-        for i, course in enumerate(stats['worst_courses'][mt], 1):
+        print(f"\n  Bottom {summary.k} courses:")
+        for i, course in enumerate(summary.worst(mt), 1):
             print(f"    {i}. {course['name']}: {course['score']}/100")
     
+    print("\n" + "=" * 60)
+    print("MEDIAN SCORE BY COUNTRY")
+    print("=" * 60)
+    print(f"{'Country':<16} {'Events':>6}  " + " ".join(f"{mt[:8]:>8}" for mt in mobility_types))
+    for country, country_stats in summary.country_quantiles().items():
+        medians = " ".join(f"{str(country_stats[mt]['p50']):>8}" for mt in mobility_types)
+        print(f"{country[:16]:<16} {country_stats['events']:>6}  {medians}")
+    
+    print(f"\nScoring: {scorer.timings.describe()}")
+    
     print("\n" + "=" * 60)
     print("Analysis complete!")
     print("=" * 60)
@@ -0,0 +1,256 @@
+"""
+Vectorized accessibility scoring for many events at once.
+
+The scorers in analyze_accessibility.py and recalculate_scores.py walk
+8 mobility types x matched keywords in Python for every event. Here the
+keyword config becomes a dense keyword x mobility-type impact matrix, the
+matches of all events become a sparse event x keyword incidence matrix
+(CSR arrays), and every score is computed at once:
+
+    final = clip(base + incidence @ impacts, 0, 100)
+
+Per-keyword breakdowns (which keywords moved which score) are only built
+for the events and mobility types that ask for them.
+
+Usage:
+    impacts = ImpactMatrix(keywords_config, mobility_types)
+    incidence = Incidence.from_rows([[impacts.index_of(k, c, s) for k, c, s in event_matches], ...])
+    scores = score_batch(incidence, impacts, base_scores)
+    scores.final[i, j]; scores.breakdown(i, 'racing_chair')
+
+    python batch_scoring.py --events 100000        # time a synthetic corpus, check parity
+"""
+
+import argparse
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_BASE_SCORE = 50
+MIN_SCORE = 0
+MAX_SCORE = 100
+
+
+class KeywordEntry(NamedTuple):
+    """One keyword of keywords.json (the same word can be listed in two subcategories)."""
+    keyword: str
+    category: str
+    subcategory: str
+
+
+class ImpactMatrix:
+    """Dense keyword x mobility-type impact matrix of a keywords.json config."""
+
+    def __init__(self, keywords_config: Dict, mobility_types: Optional[Sequence[str]] = None):
+        if mobility_types is None:
+            mobility_types = list(keywords_config['metadata']['mobility_types'])
+        self.mobility_types = list(mobility_types)
+        self.entries: List[KeywordEntry] = []
+        rows = []
+        for category_name, category_data in keywords_config.items():
+            if category_name == 'metadata' or not isinstance(category_data, dict):
+                continue
+            for subcategory_name, subcategory_data in category_data.items():
+                if not isinstance(subcategory_data, dict):
+                    continue
+                impacts = subcategory_data.get('impact', {})
+                for keyword in subcategory_data.get('keywords', []):
+                    self.entries.append(KeywordEntry(keyword, category_name, subcategory_name))
+                    rows.append([impacts.get(mt, 0) for mt in self.mobility_types])
+
+        values = [value for row in rows for value in row]
+        # Integer impacts stay integers, so scores come out exactly as the loops computed them
+        dtype = np.int64 if all(isinstance(v, int) for v in values) else np.float64
+        self.matrix = np.array(rows, dtype=dtype).reshape(len(rows), len(self.mobility_types))
+        self.rows = self.matrix.tolist()  # Python numbers, for building breakdowns
+        self._index = {}
+        for i, entry in enumerate(self.entries):
+            self._index.setdefault(entry, i)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def index_of(self, keyword: str, category: str, subcategory: str) -> int:
+        """Row of a keyword entry (KeyError if it isn't in the config)."""
+        return self._index[(keyword, category, subcategory)]
+
+    def base_vector(self, base_scores: Dict[str, float]) -> np.ndarray:
+        """Starting score per mobility type, DEFAULT_BASE_SCORE where base_scores has none."""
+        values = [base_scores.get(mt, DEFAULT_BASE_SCORE) for mt in self.mobility_types]
+        dtype = self.matrix.dtype if all(isinstance(v, int) for v in values) else np.float64
+        return np.array(values, dtype=dtype)
+
+
+class Incidence:
+    """Sparse event x keyword matrix in CSR form; each row keeps its matches in the order found."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[int]]) -> 'Incidence':
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter((i for row in rows for i in row), dtype=np.int64, count=int(indptr[-1]))
+        return cls(indptr, indices)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def row(self, event: int) -> np.ndarray:
+        return self.indices[self.indptr[event]:self.indptr[event + 1]]
+
+    def row_ids(self) -> np.ndarray:
+        """Event index of every stored match."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.indptr))
+
+
+class BatchScores:
+    """Scores of every event x mobility type, with breakdowns on demand."""
+
+    def __init__(self, incidence: Incidence, impacts: ImpactMatrix, base: np.ndarray,
+                 adjustment: np.ndarray, final: np.ndarray, keyword_counts: np.ndarray):
+        self.incidence = incidence
+        self.impacts = impacts
+        self.mobility_types = impacts.mobility_types
+        self.base = base                      # (mobility types,)
+        self.adjustment = adjustment          # (events, mobility types): sum of keyword impacts
+        self.final = final                    # (events, mobility types): clipped base + adjustment
+        self.keyword_counts = keyword_counts  # (events, mobility types): keywords with a non-zero impact
+
+    def __len__(self) -> int:
+        return len(self.final)
+
+    def breakdown(self, event: int, mobility_type: str) -> List[Tuple[KeywordEntry, float]]:
+        """(keyword entry, impact) of every match with a non-zero impact, in match order."""
+        column = self.mobility_types.index(mobility_type)
+        entries, rows = self.impacts.entries, self.impacts.rows
+        applied = []
+        for entry in self.incidence.row(event).tolist():
+            impact = rows[entry][column]
+            if impact != 0:
+                applied.append((entries[entry], impact))
+        return applied
+
+    def scores(self, event: int) -> Dict[str, float]:
+        """Final score per mobility type of one event (Python numbers)."""
+        return dict(zip(self.mobility_types, self.final[event].tolist()))
+
+
+def _row_sums(values: np.ndarray, indptr: np.ndarray, n_columns: int) -> np.ndarray:
+    """Sum of values[indptr[i]:indptr[i + 1]] for every row i (zeros for empty rows)."""
+    # A trailing zero row keeps every start index in range, so no row is cut short
+    padded = np.zeros((len(values) + 1, n_columns), dtype=values.dtype)
+    padded[:len(values)] = values
+    sums = np.add.reduceat(padded, indptr[:-1], axis=0)
+    # reduceat gives values[indptr[i]] for an empty row, so those are zeroed afterwards
+    sums[indptr[1:] == indptr[:-1]] = 0
+    return sums
+
+
+def score_batch(incidence: Incidence, impacts: ImpactMatrix, base_scores: Dict[str, float],
+                min_score: float = MIN_SCORE, max_score: float = MAX_SCORE) -> BatchScores:
+    """
+    Score every event of the incidence matrix for every mobility type.
+
+    Returns:
+        BatchScores with adjustment = incidence @ impacts and
+        final = clip(base + adjustment, min_score, max_score)
+    """
+    base = impacts.base_vector(base_scores)
+    n_types = len(impacts.mobility_types)
+    matched = impacts.matrix[incidence.indices]  # (matches, mobility types)
+
+    # Sparse x dense product: the impact rows of each event's matches, summed per event
+    dtype = np.result_type(impacts.matrix.dtype, base.dtype)
+    adjustment = _row_sums(matched.astype(dtype, copy=False), incidence.indptr, n_types)
+    keyword_counts = _row_sums((matched != 0).astype(np.int64), incidence.indptr, n_types)
+
+    final = np.clip(base + adjustment, min_score, max_score)
+    return BatchScores(incidence, impacts, base, adjustment, final, keyword_counts)
+
+
+def synthetic_incidence(n_events: int, n_keywords: int, mean_matches: float = 12,
+                        seed: int = 0) -> Incidence:
+    """Random incidence matrix for benchmarks (distinct keywords per event)."""
+    rng = np.random.default_rng(seed)
+    counts = np.minimum(rng.poisson(mean_matches, n_events), n_keywords)
+    rows = [rng.choice(n_keywords, size=count, replace=False) for count in counts]
+    indptr = np.zeros(n_events + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    indices = np.concatenate(rows).astype(np.int64) if rows else np.zeros(0, dtype=np.int64)
+    return Incidence(indptr, indices)
+
+
+def parity_rows(n_events: int, n_keywords: int, seed: int = 1) -> List[List[int]]:
+    """Random rows for the parity check, with empty rows first, in the middle and last."""
+    rng = np.random.default_rng(seed)
+    rows = [rng.choice(n_keywords, size=min(rng.poisson(3), n_keywords), replace=False).tolist()
+            for _ in range(n_events)]
+    for event in (0, n_events // 2, n_events - 2, n_events - 1):
+        if 0 <= event < n_events:
+            rows[event] = []
+    return rows
+
+
+def check_parity(impacts: ImpactMatrix, rows: List[List[int]]) -> int:
+    """Events whose batch scores differ from analyze_accessibility.calculate_scores."""
+    from analyze_accessibility import BASE_SCORES, calculate_scores
+
+    batch = score_batch(Incidence.from_rows(rows), impacts, BASE_SCORES)
+    mismatches = 0
+    for event, row in enumerate(rows):
+        matches = [
+            {
+                'keyword': impacts.entries[i].keyword,
+                'category': impacts.entries[i].category,
+                'impacts': dict(zip(impacts.mobility_types, impacts.rows[i]))
+            }
+            for i in row
+        ]
+        expected = calculate_scores(matches, impacts.mobility_types)
+        for column, mobility_type in enumerate(impacts.mobility_types):
+            if (batch.final[event, column] != expected[mobility_type]['score']
+                    or batch.keyword_counts[event, column] != expected[mobility_type]['keyword_count']):
+                mismatches += 1
+                break
+    return mismatches
+
+
+def main():
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description="Time batch scoring of a synthetic corpus")
+    parser.add_argument('--keywords', default='keywords.json', help="Keywords configuration")
+    parser.add_argument('--events', type=int, default=100000, help="Synthetic events to score")
+    parser.add_argument('--matches', type=float, default=12, help="Mean keyword matches per event")
+    parser.add_argument('--parity', type=int, default=2000, help="Events checked against calculate_scores")
+    args = parser.parse_args()
+
+    with open(args.keywords, 'r', encoding='utf-8') as f:
+        impacts = ImpactMatrix(json.load(f))
+    incidence = synthetic_incidence(args.events, len(impacts), args.matches)
+    print(f"📊 {args.events} events x {len(impacts)} keywords ({len(incidence.indices)} matches) "
+          f"x {len(impacts.mobility_types)} mobility types")
+
+    start = time.perf_counter()
+    scores = score_batch(incidence, impacts, {})
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  Scored in {elapsed * 1000:.1f} ms "
+          f"({args.events / elapsed if elapsed > 0 else float('inf'):,.0f} events/s)")
+    print(f"   Mean final score: {scores.final.mean():.1f}")
+
+    mismatches = check_parity(impacts, parity_rows(args.parity, len(impacts)))
+    if mismatches:
+        print(f"❌ {mismatches}/{args.parity} events score differently from calculate_scores")
+    else:
+        print(f"✅ Identical to calculate_scores on {args.parity} events (empty rows included)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Parity check and benchmark for the compiled boilerplate stripper.
+
+Runs clean_description (one scan of the compiled boilerplate matcher) and
+clean_description_legacy (one str.replace per phrase) over every description
+in a parkrun_detail.json, checks that the cleaned text is identical and
+reports the time of each.
+
+Usage:
+    python benchmark_boilerplate.py                                   # parkrun_detail.json
+    python benchmark_boilerplate.py --input other_detail.json --repeat 5
+    python benchmark_boilerplate.py --boilerplate generated_boilerplate.txt
+
+Exit code is 1 if any description differs.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from clean_data import clean_description, clean_description_legacy, compile_boilerplate, load_boilerplate
+from compare_parsers import first_difference
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled and phrase-by-phrase boilerplate strippers")
+    parser.add_argument('--input', default='parkrun_detail.json', help="Detail JSON with raw descriptions")
+    parser.add_argument('--boilerplate', default='boilerplate.txt', help="Boilerplate file")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed passes over the corpus (best is reported)")
+    parser.add_argument('--show', type=int, default=3, help="Print up to N mismatching descriptions")
+    args = parser.parse_args()
+
+    print("🧹 Boilerplate Stripper Benchmark")
+    print("=" * 60)
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        events = json.load(f).get('events', [])
+    descriptions = [event['description'] for event in events if event.get('description')]
+    if not descriptions:
+        print(f"❌ No descriptions in {args.input} - run scrape_parkrun_details.py first")
+        sys.exit(1)
+
+    boilerplate = load_boilerplate(args.boilerplate)
+    start = time.perf_counter()
+    stripper = compile_boilerplate(boilerplate)
+    compile_time = time.perf_counter() - start
+
+    total_chars = sum(len(d) for d in descriptions)
+    print(f"📄 Corpus: {len(descriptions)} descriptions, {total_chars / 1024 / 1024:.1f} MB")
+    print(f"📖 {len(boilerplate)} boilerplate phrases, compiled in {compile_time * 1000:.1f} ms\n")
+
+    implementations = [
+        ('legacy', lambda d: clean_description_legacy(d, boilerplate)),
+        ('compiled', lambda d: clean_description(d, stripper)),
+    ]
+    outputs = {}
+    timings = {}
+    for name, clean in implementations:
+        best = float('inf')
+        for _ in range(max(args.repeat, 1)):
+            start = time.perf_counter()
+            cleaned = [clean(d) for d in descriptions]
+            best = min(best, time.perf_counter() - start)
+        outputs[name] = cleaned
+        timings[name] = best
+
+    mismatches = [i for i, (a, b) in enumerate(zip(outputs['legacy'], outputs['compiled'])) if a != b]
+    if mismatches:
+        print(f"❌ {len(mismatches)}/{len(descriptions)} descriptions differ from the legacy stripper")
+        for i in mismatches[:args.show]:
+            legacy, compiled = first_difference(outputs['legacy'][i], outputs['compiled'][i])
+            print(f"   legacy:   ...{legacy!r}...")
+            print(f"   compiled: ...{compiled!r}...")
+    else:
+        print(f"✅ Identical output on all {len(descriptions)} descriptions")
+
+    removed = total_chars - sum(len(d) for d in outputs['legacy'])
+    print(f"✂️  {removed / max(total_chars, 1) * 100:.1f}% of the text is boilerplate or whitespace\n")
+
+    print("=" * 60)
+    for name, _ in implementations:
+        elapsed = timings[name]
+        rate = len(descriptions) / elapsed if elapsed > 0 else float('inf')
+        speedup = timings['legacy'] / elapsed if elapsed > 0 else float('inf')
+        print(f"{name:<10} {rate:>10.1f} descriptions/s  {elapsed:>7.3f}s  {speedup:>5.2f}x")
+    print("=" * 60)
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
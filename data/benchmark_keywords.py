@@ -0,0 +1,94 @@
+"""
+Parity check and benchmark for the compiled keyword matcher.
+
+Runs find_keyword_matches (one scan of a KeywordMatcher compiled from
+keywords.json) and find_keyword_matches_legacy (one '\\bkeyword\\b' regex per
+keyword) over every description in the analysis input, checks that the
+matches are identical and reports the time of each.
+
+Usage:
+    python benchmark_keywords.py                                   # parkrun_descriptions_extracted.json
+    python benchmark_keywords.py --input parkrun_detail_clean.json --repeat 5
+    python benchmark_keywords.py --keywords ../backend/keywords.json
+
+Exit code is 1 if any description's matches differ.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from analyze_accessibility import find_keyword_matches, find_keyword_matches_legacy, load_keywords
+from keyword_matcher import KeywordMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled and per-keyword keyword matchers")
+    parser.add_argument('--input', default='parkrun_descriptions_extracted.json', help="JSON with event descriptions")
+    parser.add_argument('--keywords', default='keywords.json', help="Keywords configuration")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed passes over the corpus (best is reported)")
+    parser.add_argument('--show', type=int, default=3, help="Print up to N mismatching descriptions")
+    args = parser.parse_args()
+
+    print("🔑 Keyword Matcher Benchmark")
+    print("=" * 60)
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        events = json.load(f).get('events', [])
+    descriptions = [event['description'] for event in events if event.get('description')]
+    if not descriptions:
+        print(f"❌ No descriptions in {args.input}")
+        sys.exit(1)
+
+    keywords_config = load_keywords(args.keywords)
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords_config)
+    compile_time = time.perf_counter() - start
+
+    total_chars = sum(len(d) for d in descriptions)
+    print(f"📄 Corpus: {len(descriptions)} descriptions, {total_chars / 1024 / 1024:.1f} MB")
+    print(f"📖 {len(matcher)} keywords, compiled in {compile_time * 1000:.1f} ms\n")
+
+    implementations = [
+        ('legacy', lambda d: find_keyword_matches_legacy(d, keywords_config)),
+        ('compiled', lambda d: find_keyword_matches(d, matcher)),
+    ]
+    outputs = {}
+    timings = {}
+    for name, find in implementations:
+        best = float('inf')
+        for _ in range(max(args.repeat, 1)):
+            start = time.perf_counter()
+            found = [find(d) for d in descriptions]
+            best = min(best, time.perf_counter() - start)
+        outputs[name] = found
+        timings[name] = best
+
+    mismatches = [i for i, (a, b) in enumerate(zip(outputs['legacy'], outputs['compiled'])) if a != b]
+    if mismatches:
+        print(f"❌ {len(mismatches)}/{len(descriptions)} descriptions match differently from the legacy matcher")
+        for i in mismatches[:args.show]:
+            legacy = [m['keyword'] for m in outputs['legacy'][i]]
+            compiled = [m['keyword'] for m in outputs['compiled'][i]]
+            print(f"   legacy:   {legacy}")
+            print(f"   compiled: {compiled}")
+    else:
+        print(f"✅ Identical matches on all {len(descriptions)} descriptions")
+
+    total_matches = sum(len(m) for m in outputs['legacy'])
+    print(f"🔍 {total_matches} keyword matches ({total_matches / len(descriptions):.1f} per description)\n")
+
+    print("=" * 60)
+    for name, _ in implementations:
+        elapsed = timings[name]
+        rate = len(descriptions) / elapsed if elapsed > 0 else float('inf')
+        speedup = timings['legacy'] / elapsed if elapsed > 0 else float('inf')
+        print(f"{name:<10} {rate:>10.1f} descriptions/s  {elapsed:>7.3f}s  {speedup:>5.2f}x")
+    print("=" * 60)
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Scraper throughput benchmark against the local mock parkrun server.
+
+Starts mock_parkrun_server.py in a separate process (one port per parkrun
+host), points the events at it and runs the real scraping code:
+- details: scrape_parkrun_details.create_detail_json (sequential or --parse-workers)
+- silver:  SilverProcessor.process_events_batch (sequential or --concurrent)
+
+Reports pages/s, p50/p99 fetch latency (measured by the mock servers) and
+CPU time per page of the scraper (including parser worker processes).
+Nothing is sent to parkrun.org and no output files are written: the
+scrapers run inside a temporary directory, so files they create as a side
+effect (e.g. process_to_silver.py's silver_processing.log) are thrown away.
+
+Usage:
+    python benchmark_scrapers.py                                    # 200 synthetic events, 10 hosts
+    python benchmark_scrapers.py --target details --parse-workers 4 --parser lxml
+    python benchmark_scrapers.py --target silver --concurrent --latency-ms 80 --jitter-ms 40
+    python benchmark_scrapers.py --events silver_data.json --limit 500 --html-dir pages/
+    python benchmark_scrapers.py --events silver_data.json --archive course_pages.archive
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import requests
+
+from host_scheduler import group_by_host, host_key
+from mock_parkrun_server import DEFAULT_PORT
+from rate_control import RateController
+
+MOCK_SERVER = Path(__file__).with_name('mock_parkrun_server.py')
+
+
+def synthetic_events(count: int, hosts: int) -> List[Dict]:
+    """Bronze/silver-like events spread round-robin over hosts."""
+    events = []
+    for i in range(count):
+        slug = f"mockpark{i:05d}"
+        events.append({
+            'uid': 100 + i,
+            'name': f"Mock Park {i} parkrun",
+            'slug': slug,
+            'shortName': f"Mock Park {i}",
+            'location': "Mock Park",
+            'coordinates': [-1.5, 53.8],
+            'country': "United Kingdom",
+            'countryCode': 97,
+            'baseUrl': f"www.mock-host-{i % hosts}.example",
+            'junior': False,
+            'coursePageUrl': f"https://www.mock-host-{i % hosts}.example/{slug}/course",
+        })
+    return events
+
+
+def point_events_at_mock(events: List[Dict], port: int) -> Tuple[List[Dict], int]:
+    """
+    Rewrite baseUrl/coursePageUrl so every original host maps to its own mock port.
+
+    Returns:
+        Tuple of (rewritten events, number of hosts)
+    """
+    groups = group_by_host(events, lambda e: host_key(e.get('baseUrl') or e.get('coursePageUrl') or ''))
+    rewritten = []
+    for host_index, indices in enumerate(groups.values()):
+        base_url = f"http://127.0.0.1:{port + host_index}"
+        for index in indices:
+            event = dict(events[index])
+            event['baseUrl'] = base_url
+            event['coursePageUrl'] = f"{base_url}/{event['slug']}/course"
+            rewritten.append(event)
+    rewritten.sort(key=lambda e: e['uid'])
+    return rewritten, len(groups)
+
+
+def start_mock(hosts: int, args) -> subprocess.Popen:
+    """Start the mock servers in their own process and wait until they listen."""
+    command = [sys.executable, str(MOCK_SERVER), '--hosts', str(hosts), '--port', str(args.port),
+               '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+               '--throttle-rate', str(args.throttle_rate), '--error-rate', str(args.error_rate),
+               '--retry-after', str(args.retry_after)]
+    if args.html_dir:
+        command += ['--html-dir', args.html_dir]
+    elif args.archive:
+        command += ['--archive', args.archive]
+    elif args.cache:
+        command += ['--cache', args.cache]
+    else:
+        command += ['--synthetic']
+
+    mock = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=MOCK_SERVER.parent)
+    for line in mock.stdout:
+        print(f"   {line.rstrip()}")
+        if line.strip() == 'ready':
+            return mock
+    raise RuntimeError("Mock parkrun server failed to start")
+
+
+def collect_mock_stats(hosts: int, port: int) -> Dict:
+    """Merge the request logs of every mock host."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    for index in range(hosts):
+        stats = requests.get(f"http://127.0.0.1:{port + index}/__stats", timeout=10).json()
+        latencies.extend(stats['latencies'])
+        for status, count in stats['statuses'].items():
+            statuses[status] = statuses.get(status, 0) + count
+    return {'latencies': sorted(latencies), 'statuses': statuses}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def cpu_seconds() -> float:
+    """CPU time of this process plus its finished child processes (parser workers)."""
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def run_details(events: List[Dict], args, rate_controller: RateController) -> int:
+    """Run the detail scraper; returns the number of successfully scraped pages."""
+    from scrape_parkrun_details import create_detail_json
+
+    result = create_detail_json({'events': events}, parse_workers=args.parse_workers, parser=args.parser,
+                                rate_controller=rate_controller)
+    return result['metadata']['scraping_summary']['successful_scrapes']
+
+
+def run_silver(events: List[Dict], args, rate_controller: RateController) -> int:
+    """Run the silver processor with scraping; returns the number of completed events."""
+    from process_to_silver import SilverProcessor
+
+    processor = SilverProcessor()
+    processor.rate_limit_delay = args.delay
+    processor.rate_controller = rate_controller
+    processor.parser = args.parser
+    processed = processor.process_events_batch(events, len(events), enable_scraping=True,
+                                               concurrent=args.concurrent, max_hosts=args.max_hosts)
+    return sum(1 for event in processed if event['scrapingStatus'] == 'completed')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against a local mock parkrun server")
+    parser.add_argument('--target', choices=['details', 'silver'], default='details', help="Scraper to run")
+    parser.add_argument('--events', help="silver_data.json / bronze_data.json to take events from (default: synthetic)")
+    parser.add_argument('--count', type=int, default=200, help="Number of synthetic events")
+    parser.add_argument('--hosts', type=int, default=10, help="Number of synthetic hosts")
+    parser.add_argument('--limit', type=int, default=None, help="Only use the first N events from --events")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="First mock server port")
+    parser.add_argument('--cache', help="Serve pages recorded in this response cache")
+    parser.add_argument('--html-dir', help="Serve *.html files from this directory")
+    parser.add_argument('--archive', help="Serve the pages of this page archive")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Mock server latency")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Extra random mock server latency")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 5xx responses")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help="Minimum delay between requests to one host (the real runs use 1.0s / 2.5s)")
+    parser.add_argument('--parse-workers', type=int, default=0, help="details: parser processes (pipelined mode)")
+    parser.add_argument('--concurrent', action='store_true', help="silver: scrape hosts in parallel")
+    parser.add_argument('--max-hosts', type=int, default=None, help="silver: max hosts scraped at once")
+    parser.add_argument('--parser', default='html.parser', help="HTML parser backend")
+    parser.add_argument('--verbose', action='store_true', help="Show the scrapers' own output")
+    args = parser.parse_args()
+    # The scrapers run in a temporary directory; input paths stay relative to here
+    for name in ('events', 'cache', 'html_dir', 'archive'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    print("🧪 Scraper Benchmark (mock parkrun server)")
+    print("=" * 60)
+
+    if args.events:
+        with open(args.events, 'r', encoding='utf-8') as f:
+            events = json.load(f)['events'][:args.limit]
+    else:
+        events = synthetic_events(args.count, args.hosts)
+
+    events, hosts = point_events_at_mock(events, args.port)
+    mode = f"{args.parse_workers} parse workers" if args.parse_workers else ("concurrent" if args.concurrent else "sequential")
+    print(f"📄 {len(events)} events over {hosts} hosts, target={args.target} ({mode}, parser={args.parser}, delay={args.delay}s)")
+
+    mock = start_mock(hosts, args)
+    workdir = tempfile.mkdtemp(prefix='benchmark_scrapers_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        if not args.verbose:
+            logging.disable(logging.INFO)
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+        rate_controller = RateController(min_delay=args.delay)
+        cpu_start = cpu_seconds()
+        wall_start = time.perf_counter()
+        with output:
+            run = run_details if args.target == 'details' else run_silver
+            pages = run(events, args, rate_controller)
+        wall = time.perf_counter() - wall_start
+        cpu = cpu_seconds() - cpu_start
+
+        stats = collect_mock_stats(hosts, args.port)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)  # A log file may still be open
+        mock.terminate()
+        mock.wait()
+
+    latencies = stats['latencies']
+    statuses = ', '.join(f"{status}: {count}" for status, count in sorted(stats['statuses'].items()))
+
+    print("\n" + "=" * 60)
+    print("⏱️  RESULTS")
+    print("=" * 60)
+    print(f"Pages scraped:      {pages}/{len(events)}")
+    print(f"Wall time:          {wall:.2f}s")
+    print(f"Throughput:         {pages / wall if wall > 0 else 0:.1f} pages/s")
+    print(f"Fetch latency p50:  {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"Fetch latency p99:  {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"CPU per page:       {cpu / max(pages, 1) * 1000:.1f} ms ({cpu:.2f}s total)")
+    print(f"Server responses:   {statuses or 'none'}")
+    print(f"Rate control:       {rate_controller.describe()}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
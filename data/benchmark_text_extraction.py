@@ -0,0 +1,140 @@
+"""
+Parity check and benchmark for the single-pass course page text extractors.
+
+Parses every page of a saved HTML corpus once, then runs the single-pass
+extractors and their originals on the same soup:
+- extract_text_content vs extract_text_content_legacy (description)
+- find_postcode_in_section vs find_postcode_in_section_legacy (UK postcode,
+  text index lookups vs repeated get_text() calls)
+checks that the results are identical and reports the time of each.
+Before that, the per-country postcode matchers are run over
+POSTCODE_SAMPLES (addresses that must match, dates and prose that must not).
+
+Usage:
+    python benchmark_text_extraction.py                       # pages from http_cache.sqlite
+    python benchmark_text_extraction.py --html-dir pages/     # saved *.html files
+    python benchmark_text_extraction.py --archive course_pages.archive
+    python benchmark_text_extraction.py --parser lxml --limit 200
+
+Exit code is 1 if any page differs or any postcode sample fails.
+"""
+
+import argparse
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from compare_parsers import first_difference, load_corpus
+from course_page import (
+    DEFAULT_PARSER,
+    PARSER_BACKENDS,
+    extract_text_content,
+    extract_text_content_legacy,
+    find_postcode_in_section,
+    find_postcode_in_section_legacy,
+    postcode_matcher,
+)
+from http_cache import DEFAULT_CACHE_FILE
+
+# (bronze countryCode, text, expected postcode or None)
+POSTCODE_SAMPLES = [
+    (23, "8000 Aarhus C", "8000"),
+    (23, "DK-2100 København Ø", "2100"),
+    (23, "Parkvej 12, 8000 Aarhus C", "8000"),
+    (23, "Adresse: 2000 Frederiksberg", "2000"),
+    (23, "2019 The course starts by the lake", None),
+    (23, "Løbet startede i 2018 Ved søen", None),
+    (85, "Rondebosch, Cape Town, 7700", "7700"),
+    (85, "Sandton, Gauteng 2196", "2196"),
+    (85, "Postal code: 2001", "2001"),
+    (85, "First run on May 5, 2012 with 100 runners", None),
+    (85, "Started in Durban, 2011.", None),
+    (85, "Every Saturday, 2015 onwards", None),
+    (85, "Distance: 5,000m", None),
+]
+
+
+def check_postcode_samples() -> bool:
+    """Run every postcode sample; print and return whether they all pass."""
+    failures = [
+        (country_code, text, expected, postcode_matcher(country_code).search(text))
+        for country_code, text, expected in POSTCODE_SAMPLES
+    ]
+    failures = [failure for failure in failures if failure[2] != failure[3]]
+    for country_code, text, expected, actual in failures:
+        print(f"❌ postcode sample (country {country_code}) {text!r}: expected {expected!r}, got {actual!r}")
+    if not failures:
+        print(f"✅ postcode samples: all {len(POSTCODE_SAMPLES)} pass")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-pass and legacy course page extractors")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE, help="Response cache to read pages from")
+    parser.add_argument('--html-dir', help="Read *.html files from this directory instead of the cache")
+    parser.add_argument('--archive', help="Read pages from this page archive instead of the cache")
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help="HTML parser backend")
+    parser.add_argument('--limit', type=int, default=None, help="Only use the first N pages")
+    parser.add_argument('--show', type=int, default=3, help="Print up to N mismatching pages")
+    args = parser.parse_args()
+
+    print("🔬 Text Extraction Benchmark")
+    print("=" * 60)
+
+    samples_pass = check_postcode_samples()
+    corpus = load_corpus(args)
+
+    if not corpus:
+        print("❌ No pages found - run a scraper first (pages are kept in the response cache)")
+        sys.exit(1)
+
+    total_bytes = sum(len(content) for _, content in corpus)
+    print(f"📄 Corpus: {len(corpus)} pages, {total_bytes / 1024 / 1024:.1f} MB ({args.parser})\n")
+
+    # Parse once so only the text extraction itself is timed
+    soups = [BeautifulSoup(content, args.parser) for _, content in corpus]
+
+    all_identical = samples_pass
+    timings = []
+
+    for field, legacy_func, single_pass_func in [
+        ('description', extract_text_content_legacy, extract_text_content),
+        ('postcode', find_postcode_in_section_legacy, find_postcode_in_section),
+    ]:
+        start = time.perf_counter()
+        legacy = [legacy_func(soup) for soup in soups]
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single_pass = [single_pass_func(soup) for soup in soups]
+        single_pass_time = time.perf_counter() - start
+        timings.append((field, legacy_time, single_pass_time))
+
+        mismatches = [i for i, (old, new) in enumerate(zip(legacy, single_pass)) if old != new]
+        if mismatches:
+            all_identical = False
+            print(f"❌ {field}: {len(mismatches)}/{len(corpus)} pages differ from the legacy extractor")
+            for i in mismatches[:args.show]:
+                expected, actual = first_difference(legacy[i], single_pass[i])
+                print(f"   {corpus[i][0]}")
+                print(f"     legacy:      ...{expected!r}...")
+                print(f"     single-pass: ...{actual!r}...")
+        else:
+            print(f"✅ {field}: identical on all {len(corpus)} pages")
+
+    print("\n" + "=" * 60)
+    print("⏱️  EXTRACTION TIME (soup already parsed)")
+    print("=" * 60)
+    for field, legacy_time, single_pass_time in timings:
+        for name, elapsed in [('legacy', legacy_time), ('single-pass', single_pass_time)]:
+            rate = len(corpus) / elapsed if elapsed > 0 else float('inf')
+            speedup = legacy_time / elapsed if elapsed > 0 else float('inf')
+            print(f"{field:<12} {name:<12} {rate:8.1f} pages/s   {elapsed:7.2f}s   {speedup:5.2f}x")
+    print("=" * 60)
+
+    sys.exit(0 if all_identical else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Run per-event CPU work in chunks across a process pool.
+
+clean_data.py and extract_descriptions.py process a few thousand
+descriptions with pure string operations. With --workers N the events are
+split into contiguous chunks, each chunk is processed by a worker process,
+and the results are reassembled in chunk order. The output is therefore
+identical to a single-process run. Each chunk returns its own statistics
+dict; merge_stats() adds them up.
+
+Usage:
+    chunks = split_chunks(events, workers)
+    results = map_chunks(process_chunk, chunks, workers, args=(boilerplate,))
+    stats = merge_stats(chunk_stats for _, chunk_stats in results)
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CHUNKS_PER_WORKER = 4      # More chunks than workers, so a slow chunk doesn't hold up the rest
+PROGRESS_INTERVAL = 2.0    # Seconds between progress lines
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def split_chunks(items: Sequence, workers: int, chunks_per_worker: int = CHUNKS_PER_WORKER) -> List[Sequence]:
+    """
+    Contiguous chunks of items (in order), about chunks_per_worker per worker.
+
+    No items give one empty chunk, so the chunk function still returns its
+    (zero) statistics.
+    """
+    if not items:
+        return [items]
+    size = math.ceil(len(items) / max(1, workers * chunks_per_worker))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+class Progress:
+    """Prints 'label: done/total' at most every interval seconds (and at the end)."""
+
+    def __init__(self, total: int, label: str = "Progress", interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.done = 0
+        self._last = time.perf_counter()
+
+    def update(self, count: int = 1):
+        self.done += count
+        now = time.perf_counter()
+        if self.done >= self.total or now - self._last >= self.interval:
+            self._last = now
+            print(f"   {self.label}: {self.done}/{self.total} ({self.done / max(self.total, 1) * 100:.0f}%)")
+
+
+def map_chunks(func: Callable, chunks: Sequence[Sequence], workers: int, args: Tuple = (),
+               progress: Optional[Progress] = None) -> List:
+    """
+    func(chunk, *args) for every chunk, in a pool of worker processes.
+
+    func must be a module-level function (it is pickled to the workers).
+
+    Returns:
+        The results in chunk order, whatever order the workers finish in
+    """
+    results: List = [None] * len(chunks)
+    if workers <= 1:
+        for i, chunk in enumerate(chunks):
+            results[i] = func(chunk, *args)
+            if progress is not None:
+                progress.update(len(chunk))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(func, chunk, *args): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if progress is not None:
+                progress.update(len(chunks[i]))
+    return results
+
+
+def merge_stats(parts: Iterable[Dict]) -> Dict:
+    """Sum per-chunk statistics dicts key by key (nested dicts are merged the same way)."""
+    total: Dict = {}
+    for part in parts:
+        for key, value in part.items():
+            if isinstance(value, dict):
+                total[key] = merge_stats([total.get(key, {}), value])
+            else:
+                total[key] = total.get(key, 0) + value
+    return total
@@ -4,25 +4,45 @@ Clean parkrun descriptions by removing boilerplate text and fixing postcodes.
 This script:
 1. Removes all boilerplate text from descriptions
 2. Fixes incorrect postcodes (TW9 1AE = parkrun HQ) using reverse geocoding
+   (offline postcode centroids if available, Nominatim for the rest)
 3. Cleans up whitespace and formatting
 """
 
+import argparse
 import json
+import os
 import re
 import time
-import requests
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Union
+
+from http_client import HttpClient
+from chunked_pool import Progress, default_workers, map_chunks, merge_stats, split_chunks
+from geocode_cache import DEFAULT_GEOCODE_CACHE_FILE, GeocodeCache
+from offline_geocoder import DEFAULT_CENTROIDS_FILE, event_coordinates, load_geocoder
+from trie_regex import trie_pattern
+
+# Phrases mined from the corpus by mine_boilerplate.py, used after boilerplate.txt if present
+GENERATED_BOILERPLATE_FILE = "generated_boilerplate.txt"
 
 # Parkrun HQ postcode (to be replaced)
 PARKRUN_HQ_POSTCODE = "TW9 1AE"
 
-def load_boilerplate(filepath: str = "boilerplate.txt") -> list[str]:
-    """Load boilerplate phrases from file."""
+# Shared keep-alive client for Nominatim (retries, backoff and circuit breaking)
+NOMINATIM_CLIENT = HttpClient(
+    headers={'User-Agent': 'WheelchairRacer-Parkrun-Accessibility/1.0'},
+    min_delay=1.0  # Nominatim allows 1 request per second, retries included
+)
+
+def load_boilerplate(filepath: str = "boilerplate.txt", variations: bool = True) -> list[str]:
+    """Load boilerplate phrases from file (plus common variations unless variations=False)."""
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
     
     # Split by double newlines to get sections
     sections = [s.strip() for s in content.split('\n\n') if s.strip()]
+    if not variations:
+        return sections
     
     # Also add common variations
     boilerplate = sections + [
@@ -36,14 +56,140 @@ def load_boilerplate(filepath: str = "boilerplate.txt") -> list[str]:
     return boilerplate
 
 
-def clean_description(description: str, boilerplate: list[str]) -> str:
+def overlapping_phrases(phrases: list[str]) -> Dict[str, set]:
+    """
+    For each phrase, the phrases whose occurrences can overlap one of its
+    occurrences in a text: either contains the other, or a proper suffix of
+    one is a prefix of the other.
+    """
+    by_prefix: Dict[str, list[str]] = {}
+    for phrase in phrases:
+        for end in range(1, len(phrase)):
+            by_prefix.setdefault(phrase[:end], []).append(phrase)
+
+    overlaps = {phrase: {other for other in phrases if other in phrase or phrase in other} for phrase in phrases}
+    for phrase in phrases:
+        for start in range(1, len(phrase)):
+            for other in by_prefix.get(phrase[start:], ()):
+                overlaps[phrase].add(other)
+                overlaps[other].add(phrase)
+    return overlaps
+
+
+class BoilerplateStripper:
+    """
+    All boilerplate phrases compiled into one multi-pattern matcher.
+
+    Gives exactly the result of removing each phrase in turn with
+    str.replace (the original clean_description loop), but only removes the
+    phrases that actually occur. One scan with the phrases compiled into a
+    trie regex (see trie_regex.py) finds them, whatever the number of
+    phrases. Removing a phrase can join the text on either side into a new
+    occurrence of a later phrase; such an occurrence has to span the point
+    where text was cut out, so only a window around each cut is rescanned,
+    and only if the two characters meeting at the cut occur together in
+    some phrase (usually they don't: most cuts join paragraph breaks).
+
+    The scan reports non-overlapping matches, so a phrase hidden inside or
+    overlapping a reported match could be missed; every reported phrase
+    therefore also brings the phrases that can overlap it (precomputed).
+    A candidate that turns out not to occur is simply skipped.
+    """
+
+    def __init__(self, phrases: list[str]):
+        self.phrases = [phrase for phrase in phrases if phrase]
+        unique = set(self.phrases)
+        self._pattern = re.compile(trie_pattern(unique)) if unique else None
+        self._longest = max(map(len, unique), default=0)
+        self._bigrams = {phrase[i:i + 2] for phrase in unique for i in range(len(phrase) - 1)}
+        indices: Dict[str, list[int]] = {}
+        for index, phrase in enumerate(self.phrases):
+            indices.setdefault(phrase, []).append(index)
+        # phrase -> indices of every phrase that may occur wherever it was matched
+        self._candidates: Dict[str, list[int]] = {
+            phrase: [i for other in others for i in indices[other]]
+            for phrase, others in overlapping_phrases(sorted(unique)).items()
+        }
+
+    def candidates(self, text: str, start: int = 0, end: Optional[int] = None) -> set:
+        """Indices of the phrases that may occur in text[start:end]."""
+        found = set()
+        if self._pattern is None:
+            return found
+        for phrase in set(self._pattern.findall(text, start, len(text) if end is None else end)):
+            found.update(self._candidates[phrase])
+        return found
+
+    def _remove(self, text: str, phrase: str) -> tuple[str, list[int]]:
+        """text.replace(phrase, ''), plus the positions in the result where text was cut out."""
+        pieces = text.split(phrase)
+        if len(pieces) == 1:
+            return text, []
+        cuts = []
+        length = 0
+        for piece in pieces[:-1]:
+            length += len(piece)
+            if not cuts or cuts[-1] != length:
+                cuts.append(length)
+        return ''.join(pieces), cuts
+
+    def strip(self, text: str) -> str:
+        """Remove every boilerplate phrase, in the original phrase order."""
+        pending = self.candidates(text)
+        reach = self._longest - 1
+        while pending:
+            index = min(pending)
+            pending.discard(index)
+            text, cuts = self._remove(text, self.phrases[index])
+            # New occurrences span a cut: rescan [cut - reach, cut + reach) windows, merged
+            window_start = window_end = None
+            for cut in cuts:
+                if text[cut - 1:cut + 1] not in self._bigrams:
+                    continue  # No phrase can span this cut (or it is at either end of the text)
+                if window_end is not None and cut - reach <= window_end:
+                    window_end = cut + reach
+                    continue
+                if window_end is not None:
+                    pending.update(i for i in self.candidates(text, window_start, window_end) if i > index)
+                window_start, window_end = max(0, cut - reach), cut + reach
+            if window_end is not None:
+                pending.update(i for i in self.candidates(text, window_start, window_end) if i > index)
+        return text
+
+
+@lru_cache(maxsize=8)
+def _compile_cached(boilerplate: tuple) -> BoilerplateStripper:
+    return BoilerplateStripper(list(boilerplate))
+
+
+def compile_boilerplate(boilerplate: list[str]) -> BoilerplateStripper:
+    """Build (or reuse) the matcher for a boilerplate list."""
+    return _compile_cached(tuple(boilerplate))
+
+
+def clean_description(description: str, boilerplate: Union[list[str], BoilerplateStripper]) -> str:
     """Remove boilerplate text and clean formatting."""
+    if not isinstance(boilerplate, BoilerplateStripper):
+        boilerplate = compile_boilerplate(boilerplate)
+    
+    # Remove every boilerplate phrase (one scan, see BoilerplateStripper)
+    cleaned = boilerplate.strip(description)
+    
+    return _clean_whitespace(cleaned)
+
+
+def clean_description_legacy(description: str, boilerplate: list[str]) -> str:
+    """Original phrase-by-phrase implementation, kept for parity checks."""
     cleaned = description
     
     # Remove each boilerplate phrase
     for phrase in boilerplate:
         cleaned = cleaned.replace(phrase, "")
     
+    return _clean_whitespace(cleaned)
+
+
+def _clean_whitespace(cleaned: str) -> str:
     # Remove excessive whitespace
     cleaned = re.sub(r'\s+', ' ', cleaned)
     
@@ -56,62 +202,74 @@ def clean_description(description: str, boilerplate: list[str]) -> str:
     return cleaned
 
 
-def get_postcode_from_coords(lat: float, lng: float, country: str) -> Optional[str]:
+def nominatim_postcode(lat: float, lng: float) -> Optional[str]:
     """
-    Get postcode from coordinates using reverse geocoding via Nominatim (OpenStreetMap).
+    Reverse geocode one location via Nominatim (OpenStreetMap).
     
     Nominatim works worldwide and is free (with rate limiting).
     Rate limit: 1 request per second
+    
+    Returns:
+        The postcode, or None if Nominatim has none for the location
+    
+    Raises:
+        requests.RequestException: on connection errors and error statuses
+    """
+    url = "https://nominatim.openstreetmap.org/reverse"
+    params = {
+        'lat': lat,
+        'lon': lng,
+        'format': 'json',
+        'addressdetails': 1
+    }
+    
+    response = NOMINATIM_CLIENT.get(url, params=params)
+    
+    # Rate limit for Nominatim (1 request per second)
+    time.sleep(1)
+    
+    response.raise_for_status()
+    address = response.json().get('address', {})
+    
+    # Some countries use postal_code instead of postcode
+    return address.get('postcode') or address.get('postal_code')
+
+
+def get_postcode_from_coords(lat: float, lng: float, country: str,
+                             geocode_cache: Optional[GeocodeCache] = None) -> Optional[str]:
+    """
+    Get postcode from coordinates using reverse geocoding via Nominatim (OpenStreetMap).
+    
+    With a geocode_cache, locations looked up before (or earlier in this run)
+    are answered without a request.
     """
     
     try:
-        url = "https://nominatim.openstreetmap.org/reverse"
-        params = {
-            'lat': lat,
-            'lon': lng,
-            'format': 'json',
-            'addressdetails': 1
-        }
-        headers = {
-            'User-Agent': 'WheelchairRacer-Parkrun-Accessibility/1.0'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            address = data.get('address', {})
-            
-            # Try to get postcode (UK/international format)
-            postcode = address.get('postcode')
-            if postcode:
-                print(f"  ✅ Found postcode: {postcode}")
-                return postcode
-            
-            # Some countries use postal_code instead
-            postcode = address.get('postal_code')
-            if postcode:
-                print(f"  ✅ Found postal_code: {postcode}")
-                return postcode
+        if geocode_cache is not None:
+            postcode = geocode_cache.lookup('nominatim', lat, lng, nominatim_postcode)
         else:
-            print(f"  ⚠️  Nominatim returned status {response.status_code}")
-        
-        # Rate limit for Nominatim (1 request per second)
-        time.sleep(1)
-        
+            postcode = nominatim_postcode(lat, lng)
+        if postcode:
+            print(f"  ✅ Found postcode: {postcode}")
+            return postcode
+    
     except Exception as e:
         print(f"  ⚠️  Nominatim error: {e}")
     
     return None
 
 
-def fix_postcode(event: Dict, force_lookup: bool = False) -> Dict:
+def fix_postcode(event: Dict, force_lookup: bool = False, offline_postcode: Optional[str] = None,
+                 geocode_cache: Optional[GeocodeCache] = None) -> Dict:
     """
     Fix postcode if it's parkrun HQ or missing.
     
     Args:
         event: Parkrun event dictionary
         force_lookup: If True, always do reverse geocoding even if postcode exists
+        offline_postcode: Nearest postcode from the offline geocoder, if it had one
+                          (Nominatim is only asked when it didn't)
+        geocode_cache: Persistent cache of earlier Nominatim answers
     """
     current_postcode = event.get('postcode')
     
@@ -128,9 +286,12 @@ def fix_postcode(event: Dict, force_lookup: bool = False) -> Dict:
         lng = coords.get('lng')
         country = event.get('country', 'UK')
         
-        if lat and lng:
+        if offline_postcode:
+            event['postcode'] = offline_postcode
+            event['postcode_source'] = 'offline_geocoded'
+        elif lat and lng:
             print(f"  🔍 Looking up postcode for {event['name']}...")
-            new_postcode = get_postcode_from_coords(lat, lng, country)
+            new_postcode = get_postcode_from_coords(lat, lng, country, geocode_cache)
             
             if new_postcode:
                 event['postcode'] = new_postcode
@@ -144,11 +305,38 @@ def fix_postcode(event: Dict, force_lookup: bool = False) -> Dict:
     return event
 
 
+def clean_descriptions_chunk(events: list[Dict], boilerplate: list[str]) -> tuple[list[Dict], Dict]:
+    """
+    Strip boilerplate from the descriptions of a chunk of events.
+    
+    Module-level so it can run in a worker process (see chunked_pool.py);
+    the matcher is compiled once per process.
+    
+    Returns:
+        (events, stats for the chunk)
+    """
+    stats = {'cleaned_descriptions': 0, 'removed_chars': 0}
+    for event in events:
+        if event.get('description'):
+            original_length = len(event['description'])
+            event['description'] = clean_description(event['description'], boilerplate)
+            reduction = original_length - len(event['description'])
+            
+            if reduction > 0:
+                stats['cleaned_descriptions'] += 1
+                stats['removed_chars'] += reduction
+    return events, stats
+
+
 def clean_parkrun_data(
     input_file: str = "parkrun_detail.json",
     output_file: str = "parkrun_detail_clean.json",
     boilerplate_file: str = "boilerplate.txt",
-    fix_postcodes: bool = True
+    fix_postcodes: bool = True,
+    generated_boilerplate_file: Optional[str] = GENERATED_BOILERPLATE_FILE,
+    centroids_file: Optional[str] = DEFAULT_CENTROIDS_FILE,
+    geocode_cache_file: Optional[str] = DEFAULT_GEOCODE_CACHE_FILE,
+    workers: int = 1
 ):
     """
     Main cleaning function.
@@ -158,6 +346,15 @@ def clean_parkrun_data(
         output_file: Path to save cleaned data
         boilerplate_file: Path to boilerplate text file
         fix_postcodes: Whether to fix incorrect/missing postcodes
+        generated_boilerplate_file: Mined boilerplate (see mine_boilerplate.py),
+                                    removed after the hand-written phrases; skipped if missing
+        centroids_file: Postcode centroid file for offline reverse geocoding
+                        (see offline_geocoder.py); Nominatim only for events it can't
+                        answer, or for all of them if the file is missing
+        geocode_cache_file: SQLite cache of Nominatim answers (see geocode_cache.py);
+                            None to always ask Nominatim
+        workers: Worker processes for the description cleaning (output is
+                 identical for any number; postcodes are always fixed in this process)
     """
     
     print("🧹 Parkrun Data Cleaning Script")
@@ -167,6 +364,12 @@ def clean_parkrun_data(
     print(f"\n📖 Loading boilerplate from {boilerplate_file}...")
     boilerplate = load_boilerplate(boilerplate_file)
     print(f"   Found {len(boilerplate)} boilerplate phrases")
+    if generated_boilerplate_file and os.path.exists(generated_boilerplate_file):
+        known = set(boilerplate)
+        generated = [phrase for phrase in load_boilerplate(generated_boilerplate_file, variations=False)
+                     if phrase not in known]
+        boilerplate += generated
+        print(f"   + {len(generated)} mined phrases from {generated_boilerplate_file}")
     
     # Load data
     print(f"\n📂 Loading data from {input_file}...")
@@ -184,29 +387,43 @@ def clean_parkrun_data(
     # Statistics
     stats = {
         'total': len(data),
-        'cleaned_descriptions': 0,
         'fixed_postcodes': 0,
         'missing_postcodes': 0,
-        'parkrun_hq_postcodes': 0
+        'parkrun_hq_postcodes': 0,
+        'offline_postcodes': 0
     }
     
-    # Process each event
-    print("\n🔧 Processing events...")
-    for i, event in enumerate(data, 1):
-        print(f"\n[{i}/{len(data)}] {event['name']}...")
-        
-        # Clean description
-        if event.get('description'):
-            original_length = len(event['description'])
-            event['description'] = clean_description(event['description'], boilerplate)
-            new_length = len(event['description'])
-            
-            if new_length < original_length:
-                stats['cleaned_descriptions'] += 1
-                reduction = original_length - new_length
-                print(f"  ✂️  Removed {reduction} chars of boilerplate")
-        
-        # Fix postcode
+    # Reverse geocode every event that needs a postcode in one offline batch
+    offline_postcodes: Dict[int, str] = {}
+    if fix_postcodes and centroids_file:
+        geocoder = load_geocoder(centroids_file)
+        if geocoder is not None:
+            pending = [(i, event_coordinates(event)) for i, event in enumerate(data)
+                       if event.get('postcode') in (None, '', PARKRUN_HQ_POSTCODE)]
+            pending = [(i, coords) for i, coords in pending if coords is not None]
+            start = time.perf_counter()
+            postcodes = geocoder.nearest_postcodes([coords for _, coords in pending])
+            offline_postcodes = {i: postcode for (i, _), postcode in zip(pending, postcodes) if postcode}
+            print(f"   Offline geocoding: {len(offline_postcodes)}/{len(pending)} postcodes "
+                  f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    
+    geocode_cache = GeocodeCache(geocode_cache_file) if fix_postcodes and geocode_cache_file else None
+    
+    # Clean descriptions (CPU only, so they can be split across processes)
+    print(f"\n🔧 Cleaning descriptions ({workers} worker{'s' if workers != 1 else ''})...")
+    start = time.perf_counter()
+    chunks = split_chunks(data, workers)
+    results = map_chunks(clean_descriptions_chunk, chunks, workers, args=(boilerplate,),
+                         progress=Progress(len(data), "Cleaned"))
+    data = [event for events, _ in results for event in events]
+    stats.update(merge_stats(chunk_stats for _, chunk_stats in results))
+    print(f"   ✂️  Removed {stats.get('removed_chars', 0):,} chars of boilerplate "
+          f"in {time.perf_counter() - start:.2f}s")
+    
+    # Fix postcodes (network bound, rate limited: one event at a time)
+    if fix_postcodes:
+        print("\n📮 Fixing postcodes...")
+    for i, event in enumerate(data):
         if fix_postcodes:
             original_postcode = event.get('postcode')
             
@@ -217,10 +434,13 @@ def clean_parkrun_data(
                 stats['missing_postcodes'] += 1
             
             if original_postcode == PARKRUN_HQ_POSTCODE or not original_postcode:
-                event = fix_postcode(event)
+                event = fix_postcode(event, offline_postcode=offline_postcodes.get(i),
+                                     geocode_cache=geocode_cache)
                 
                 if event.get('postcode') != original_postcode:
                     stats['fixed_postcodes'] += 1
+                    if event.get('postcode_source') == 'offline_geocoded':
+                        stats['offline_postcodes'] += 1
     
     # Save cleaned data (preserve metadata)
     print(f"\n💾 Saving cleaned data to {output_file}...")
@@ -236,20 +456,33 @@ def clean_parkrun_data(
     print("📊 CLEANING SUMMARY")
     print("=" * 50)
     print(f"Total events:              {stats['total']}")
-    print(f"Cleaned descriptions:      {stats['cleaned_descriptions']}")
+    print(f"Cleaned descriptions:      {stats.get('cleaned_descriptions', 0)}")
     print(f"Parkrun HQ postcodes:      {stats['parkrun_hq_postcodes']}")
     print(f"Missing postcodes:         {stats['missing_postcodes']}")
-    print(f"Fixed postcodes:           {stats['fixed_postcodes']}")
+    print(f"Fixed postcodes:           {stats['fixed_postcodes']} ({stats['offline_postcodes']} offline)")
+    if geocode_cache is not None:
+        print(f"Nominatim lookups:         {geocode_cache.describe()}")
+        geocode_cache.close()
     print(f"Remaining unfixed:         {stats['parkrun_hq_postcodes'] + stats['missing_postcodes'] - stats['fixed_postcodes']}")
     print("=" * 50)
     print(f"\n✅ Done! Cleaned data saved to {output_file}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove boilerplate from descriptions and fix postcodes")
+    parser.add_argument('--input', default="parkrun_detail.json", help="Raw scraped detail JSON")
+    parser.add_argument('--output', default="parkrun_detail_clean.json", help="Cleaned detail JSON")
+    parser.add_argument('--boilerplate', default="boilerplate.txt", help="Boilerplate file")
+    parser.add_argument('--no-postcodes', action='store_true', help="Only clean descriptions")
+    parser.add_argument('--workers', type=int, nargs='?', const=default_workers(), default=1,
+                        help="Worker processes for description cleaning (no value: one per CPU)")
+    args = parser.parse_args()
+    
     # Run the cleaning
     clean_parkrun_data(
-        input_file="parkrun_detail.json",
-        output_file="parkrun_detail_clean.json",
-        boilerplate_file="boilerplate.txt",
-        fix_postcodes=True
+        input_file=args.input,
+        output_file=args.output,
+        boilerplate_file=args.boilerplate,
+        fix_postcodes=not args.no_postcodes,
+        workers=args.workers
     )
@@ -0,0 +1,153 @@
+"""
+Parser backend parity check and benchmark for the detail scraper.
+
+Runs the description and postcode extractors over a saved HTML corpus with
+every installed parser backend, checks that each backend gives exactly the
+same output as the reference 'html.parser' path, and reports pages/second.
+
+Usage:
+    python compare_parsers.py                        # pages from http_cache.sqlite
+    python compare_parsers.py --html-dir pages/      # saved *.html files
+    python compare_parsers.py --archive course_pages.archive
+    python compare_parsers.py --limit 200 --show 5
+
+Exit code is 1 if any backend differs from the reference.
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from course_page import DEFAULT_PARSER, available_parsers, extract_page_fields
+from http_cache import DEFAULT_CACHE_FILE
+from page_archive import PageArchive
+
+FIELDS = ['description', 'postcode']
+
+
+def load_corpus_from_cache(path: str, limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+    """Load (url, html) pairs from the scrapers' response cache."""
+    conn = sqlite3.connect(path)
+    query = "SELECT url, content FROM responses WHERE status_code = 200 ORDER BY url"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    corpus = [(url, bytes(content)) for url, content in conn.execute(query)]
+    conn.close()
+    return corpus
+
+
+def load_corpus_from_dir(path: str, limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+    """Load (filename, html) pairs from a directory of saved .html files."""
+    files = sorted(Path(path).glob('*.html'))[:limit]
+    return [(f.name, f.read_bytes()) for f in files]
+
+
+def load_corpus_from_archive(path: str, limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+    """Load (url, html) pairs of the latest page of every slug in a page archive."""
+    archive = PageArchive(path)
+    corpus = list(archive.iter_pages(limit))
+    archive.close()
+    return corpus
+
+
+def load_corpus(args) -> List[Tuple[str, bytes]]:
+    """Corpus selected by the --html-dir / --archive / --cache options."""
+    if args.html_dir:
+        return load_corpus_from_dir(args.html_dir, args.limit)
+    if args.archive:
+        return load_corpus_from_archive(args.archive, args.limit)
+    return load_corpus_from_cache(args.cache, args.limit)
+
+
+def run_backend(corpus: List[Tuple[str, bytes]], parser: str) -> Tuple[List[Dict], float]:
+    """
+    Extract description and postcode from every page with one backend.
+
+    Returns:
+        Tuple of (per-page field dicts, elapsed seconds)
+    """
+    results = []
+    start = time.perf_counter()
+    for url, content in corpus:
+        try:
+            results.append(extract_page_fields(url, content, '', FIELDS, parser))
+        except Exception as e:
+            results.append({'error': str(e)})
+    return results, time.perf_counter() - start
+
+
+def first_difference(a: Optional[str], b: Optional[str], context: int = 60) -> Tuple[str, str]:
+    """Return the snippets of a and b around the first character where they differ."""
+    a, b = a or '', b or ''
+    pos = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+    start = max(0, pos - context)
+    return a[start:pos + context], b[start:pos + context]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends on a saved corpus")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE, help="Response cache to read pages from")
+    parser.add_argument('--html-dir', help="Read *.html files from this directory instead of the cache")
+    parser.add_argument('--archive', help="Read pages from this page archive instead of the cache")
+    parser.add_argument('--limit', type=int, default=None, help="Only use the first N pages")
+    parser.add_argument('--show', type=int, default=3, help="Print up to N mismatching pages per backend")
+    args = parser.parse_args()
+
+    print("🔬 Parser Backend Comparison")
+    print("=" * 60)
+
+    corpus = load_corpus(args)
+
+    if not corpus:
+        print("❌ No pages found - run a scraper first (pages are kept in the response cache)")
+        sys.exit(1)
+
+    total_bytes = sum(len(content) for _, content in corpus)
+    print(f"📄 Corpus: {len(corpus)} pages, {total_bytes / 1024 / 1024:.1f} MB")
+
+    backends = available_parsers()
+    print(f"⚙️  Backends: {', '.join(backends)} (reference: {DEFAULT_PARSER})\n")
+
+    reference, reference_time = run_backend(corpus, DEFAULT_PARSER)
+    timings = {DEFAULT_PARSER: reference_time}
+    all_identical = True
+
+    for backend in backends:
+        if backend == DEFAULT_PARSER:
+            continue
+
+        results, elapsed = run_backend(corpus, backend)
+        timings[backend] = elapsed
+
+        mismatches = [i for i, (ref, res) in enumerate(zip(reference, results)) if ref != res]
+        if mismatches:
+            all_identical = False
+            print(f"❌ {backend}: {len(mismatches)}/{len(corpus)} pages differ from {DEFAULT_PARSER}")
+            for i in mismatches[:args.show]:
+                url = corpus[i][0]
+                for field in FIELDS + ['error']:
+                    if reference[i].get(field) != results[i].get(field):
+                        expected, actual = first_difference(reference[i].get(field), results[i].get(field))
+                        print(f"   {url} [{field}]")
+                        print(f"     {DEFAULT_PARSER}: ...{expected!r}...")
+                        print(f"     {backend}: ...{actual!r}...")
+        else:
+            print(f"✅ {backend}: identical description and postcode on all {len(corpus)} pages")
+
+    print("\n" + "=" * 60)
+    print("⏱️  THROUGHPUT (parse + extract description and postcode)")
+    print("=" * 60)
+    for backend, elapsed in timings.items():
+        rate = len(corpus) / elapsed if elapsed > 0 else float('inf')
+        speedup = reference_time / elapsed if elapsed > 0 else float('inf')
+        print(f"{backend:<14} {rate:8.1f} pages/s   {elapsed:7.2f}s   {speedup:4.2f}x")
+    print("=" * 60)
+
+    sys.exit(0 if all_identical else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,582 @@
+"""
+Fetch-once, extract-many processing of parkrun course pages.
+
+Both the silver stage (course map URL) and the detail stage (description and
+postcode) need the same /{slug}/course page. This module downloads each page
+once, parses it once, and runs every registered extractor over that single
+parse.
+
+Usage:
+    page = fetch_course_page(url, session)
+    fields = extract_fields(page)   # {'course_map_url': ..., 'description': ..., 'postcode': ...}
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Match, Optional, Pattern, Tuple
+
+import requests
+from bs4 import BeautifulSoup, FeatureNotFound, NavigableString, Tag
+
+from http_cache import CacheMiss, ResponseCache, cached_get
+from page_archive import PageArchive, slug_from_url
+
+REQUEST_TIMEOUT = 10  # Seconds
+
+# BeautifulSoup tree builders that can parse course pages.
+# 'html.parser' is pure Python (the reference); 'lxml' is the fast C path.
+PARSER_BACKENDS = ['html.parser', 'lxml']
+DEFAULT_PARSER = 'html.parser'
+
+# UK Postcode regex pattern
+# Matches formats like: SW1A 1AA, EC1A 1BB, W1A 0AX, etc.
+UK_POSTCODE_PATTERN = re.compile(
+    r'\b([A-Z]{1,2}\d{1,2}[A-Z]?)\s*(\d[A-Z]{2})\b',
+    re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
+class PostcodeMatcher:
+    """A compiled postcode pattern plus how to format a match."""
+    pattern: Pattern
+    format: Callable[[Match], str]
+
+    def search(self, text: str) -> Optional[str]:
+        """Return the first postcode in text, formatted, or None."""
+        match = self.pattern.search(text)
+        return self.format(match) if match else None
+
+
+UK_POSTCODE_MATCHER = PostcodeMatcher(UK_POSTCODE_PATTERN, lambda m: f"{m.group(1).upper()} {m.group(2).upper()}")
+
+# Postcode matchers by bronze countryCode (see process_to_bronze.py).
+# Purely numeric codes are only accepted in address context (state or
+# province, address label, town name before a comma, DK- prefix or a line of
+# their own) so years and distances don't match. Outside the strongest
+# contexts 19xx/20xx values are taken for years and skipped.
+MONTHS_AND_DAYS = (
+    r'(?:January|February|March|April|May|June|July|August|September|October|November|December|'
+    r'Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)'
+)
+YEAR = r'(?:19|20)\d\d\b'
+ZA_PROVINCES = (
+    r'(?:Western Cape|Eastern Cape|Northern Cape|Gauteng|KwaZulu[- ]Natal|Free State|'
+    r'Limpopo|Mpumalanga|North West)'
+)
+
+
+def _first_group(match: Match) -> str:
+    """The group of whichever alternative matched."""
+    return next(group for group in match.groups() if group)
+
+
+POSTCODE_MATCHERS: Dict[int, PostcodeMatcher] = {
+    # Australia: "Sydney NSW 2000"
+    3: PostcodeMatcher(
+        re.compile(r'\b(?:NSW|VIC|QLD|SA|WA|TAS|NT|ACT)\s+(\d{4})\b'),
+        lambda m: m.group(1)
+    ),
+    # Denmark: "DK-2100 København Ø", "Parkvej 1, 8000 Aarhus C", "Adresse: 8000 Aarhus C"
+    # (1900-2099 are Frederiksberg/København codes, otherwise years)
+    23: PostcodeMatcher(
+        re.compile(
+            r'\bDK-(\d{4})\b'
+            r'|(?:^|,|\b(?:[Aa]dresse|[Aa]ddress)\b:?)[ \t]*'
+            rf'(?!{YEAR}\s+(?!Frederiksberg|København))(\d{{4}})\s+(?!(?:The|This|These)\b)[A-ZÆØÅ][a-zæøå]+',
+            re.MULTILINE
+        ),
+        _first_group
+    ),
+    # Ireland: Eircodes like "A65 F4E2", "D6W XY12"
+    42: PostcodeMatcher(
+        re.compile(r'\b([AC-FHKNPRTV-Y]\d{2}|D6W)\s?([0-9AC-FHKNPRTV-Y]{4})\b'),
+        lambda m: f"{m.group(1)} {m.group(2)}"
+    ),
+    # South Africa: "Gauteng 2196", "Postal code: 7700", "Rondebosch, Cape Town, 7700"
+    85: PostcodeMatcher(
+        re.compile(
+            rf'\b(?:{ZA_PROVINCES}|[Pp]ost(?:al)?\s?[Cc]ode)\b[:,]?\s*(\d{{4}})\b(?![.,:]\d)'
+            rf'|\b(?!{MONTHS_AND_DAYS}\b)[A-Z][a-z]+,[ \t]*(?!{YEAR})(\d{{4}})\b(?![.,:]\d)'
+            rf'|^[ \t]*(?!{YEAR})(\d{{4}})[ \t]*$',
+            re.MULTILINE
+        ),
+        _first_group
+    ),
+    # United Kingdom: "SW1A 1AA"
+    97: UK_POSTCODE_MATCHER,
+    # United States: ZIP (or ZIP+4) after the state, "Washington, DC 20001"
+    98: PostcodeMatcher(
+        re.compile(
+            r'\b(?:A[KLRZ]|C[AOT]|D[CE]|FL|GA|HI|I[ADLN]|K[SY]|LA|M[ADEINOST]|N[CDEHJMVY]|'
+            r'O[HKR]|PA|RI|S[CD]|T[NX]|UT|V[AT]|W[AIVY])\s+(\d{5}(?:-\d{4})?)\b'
+        ),
+        lambda m: m.group(1)
+    ),
+}
+
+
+def postcode_matcher(country_code: Optional[int]) -> PostcodeMatcher:
+    """Postcode matcher for a bronze countryCode; the UK pattern when unknown."""
+    return POSTCODE_MATCHERS.get(country_code, UK_POSTCODE_MATCHER)
+
+
+# Headings that usually introduce the address / directions part of a course page
+LOCATION_HEADING_PHRASES = [
+    'getting there', 'by road', 'by car', 'driving', 'on foot',
+    'location', 'address', 'directions', 'how to find', 'parking'
+]
+
+# Google Maps iframe embed on the course page
+IFRAME_MAPS_PATTERN = re.compile(r'<iframe[^>]*src=["\']([^"\']*maps[^"\']*)["\'][^>]*>', re.IGNORECASE)
+MAPS_URL_PATTERN = re.compile(r'https://[^"\s]*google\.com/maps[^"\s]*')
+
+
+@dataclass
+class CoursePage:
+    """A downloaded course page, parsed at most once."""
+    url: str
+    content: bytes
+    text: str
+    parser: str = DEFAULT_PARSER
+    country_code: Optional[int] = None
+    _soup: Optional[BeautifulSoup] = field(default=None, repr=False)
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """BeautifulSoup tree of the page, built on first use and then reused."""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.content, self.parser)
+        return self._soup
+
+
+def available_parsers() -> List[str]:
+    """Parser backends from PARSER_BACKENDS that are installed here."""
+    available = []
+    for name in PARSER_BACKENDS:
+        try:
+            BeautifulSoup('<p></p>', name)
+        except FeatureNotFound:
+            continue
+        available.append(name)
+    return available
+
+
+# Registry of extractors: field name -> function(CoursePage) -> value
+EXTRACTORS: Dict[str, Callable[[CoursePage], Optional[str]]] = {}
+
+
+def register_extractor(name: str):
+    """Decorator registering a course page extractor under a field name."""
+    def decorator(func: Callable[[CoursePage], Optional[str]]):
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+
+def fetch_course_page(url: str, session: requests.Session, timeout: int = REQUEST_TIMEOUT,
+                      cache: Optional[ResponseCache] = None, offline: bool = False,
+                      parser: str = DEFAULT_PARSER, country_code: Optional[int] = None,
+                      archive: Optional[PageArchive] = None) -> CoursePage:
+    """
+    Download a course page, through the response cache if one is given.
+
+    Args:
+        url: Course page URL
+        session: HTTP session to use
+        timeout: Request timeout in seconds
+        cache: Optional on-disk response cache (conditional GETs)
+        offline: Only serve pages from the cache, never touch the network
+                 (from the archive if there is no cache)
+        parser: BeautifulSoup backend used when the page is parsed
+        country_code: Bronze countryCode of the event (selects the postcode format)
+        archive: Optional raw page archive every fetched page is appended to
+
+    Raises:
+        requests.RequestException: on connection errors, HTTP error statuses
+                                   and offline cache misses
+    """
+    if offline and cache is None and archive is not None:
+        content = archive.get(slug_from_url(url))
+        if content is None:
+            raise CacheMiss(f"Not in archive (offline mode): {url}")
+        return CoursePage(url=url, content=content, text=content.decode('utf-8', errors='replace'),
+                          parser=parser, country_code=country_code)
+
+    if cache is not None:
+        response = cached_get(session, url, cache, timeout=timeout, offline=offline)
+        content, text = response.content, response.text
+    else:
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        content, text = response.content, response.text
+
+    if archive is not None and not offline:
+        archive.append(slug_from_url(url), url, content)
+    return CoursePage(url=url, content=content, text=text, parser=parser, country_code=country_code)
+
+
+def extract_fields(page: CoursePage, fields: Optional[Iterable[str]] = None) -> Dict[str, Optional[str]]:
+    """
+    Run the registered extractors over one page.
+
+    Args:
+        page: The downloaded course page
+        fields: Names of the extractors to run (default: all registered)
+
+    Returns:
+        Dictionary of field name -> extracted value (None if not found)
+    """
+    names = list(fields) if fields is not None else list(EXTRACTORS)
+    return {name: EXTRACTORS[name](page) for name in names}
+
+
+def extract_page_fields(url: str, content: bytes, text: str = '',
+                        fields: Optional[Iterable[str]] = None,
+                        parser: str = DEFAULT_PARSER,
+                        country_code: Optional[int] = None) -> Dict[str, Optional[str]]:
+    """
+    Parse raw page content and run the extractors over it.
+
+    Module-level so it can be sent to ProcessPoolExecutor workers: only the
+    raw bytes cross the process boundary, the parse happens in the worker.
+    """
+    page = CoursePage(url=url, content=content, text=text, parser=parser, country_code=country_code)
+    return extract_fields(page, fields)
+
+
+def find_course_map_url(content: str) -> Optional[str]:
+    """
+    Find the Google Maps embed URL with the course route highlighted.
+
+    Args:
+        content: Raw HTML of the course page
+
+    Returns:
+        Google Maps embed URL, or None if not found
+    """
+    # Look for iframe with Google Maps embed
+    for iframe_url in IFRAME_MAPS_PATTERN.findall(content):
+        if 'google.com/maps' in iframe_url and ('embed' in iframe_url or 'pb=' in iframe_url):
+            return iframe_url
+
+    # Alternative: look for maps URLs in the page content
+    for maps_url in MAPS_URL_PATTERN.findall(content):
+        if 'embed' in maps_url or 'pb=' in maps_url:
+            return maps_url
+
+    return None
+
+
+# Tags whose own text is collected, and the subset whose whole text is collected too
+RELEVANT_TEXT_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div', 'span', 'li', 'td', 'th', 'strong', 'em', 'b', 'i'])
+FULL_TEXT_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'p', 'li'])
+NON_CONTENT_TAGS = frozenset(['script', 'style', 'noscript', 'meta', 'link'])
+
+
+def extract_text_content(soup: BeautifulSoup) -> str:
+    """
+    Extract ALL relevant text content from the page.
+    This is critical for accessibility analysis - we need every detail.
+
+    Single-pass version of extract_text_content_legacy: one walk over the
+    main content collects, in document order,
+    - the first direct string of every relevant tag,
+    - the full stripped text of headings, paragraphs and list items
+      (as a slice of the strings seen while inside the tag),
+    - every standalone text node,
+    and then de-duplicates them exactly like the old three-traversal version.
+
+    Args:
+        soup: BeautifulSoup object of the page
+
+    Returns:
+        Combined text content as a single string
+    """
+    # Find the main content area (usually div with id 'primary' or class 'content')
+    main_content = soup.find('div', id='primary') or soup.find('main') or soup
+
+    if not main_content:
+        main_content = soup
+
+    strings: List[NavigableString] = []   # every string under main_content, in order
+    tag_texts: List[Tuple[str, int]] = []    # (text, minimum length) in tag order
+    text_nodes: List[Tuple[str, str]] = []   # (stripped text, parent name) for standalone text nodes
+
+    # Iterative depth-first walk; a None marker closes a full-text tag
+    stack: List = [iter(main_content.contents)]
+    open_full_text: List[Tuple[Tag, int, int]] = []  # (tag, first string index, slot in tag_texts)
+
+    while stack:
+        child = next(stack[-1], None)
+
+        if child is None:
+            stack.pop()
+            if stack and stack[-1] is None:
+                stack.pop()
+                tag, start, slot = open_full_text.pop()
+                types = tag.interesting_string_types or Tag.MAIN_CONTENT_STRING_TYPES
+                tag_texts[slot] = (''.join(s.strip() for s in strings[start:] if type(s) in types), 5)
+            continue
+
+        if isinstance(child, NavigableString):
+            strings.append(child)
+            text_nodes.append((child.strip(), child.parent.name if child.parent else None))
+            continue
+
+        if not isinstance(child, Tag):
+            continue
+
+        if child.name in RELEVANT_TEXT_TAGS:
+            # First direct string child, like tag.find(text=True, recursive=False)
+            direct_text = next((c for c in child.contents if isinstance(c, NavigableString)), None)
+            tag_texts.append((direct_text.strip() if direct_text else '', 3))
+
+            if child.name in FULL_TEXT_TAGS:
+                open_full_text.append((child, len(strings), len(tag_texts)))
+                tag_texts.append(('', 5))  # Filled in when the tag is closed
+                stack.append(None)
+
+        stack.append(iter(child.contents))
+
+    text_parts = []
+    seen_texts = set()  # Avoid duplicates
+
+    # Direct texts need more than 3 characters, full texts more than 5
+    for text, min_length in tag_texts:
+        if text and len(text) > min_length and text not in seen_texts:
+            text_parts.append(text)
+            seen_texts.add(text)
+
+    # Also capture any standalone text nodes not in tags (skipping script and style content)
+    for text, parent_name in text_nodes:
+        if text and len(text) > 10 and text not in seen_texts and parent_name not in NON_CONTENT_TAGS:
+            text_parts.append(text)
+            seen_texts.add(text)
+
+    # Join all text parts with newlines
+    description = '\n\n'.join(text_parts)
+
+    return description.strip()
+
+
+def extract_text_content_legacy(soup: BeautifulSoup) -> str:
+    """
+    Extract ALL relevant text content from the page.
+    This is critical for accessibility analysis - we need every detail.
+
+    Args:
+        soup: BeautifulSoup object of the page
+
+    Returns:
+        Combined text content as a single string
+    """
+    text_parts = []
+
+    # Find the main content area (usually div with id 'primary' or class 'content')
+    main_content = soup.find('div', id='primary') or soup.find('main') or soup
+
+    if not main_content:
+        main_content = soup
+
+    # Strategy: Get ALL text from all relevant tags, including div, span, li, etc.
+    # This ensures we capture everything including course descriptions not in p tags
+    relevant_tags = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div', 'span', 'li', 'td', 'th', 'strong', 'em', 'b', 'i']
+
+    # Get all text-containing elements
+    seen_texts = set()  # Avoid duplicates
+
+    for tag in main_content.find_all(relevant_tags):
+        # Get direct text from this tag (not from children)
+        direct_text = tag.find(text=True, recursive=False)
+        if direct_text:
+            text = direct_text.strip()
+            if text and len(text) > 3 and text not in seen_texts:
+                text_parts.append(text)
+                seen_texts.add(text)
+
+        # Also get complete text from certain important tags
+        if tag.name in ['h1', 'h2', 'h3', 'h4', 'p', 'li']:
+            full_text = tag.get_text(strip=True)
+            if full_text and len(full_text) > 5 and full_text not in seen_texts:
+                text_parts.append(full_text)
+                seen_texts.add(full_text)
+
+    # Also capture any standalone text nodes not in tags
+    for text_node in main_content.find_all(text=True):
+        text = text_node.strip()
+        if text and len(text) > 10 and text not in seen_texts:
+            # Skip script and style content
+            parent = text_node.parent
+            if parent and parent.name not in ['script', 'style', 'noscript', 'meta', 'link']:
+                text_parts.append(text)
+                seen_texts.add(text)
+
+    # Join all text parts with newlines
+    description = '\n\n'.join(text_parts)
+
+    return description.strip()
+
+
+class PageTextIndex:
+    """
+    The page text (exactly soup.get_text()) built once, plus the character
+    span of every tag in it, so the text of any element is a slice instead
+    of another tree traversal.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self._types = soup.interesting_string_types or Tag.MAIN_CONTENT_STRING_TYPES
+        self.spans: Dict[int, Tuple[int, int]] = {}   # id(tag) -> (start, end) in full_text
+        self.headings: List[Tag] = []                 # h2/h3/h4 in document order
+
+        parts: List[str] = []
+        offset = 0
+        stack = [(soup, iter(soup.contents), 0)]
+
+        while stack:
+            tag, children, start = stack[-1]
+            child = next(children, None)
+
+            if child is None:
+                stack.pop()
+                self.spans[id(tag)] = (start, offset)
+                continue
+
+            if isinstance(child, NavigableString):
+                if type(child) in self._types:
+                    parts.append(child)
+                    offset += len(child)
+            elif isinstance(child, Tag):
+                if child.name in ('h2', 'h3', 'h4'):
+                    self.headings.append(child)
+                stack.append((child, iter(child.contents), offset))
+
+        self.full_text = ''.join(parts)
+
+    def text(self, tag: Tag) -> str:
+        """Same as tag.get_text(), read from the index."""
+        if tag.interesting_string_types != self._types or id(tag) not in self.spans:
+            # e.g. <script>/<style>, whose own strings aren't part of the page text
+            return tag.get_text()
+        start, end = self.spans[id(tag)]
+        return self.full_text[start:end]
+
+
+def find_postcode_in_section(soup: BeautifulSoup, country_code: Optional[int] = None,
+                             index: Optional[PageTextIndex] = None) -> Optional[str]:
+    """
+    Find postcode anywhere on the page - search thoroughly.
+    This is important for location data.
+
+    Args:
+        soup: BeautifulSoup object of the page
+        country_code: Bronze countryCode of the event (UK postcodes if unknown)
+        index: Text index of soup, built here if not given
+
+    Returns:
+        Postcode string if found, None otherwise
+    """
+    matcher = postcode_matcher(country_code)
+    if index is None:
+        index = PageTextIndex(soup)
+
+    # Strategy 1: Look in common sections first
+    priority_sections = []
+
+    # Find headings that might contain location info
+    for heading in index.headings:
+        text = index.text(heading).lower()
+        if any(phrase in text for phrase in LOCATION_HEADING_PHRASES):
+            priority_sections.append(heading)
+
+    # Search priority sections first
+    for section in priority_sections:
+        # Get the heading and next few siblings
+        search_text = index.text(section) + " "
+        current = section
+        for _ in range(10):  # Check next 10 elements
+            current = current.find_next_sibling()
+            if current:
+                search_text += " " + index.text(current)
+            else:
+                break
+
+        postcode = matcher.search(search_text)
+        if postcode:
+            return postcode
+
+    # Strategy 2: Search the entire page text if not found in priority sections
+    # (the first match is usually the most relevant)
+    return matcher.search(index.full_text)
+
+
+def find_postcode_in_section_legacy(soup: BeautifulSoup) -> Optional[str]:
+    """
+    Find postcode anywhere on the page - search thoroughly.
+    This is important for location data.
+
+    Original UK-only version that re-serializes the headings, their siblings
+    and the whole page; kept as the reference for benchmark_text_extraction.py.
+
+    Args:
+        soup: BeautifulSoup object of the page
+
+    Returns:
+        Postcode string if found, None otherwise
+    """
+    # Strategy 1: Look in common sections first
+    priority_sections = []
+
+    # Find headings that might contain location info
+    for heading in soup.find_all(['h2', 'h3', 'h4']):
+        text = heading.get_text().lower()
+        if any(phrase in text for phrase in LOCATION_HEADING_PHRASES):
+            priority_sections.append(heading)
+
+    # Search priority sections first
+    for section in priority_sections:
+        # Get the heading and next few siblings
+        search_text = section.get_text() + " "
+        current = section
+        for _ in range(10):  # Check next 10 elements
+            current = current.find_next_sibling()
+            if current:
+                search_text += " " + current.get_text()
+            else:
+                break
+
+        # Search for UK postcode pattern
+        match = UK_POSTCODE_PATTERN.search(search_text)
+        if match:
+            postcode = f"{match.group(1).upper()} {match.group(2).upper()}"
+            return postcode
+
+    # Strategy 2: Search the entire page text if not found in priority sections
+    full_text = soup.get_text()
+
+    # Find ALL postcode matches on the page
+    all_matches = UK_POSTCODE_PATTERN.findall(full_text)
+
+    if all_matches:
+        # Take the first match (usually the most relevant)
+        first_match = all_matches[0]
+        postcode = f"{first_match[0].upper()} {first_match[1].upper()}"
+        return postcode
+
+    return None
+
+
+@register_extractor('course_map_url')
+def _extract_course_map_url(page: CoursePage) -> Optional[str]:
+    return find_course_map_url(page.text)
+
+
+@register_extractor('description')
+def _extract_description(page: CoursePage) -> Optional[str]:
+    return extract_text_content(page.soup)
+
+
+@register_extractor('postcode')
+def _extract_postcode(page: CoursePage) -> Optional[str]:
+    return find_postcode_in_section(page.soup, page.country_code)
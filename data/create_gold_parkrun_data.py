@@ -12,11 +12,17 @@ from collections import defaultdict
 import requests
 from openai import OpenAI
 
+from http_client import HttpClient
+from geocode_cache import DEFAULT_GEOCODE_CACHE_FILE, GeocodeCache
+from offline_geocoder import DEFAULT_CENTROIDS_FILE, event_coordinates, load_geocoder
+from scoring import MATCH_SUBSTRING, KeywordScorer, compile_scorer
+
 # Initialize OpenAI client
 client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
 # Google Geocoding API setup
 GOOGLE_GEOCODING_API_KEY = os.environ.get("GOOGLE_GEOCODING_API_KEY", "")
+GEOCODING_CLIENT = HttpClient(min_delay=0.1)  # Shared keep-alive client with retries and circuit breaking, paced like its callers
 
 # File paths
 SILVER_DATA = "silver_data.json"
@@ -25,6 +31,8 @@ PARKRUN_DETAIL_CLEAN = "parkrun_detail_clean.json"
 PARKRUN_SUMMARIES = "parkrun_descriptions_extracted.json"
 KEYWORDS_FILE = "keywords.json"
 OUTPUT_FILE = "gold_parkrun_data.json"
+CENTROIDS_FILE = DEFAULT_CENTROIDS_FILE  # Offline reverse geocoding (see offline_geocoder.py)
+GEOCODE_CACHE_FILE = DEFAULT_GEOCODE_CACHE_FILE  # Earlier Google answers (see geocode_cache.py)
 
 # Base scores for each mobility type
 BASE_SCORES = {
@@ -91,73 +99,33 @@ def get_user_adjustment(user_scores: List[Dict], mobility_type: str, current_sco
     }
 
 
-def find_keywords_in_text(text: str, keywords_dict: Dict) -> List[Dict]:
-    """
-    Find all keyword matches in text and return with their impacts
-    """
-    text_lower = text.lower()
-    matches = []
-    
-    # Skip metadata
-    for category, category_data in keywords_dict.items():
-        if category == "metadata":
-            continue
-        
-        # Check if this is a category with subcategories
-        if isinstance(category_data, dict):
-            for subcategory, subcat_data in category_data.items():
-                if isinstance(subcat_data, dict) and 'keywords' in subcat_data:
-                    keywords_list = subcat_data['keywords']
-                    impact = subcat_data.get('impact', {})
-                    
-                    for keyword in keywords_list:
-                        if keyword.lower() in text_lower:
-                            matches.append({
-                                "keyword": keyword,
-                                "category": f"{category}/{subcategory}",
-                                "impacts": impact
-                            })
-    
-    return matches
-
-
-def calculate_keyword_adjustment(keywords: List[Dict], mobility_type: str) -> Dict:
-    """
-    Calculate total keyword adjustment for a mobility type
-    """
-    total_adjustment = 0
-    applied_keywords = []
-    
-    for kw in keywords:
-        impact = kw['impacts'].get(mobility_type, 0)
-        if impact != 0:
-            total_adjustment += impact
-            applied_keywords.append({
-                "keyword": kw['keyword'],
-                "category": kw['category'],
-                "impact": impact
-            })
-    
-    return {
-        "total": total_adjustment,
-        "applied": applied_keywords
-    }
-
-
 def calculate_accessibility_scores(
-    keywords: List[Dict],
+    matched: List[int],
     user_scores: List[Dict],
-    base_scores: Dict[str, int]
+    base_scores: Dict[str, int],
+    scorer: KeywordScorer
 ) -> Dict:
     """
     Calculate final accessibility scores with full breakdown
+
+    matched holds the parkrun's matched keyword entries (see scoring.py).
     """
     accessibility = {}
+    keyword_scores = scorer.score([matched], base_scores)
     
     for mobility_type, starting_score in base_scores.items():
-        # Calculate keyword adjustment
-        keyword_data = calculate_keyword_adjustment(keywords, mobility_type)
-        score_after_keywords = starting_score + keyword_data['total']
+        # Keyword adjustment
+        column = scorer.mobility_types.index(mobility_type)
+        keyword_total = keyword_scores.adjustment[0, column].item()
+        keywords_applied = [
+            {
+                "keyword": entry.keyword,
+                "category": f"{entry.category}/{entry.subcategory}",
+                "impact": impact
+            }
+            for entry, impact in keyword_scores.breakdown(0, mobility_type)
+        ]
+        score_after_keywords = starting_score + keyword_total
         
         # Calculate user adjustment
         user_data = get_user_adjustment(user_scores, mobility_type, score_after_keywords)
@@ -167,11 +135,11 @@ def calculate_accessibility_scores(
         
         accessibility[mobility_type] = {
             "starting_score": starting_score,
-            "keyword_adjustment": keyword_data['total'],
+            "keyword_adjustment": keyword_total,
             "user_adjustment": user_data['adjustment'],
             "final_score": final_score,
             "breakdown": {
-                "keywords_applied": keyword_data['applied'],
+                "keywords_applied": keywords_applied,
                 "user_feedback": {
                     "submission_count": user_data['count'],
                     "avg_suggested": user_data['avg_suggested_score'],
@@ -183,34 +151,66 @@ def calculate_accessibility_scores(
     return accessibility
 
 
-def get_postcode_from_coordinates(lat: float, lon: float) -> Optional[str]:
+def google_postcode(lat: float, lon: float) -> Optional[str]:
+    """
+    Reverse geocode one location with the Google Geocoding API.
+
+    Returns:
+        The postcode, or None if Google has none for the location
+        (ZERO_RESULTS, or no postal_code component)
+    
+    Raises:
+        requests.RequestException: on connection errors, error statuses and
+            API error statuses (OVER_QUERY_LIMIT, REQUEST_DENIED, ...)
+    """
+    url = "https://maps.googleapis.com/maps/api/geocode/json"
+    params = {
+        "latlng": f"{lat},{lon}",
+        "key": GOOGLE_GEOCODING_API_KEY,
+        "result_type": "postal_code"
+    }
+    
+    response = GEOCODING_CLIENT.get(url, params=params)
+    time.sleep(0.1)  # Rate limiting for Google API
+    response.raise_for_status()
+    data = response.json()
+    status = data.get('status')
+    
+    if status == 'ZERO_RESULTS':
+        return None
+    if status != 'OK':
+        # OVER_QUERY_LIMIT, REQUEST_DENIED, ... come back as HTTP 200
+        message = data.get('error_message')
+        raise requests.RequestException(
+            f"Google Geocoding API status {status}" + (f": {message}" if message else ""),
+            response=response
+        )
+    
+    # Extract postal code from address components
+    for result in data.get('results', []):
+        for component in result.get('address_components', []):
+            if 'postal_code' in component.get('types', []):
+                return component.get('long_name')
+    
+    return None
+
+
+def get_postcode_from_coordinates(lat: float, lon: float,
+                                  geocode_cache: Optional[GeocodeCache] = None) -> Optional[str]:
     """
     Get accurate postcode using Google Geocoding API
+
+    With a geocode_cache, locations looked up before (or earlier in this run)
+    are answered without a request.
     """
     if not GOOGLE_GEOCODING_API_KEY:
         print("⚠️  Warning: GOOGLE_GEOCODING_API_KEY not set, skipping postcode lookup")
         return None
     
     try:
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
-        params = {
-            "latlng": f"{lat},{lon}",
-            "key": GOOGLE_GEOCODING_API_KEY,
-            "result_type": "postal_code"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('status') == 'OK' and data.get('results'):
-            # Extract postal code from address components
-            for result in data['results']:
-                for component in result.get('address_components', []):
-                    if 'postal_code' in component.get('types', []):
-                        return component.get('long_name')
-        
-        return None
+        if geocode_cache is not None:
+            return geocode_cache.lookup('google', lat, lon, google_postcode)
+        return google_postcode(lat, lon)
     
     except Exception as e:
         print(f"⚠️  Geocoding error: {e}")
@@ -292,11 +292,19 @@ def create_parkrun_gold_entry(
     detail_event: Optional[Dict],
     clean_event: Optional[Dict],
     summary_event: Optional[Dict],
-    keywords_dict: Dict,
-    user_scores: List[Dict] = None
+    scorer: KeywordScorer,
+    user_scores: List[Dict] = None,
+    offline_postcode: Optional[str] = None,
+    geocode_cache: Optional[GeocodeCache] = None
 ) -> Dict:
     """
     Create a single gold parkrun entry by merging all data sources
+
+    scorer is the keywords config compiled once for all events
+    (compile_scorer(keywords_dict, MATCH_SUBSTRING)).
+    offline_postcode is the event's nearest postcode from the offline geocoder;
+    the Google Geocoding API is only called when it is None, through
+    geocode_cache if given.
     """
     if user_scores is None:
         user_scores = []
@@ -318,21 +326,22 @@ def create_parkrun_gold_entry(
         time.sleep(0.1)  # Rate limiting
     
     # Get accurate postcode from coordinates
-    postcode = None
-    if silver_event.get('coordinates'):
+    postcode = offline_postcode
+    if postcode is None and silver_event.get('coordinates'):
         coords = silver_event['coordinates']
         if len(coords) == 2:
             lon, lat = coords  # [longitude, latitude]
-            postcode = get_postcode_from_coordinates(lat, lon)
-            time.sleep(0.1)  # Rate limiting for Google API
+            postcode = get_postcode_from_coordinates(lat, lon, geocode_cache)
     
     # Find keywords in cleaned description and summary (NOT full - avoids boilerplate)
-    keywords_cleaned = find_keywords_in_text(cleaned_description, keywords_dict) if cleaned_description else []
-    keywords_summary = find_keywords_in_text(summary, keywords_dict) if summary else []
+    matched_cleaned = scorer.find(cleaned_description)
+    matched_summary = scorer.find(summary)
     
     # Combine and deduplicate keywords
-    all_keywords = {kw['keyword']: kw for kw in (keywords_cleaned + keywords_summary)}
-    matched_keywords = list(all_keywords.values())
+    matched = scorer.unique_keywords(matched_cleaned + matched_summary)
+    keywords_cleaned = scorer.details(matched_cleaned)
+    keywords_summary = scorer.details(matched_summary)
+    matched_keywords = scorer.details(matched)
     
     # Separate keyword sources for transparency
     keyword_sources = {
@@ -342,9 +351,10 @@ def create_parkrun_gold_entry(
     
     # Calculate accessibility scores
     accessibility = calculate_accessibility_scores(
-        matched_keywords,
+        matched,
         user_scores,
-        BASE_SCORES
+        BASE_SCORES,
+        scorer
     )
     
     # Build gold entry
@@ -441,6 +451,18 @@ def main():
         print("   ⚠️  This will take a while due to API calls (language detection, translation, postcode lookup)")
         print("   💰 Estimated cost: ~$0.12 total")
     
+    # Postcodes for every event in one offline batch (Google only for the ones it can't answer)
+    offline_postcodes = {}
+    geocoder = load_geocoder(CENTROIDS_FILE)
+    if geocoder is not None:
+        located = [(event.get('slug'), event_coordinates(event)) for event in silver_events]
+        located = [(slug, coords) for slug, coords in located if coords is not None]
+        postcodes = geocoder.nearest_postcodes([coords for _, coords in located])
+        offline_postcodes = {slug: postcode for (slug, _), postcode in zip(located, postcodes) if postcode}
+        print(f"   🗺️  {len(offline_postcodes)}/{len(silver_events)} postcodes found offline")
+    
+    geocode_cache = GeocodeCache(GEOCODE_CACHE_FILE)
+    scorer = compile_scorer(keywords_data, MATCH_SUBSTRING)  # Compiled once for every event
     gold_events = []
     
     for idx, silver_event in enumerate(silver_events, 1):
@@ -461,12 +483,18 @@ def main():
             detail_event,
             clean_event,
             summary_event,
-            keywords_data,
-            user_scores
+            scorer,
+            user_scores,
+            offline_postcodes.get(slug),
+            geocode_cache
         )
         
         gold_events.append(gold_entry)
     
+    print(f"   📮 Google postcode lookups: {geocode_cache.describe()}")
+    print(f"   🔑 Keyword scoring: {scorer.timings.describe()}")
+    geocode_cache.close()
+    
     # Create final gold data structure
     gold_data = {
         "metadata": {
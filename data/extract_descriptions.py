@@ -4,39 +4,34 @@ Smart extraction of course descriptions from parkrun data.
 Instead of removing boilerplate, we extract ONLY the relevant course description.
 """
 
+import argparse
 import json
+import os
 import re
-from typing import Dict, Optional
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+from chunked_pool import Progress, default_workers, map_chunks, merge_stats, split_chunks
+from trie_regex import trie_pattern
 
-def extract_course_description(full_text: str, event_name: str) -> str:
-    """
-    Extract only the actual course description from the full scraped text.
-    
-    Strategy:
-    1. Look for markers that indicate where the real description starts
-    2. Extract paragraphs after these markers
-    3. Stop when we hit navigation/admin text
-    
-    Common patterns:
-    - Course description comes after "Course Description" heading
-    - Usually starts with descriptive text like "A fast", "The course", "This is"
-    - Ends before "Location of start", "Facilities", "Getting There"
-    """
-    
-    if not full_text:
-        return ""
-    
+SILVER_FILE = "silver_data.json"  # countryCode for detail files scraped before it was recorded
+
+
+# Headings and template text around the course description, by page language.
+# The English template text (SAFETYMESSAGE etc.) appears on every parkrun
+# site, so each language's markers are used together with the English ones.
+ENGLISH_MARKERS = {
     # Markers that indicate the start of useful course description
-    start_markers = [
+    'start': [
         "SAFETYMESSAGE",  # Often appears right before the description
         "For more information, please see our",
         "Course Description",
-    ]
-    
+    ],
     # Markers that indicate we've gone past the course description
-    end_markers = [
+    'end': [
         "Location of start",
         "Getting there by",
         "Facilities",
@@ -50,52 +45,177 @@ def extract_course_description(full_text: str, event_name: str) -> str:
         "If arriving by car",
         "The address",
         "OS Grid ref:",
-    ]
-    
-    # Try to find where the description starts
-    start_pos = 0
-    for marker in start_markers:
-        pos = full_text.find(marker)
-        if pos != -1:
-            start_pos = max(start_pos, pos + len(marker))
-    
-    # If no markers found, try to find the first paragraph after "Age Grading"
-    if start_pos == 0:
-        age_grading_pos = full_text.find("Age Grading")
-        if age_grading_pos != -1:
+    ],
+}
+
+LANGUAGE_MARKERS = {
+    'da': {'start': ["Rutebeskrivelse"],
+           'end': ["Placering af start", "Sådan kommer du", "Faciliteter", "Parkering", "Toiletter"]},
+    'de': {'start': ["Streckenbeschreibung"],
+           'end': ["Startpunkt", "Anfahrt", "Einrichtungen", "Parken", "Parkplätze", "Toiletten"]},
+    'fi': {'start': ["Reittikuvaus"],
+           'end': ["Lähtöpaikka", "Saapuminen", "Palvelut", "Pysäköinti"]},
+    'it': {'start': ["Descrizione del percorso"],
+           'end': ["Luogo di partenza", "Come arrivare", "Servizi", "Parcheggio"]},
+    'ja': {'start': ["コース説明", "コースの説明"],
+           'end': ["スタート地点", "アクセス", "施設", "駐車場", "トイレ"]},
+    'nl': {'start': ["Parcoursbeschrijving"],
+           'end': ["Locatie van de start", "Bereikbaarheid", "Faciliteiten", "Parkeren", "Toiletten"]},
+    'no': {'start': ["Løypebeskrivelse"],
+           'end': ["Startsted", "Veibeskrivelse", "Fasiliteter", "Parkering", "Toaletter"]},
+    'pl': {'start': ["Opis trasy"],
+           'end': ["Miejsce startu", "Dojazd", "Udogodnienia", "Parking", "Toalety"]},
+    'sv': {'start': ["Banbeskrivning"],
+           'end': ["Startplats", "Hitta hit", "Faciliteter", "Parkering", "Toaletter"]},
+}
+
+# Page language by bronze countryCode (see process_to_bronze.py); English otherwise
+COUNTRY_LANGUAGES = {4: 'de', 23: 'da', 30: 'fi', 32: 'de', 44: 'it', 46: 'ja',
+                     64: 'nl', 67: 'no', 74: 'pl', 88: 'sv'}
+
+# Fallback when no start marker is found: the description follows the
+# "Support" link after the Age Grading section
+AGE_GRADING_MARKER = "Age Grading"
+SUPPORT_MARKER = "Support"
+
+# Navigation text removed (case-insensitively) from the description, in one pass
+NAV_PHRASES = ["Course Map", "Course Description", "Support", "parkrun_conditional meta not found", "SAFETYMESSAGE"]
+HTML_COMMENT_MARKER = "extra clearing"  # Everything from here on is removed
+# Matched against text.lower(): a case-sensitive scan is several times faster
+# than re.IGNORECASE and finds the same matches, except around the only
+# characters Unicode case folding maps onto ASCII letters (İ ı ſ and the
+# Kelvin sign), for which the IGNORECASE pattern is used instead
+NAV_PATTERN = re.compile(f'(?:{trie_pattern(p.lower() for p in NAV_PHRASES)})\\s*')
+NAV_PATTERN_IGNORECASE = re.compile('(?:' + '|'.join(map(re.escape, NAV_PHRASES)) + r')\s*', re.IGNORECASE)
+FOLDS_TO_ASCII = re.compile('[\u0130\u0131\u017f\u212a]')
+# Runs of 3+ newlines (with any whitespace between) and of spaces/tabs other than a single space
+WHITESPACE_PATTERN = re.compile(r'\n\s*\n\s*\n+|\t[ \t]*| [ \t]+')
+
+
+class MarkerScanner:
+    """
+    Finds every start and end marker of a language in one regex scan.
+    
+    Reproduces the str.find rules of the original per-marker loop: the
+    description starts after the start marker whose first occurrence ends
+    last, and stops at the first end marker after that.
+    """
+    
+    def __init__(self, start_markers: List[str], end_markers: List[str]):
+        self.start_markers = start_markers
+        self.end_markers = set(end_markers)
+        markers = sorted(set(start_markers) | self.end_markers | {AGE_GRADING_MARKER, SUPPORT_MARKER})
+        # The scan reports the longest marker at a position; shorter ones that are its prefixes start there too
+        self.prefixes = {m: [p for p in markers if m.startswith(p)] for m in markers}
+        self.pattern = re.compile(trie_pattern(markers))
+    
+    def description_span(self, full_text: str) -> Tuple[int, int]:
+        """Start and end offsets of the course description in full_text (before stripping)."""
+        first: Dict[str, int] = {}
+        supports: List[int] = []
+        ends: List[int] = []
+        match = self.pattern.search(full_text)
+        while match:
+            position = match.start()
+            for marker in self.prefixes[match.group()]:
+                if marker not in first:
+                    first[marker] = position
+                if marker == SUPPORT_MARKER:
+                    supports.append(position)
+                if marker in self.end_markers:
+                    ends.append(position)
+            # Resume right after the match start: markers can overlap ("Toilets are" + "extra clearing")
+            match = self.pattern.search(full_text, position + 1)
+        
+        # Try to find where the description starts
+        start_pos = max((first[m] + len(m) for m in self.start_markers if m in first), default=0)
+        
+        # If no markers found, try to find the first paragraph after "Age Grading"
+        if start_pos == 0 and AGE_GRADING_MARKER in first:
             # Skip the Age Grading section
-            support_pos = full_text.find("Support", age_grading_pos)
-            if support_pos != -1:
-                start_pos = support_pos + len("Support")
+            after = bisect_left(supports, first[AGE_GRADING_MARKER])
+            if after < len(supports):
+                start_pos = supports[after] + len(SUPPORT_MARKER)
+        
+        # Find where to stop: the first end marker after the (whitespace-stripped) start
+        tail = full_text[start_pos:]
+        text_start = start_pos + len(tail) - len(tail.lstrip())
+        following = bisect_left(ends, text_start)
+        end_pos = ends[following] if following < len(ends) else len(full_text)
+        return text_start, end_pos
+
+
+@lru_cache(maxsize=None)
+def marker_scanner(language: str = 'en') -> MarkerScanner:
+    """The (cached) scanner for a language code; English markers only for 'en' or unknown codes."""
+    markers = LANGUAGE_MARKERS.get(language, {'start': [], 'end': []})
+    return MarkerScanner(ENGLISH_MARKERS['start'] + markers['start'], ENGLISH_MARKERS['end'] + markers['end'])
+
+
+def extract_course_description(full_text: str, event_name: str, verbose: bool = True,
+                               country_code: Optional[int] = None) -> str:
+    """
+    Extract only the actual course description from the full scraped text.
     
-    # Extract text from start position
-    text_after_marker = full_text[start_pos:].strip()
+    Strategy:
+    1. Look for markers that indicate where the real description starts
+    2. Extract paragraphs after these markers
+    3. Stop when we hit navigation/admin text
+    
+    Common patterns:
+    - Course description comes after "Course Description" heading
+    - Usually starts with descriptive text like "A fast", "The course", "This is"
+    - Ends before "Location of start", "Facilities", "Getting There"
+    
+    The markers of the event's language (by bronze countryCode) are searched
+    as well as the English ones, all in one scan. verbose=False silences the
+    very short/long description warnings.
+    """
+    
+    if not full_text:
+        return ""
     
-    # Find where to stop
-    end_pos = len(text_after_marker)
-    for marker in end_markers:
-        pos = text_after_marker.find(marker)
-        if pos != -1:
-            end_pos = min(end_pos, pos)
+    scanner = marker_scanner(COUNTRY_LANGUAGES.get(country_code, 'en'))
+    start_pos, end_pos = scanner.description_span(full_text)
     
     # Extract the description
-    description = text_after_marker[:end_pos].strip()
+    description = full_text[start_pos:end_pos].strip()
     
     # Clean up
     description = clean_extracted_description(description)
     
     # If description is too short, it's probably not useful
     if len(description) < 50:
-        print(f"  ⚠️  Very short description ({len(description)} chars): {description[:100]}")
+        if verbose:
+            print(f"  ⚠️  Very short description ({len(description)} chars): {description[:100]}")
         return description
     
     # If description is too long (>3000 chars), we probably grabbed too much
-    if len(description) > 3000:
+    if len(description) > 3000 and verbose:
         print(f"  ⚠️  Very long description ({len(description)} chars), may need trimming")
     
     return description
 
 
+def _remove_navigation(text: str) -> str:
+    """Remove the NAV_PHRASES (and the whitespace after them) in one scan."""
+    if FOLDS_TO_ASCII.search(text):
+        return NAV_PATTERN_IGNORECASE.sub('', text)
+    pieces = []
+    last = 0
+    for match in NAV_PATTERN.finditer(text.lower()):
+        pieces.append(text[last:match.start()])
+        last = match.end()
+    if not pieces:
+        return text
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
+
+def _collapse_whitespace(match: re.Match) -> str:
+    return '\n\n' if match.group()[0] == '\n' else ' '
+
+
 def clean_extracted_description(text: str) -> str:
     """
     Clean up the extracted description.
@@ -107,52 +227,30 @@ def clean_extracted_description(text: str) -> str:
     """
     
     # Remove HTML comments
-    text = re.sub(r'extra clearing.*$', '', text, flags=re.DOTALL)
+    comment = text.find(HTML_COMMENT_MARKER)
+    if comment != -1:
+        text = text[:comment]
     
     # Remove navigation text patterns
-    nav_patterns = [
-        r'Course Map\s*',
-        r'Course Description\s*',
-        r'Support\s*',
-        r'parkrun_conditional meta not found\s*',
-        r'SAFETYMESSAGE\s*',
-    ]
-    
-    for pattern in nav_patterns:
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-    
-    # Clean up whitespace
-    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # Max 2 newlines
-    text = re.sub(r'[ \t]+', ' ', text)  # Normalize spaces
+    text = _remove_navigation(text)
+    
+    # Clean up whitespace: max 2 newlines, normalize spaces
+    text = WHITESPACE_PATTERN.sub(_collapse_whitespace, text)
     text = text.strip()
     
     return text
 
 
-def extract_all_descriptions(
-    input_file: str = "parkrun_detail.json",
-    output_file: str = "parkrun_descriptions_extracted.json"
-):
-    """
-    Extract course descriptions from all parkrun events.
+def extract_chunk(events: List[Dict], verbose: bool = True) -> Tuple[List[Dict], Dict]:
     """
+    Extract the course descriptions of a chunk of events.
     
-    print("📝 Extracting Course Descriptions")
-    print("=" * 50)
+    Module-level so it can run in a worker process (see chunked_pool.py).
     
-    # Load data
-    print(f"\n📂 Loading data from {input_file}...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        full_data = json.load(f)
-    
-    events = full_data.get('events', [])
-    metadata = full_data.get('metadata', {})
-    
-    print(f"   Found {len(events)} parkrun events")
-    
-    # Statistics
+    Returns:
+        (events, stats for the chunk)
+    """
     stats = {
-        'total': len(events),
         'extracted': 0,
         'short_descriptions': 0,
         'long_descriptions': 0,
@@ -160,22 +258,16 @@ def extract_all_descriptions(
         'total_chars_before': 0,
         'total_chars_after': 0,
     }
-    
-    # Process each event
-    print("\n🔍 Extracting descriptions...")
-    for i, event in enumerate(events, 1):
+    for event in events:
         name = event['name']
         original_desc = event.get('description', '')
         
-        if i % 100 == 0:
-            print(f"   Progress: {i}/{len(events)}")
-        
         if not original_desc:
             stats['empty'] += 1
             continue
         
         # Extract
-        extracted_desc = extract_course_description(original_desc, name)
+        extracted_desc = extract_course_description(original_desc, name, verbose, event.get('countryCode'))
         
         # Update event
         event['description_original_length'] = len(original_desc)
@@ -195,6 +287,57 @@ def extract_all_descriptions(
                 stats['long_descriptions'] += 1
         else:
             stats['empty'] += 1
+    return events, stats
+
+
+def extract_all_descriptions(
+    input_file: str = "parkrun_detail.json",
+    output_file: str = "parkrun_descriptions_extracted.json",
+    workers: int = 1,
+    silver_file: Optional[str] = SILVER_FILE
+):
+    """
+    Extract course descriptions from all parkrun events.
+    
+    With workers > 1 the events are split into chunks across worker processes
+    (same output, in the same order; per-event warnings are left out).
+    Events without a countryCode (detail files from older scrapes) take it
+    from silver_file, if present, to pick the page language's markers.
+    """
+    
+    print("📝 Extracting Course Descriptions")
+    print("=" * 50)
+    
+    # Load data
+    print(f"\n📂 Loading data from {input_file}...")
+    with open(input_file, 'r', encoding='utf-8') as f:
+        full_data = json.load(f)
+    
+    events = full_data.get('events', [])
+    metadata = full_data.get('metadata', {})
+    
+    print(f"   Found {len(events)} parkrun events")
+    
+    missing_country = [event for event in events if 'countryCode' not in event]
+    if missing_country and silver_file and os.path.exists(silver_file):
+        with open(silver_file, 'r', encoding='utf-8') as f:
+            country_codes = {e.get('slug'): e.get('countryCode') for e in json.load(f).get('events', [])}
+        for event in missing_country:
+            event['countryCode'] = country_codes.get(event.get('slug'))
+        print(f"   Country codes for {len(missing_country)} events from {silver_file}")
+    
+    # Statistics
+    stats = {'total': len(events)}
+    
+    # Process each event
+    print(f"\n🔍 Extracting descriptions ({workers} worker{'s' if workers != 1 else ''})...")
+    start = time.perf_counter()
+    chunks = split_chunks(events, workers)
+    results = map_chunks(extract_chunk, chunks, workers, args=(workers == 1,),
+                         progress=Progress(len(events), "Progress"))
+    events = [event for chunk_events, _ in results for event in chunk_events]
+    stats.update(merge_stats(chunk_stats for _, chunk_stats in results))
+    print(f"   Extracted in {time.perf_counter() - start:.2f}s")
     
     # Calculate reduction
     if stats['total_chars_before'] > 0:
@@ -232,4 +375,10 @@ def extract_all_descriptions(
 
 
 if __name__ == "__main__":
-    extract_all_descriptions()
+    parser = argparse.ArgumentParser(description="Extract the course description from each scraped page text")
+    parser.add_argument('--input', default="parkrun_detail.json", help="Scraped detail JSON")
+    parser.add_argument('--output', default="parkrun_descriptions_extracted.json", help="Output JSON")
+    parser.add_argument('--workers', type=int, nargs='?', const=default_workers(), default=1,
+                        help="Worker processes (no value: one per CPU)")
+    args = parser.parse_args()
+    extract_all_descriptions(args.input, args.output, args.workers)
@@ -0,0 +1,140 @@
+"""
+Persistent cache of reverse geocoding results shared by the data scripts.
+
+clean_data.py (Nominatim) and create_gold_parkrun_data.py (Google) look up
+the same coordinates on every run. Results are stored in a local SQLite
+database keyed by provider and coordinates rounded to 4 decimal places
+(about 11 m). A later run only calls a provider for events whose location
+has changed, or whose result is older than the TTL. "No postcode here"
+answers are cached too, with a shorter TTL. Failed requests are not cached.
+
+Within a run, identical coordinates are looked up once (an event and its
+junior event in the same spot cost one request).
+
+Usage:
+    cache = GeocodeCache('geocode_cache.sqlite')
+    postcode = cache.lookup('nominatim', lat, lng, fetch)   # fetch(lat, lng) -> Optional[str]
+    print(cache.describe())
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+DEFAULT_GEOCODE_CACHE_FILE = 'geocode_cache.sqlite'
+COORD_DECIMALS = 4              # Rounding of the cache key (4 decimals = ~11 m)
+DEFAULT_TTL_DAYS = 365          # Postcodes rarely move
+NOT_FOUND_TTL_DAYS = 30         # Retry "no postcode here" answers sooner
+
+_MISSING = object()  # Sentinel: not in the cache (None is a cached "not found")
+
+
+class GeocodeCache:
+    """SQLite-backed (provider, rounded lat, rounded lon) -> postcode store (thread-safe)."""
+
+    def __init__(self, path: str = DEFAULT_GEOCODE_CACHE_FILE, ttl_days: float = DEFAULT_TTL_DAYS,
+                 not_found_ttl_days: float = NOT_FOUND_TTL_DAYS, decimals: int = COORD_DECIMALS):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.not_found_ttl = not_found_ttl_days * 86400
+        self.decimals = decimals
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocodes (
+                provider TEXT NOT NULL,
+                lat_key INTEGER NOT NULL,
+                lon_key INTEGER NOT NULL,
+                postcode TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (provider, lat_key, lon_key)
+            )
+            """
+        )
+        self._conn.commit()
+        self._run: Dict[Tuple[str, int, int], Optional[str]] = {}  # Answers seen this run
+        self.hits = 0
+        self.deduped = 0
+        self.misses = 0
+        self.expired = 0
+        self.errors = 0
+
+    def key(self, provider: str, lat: float, lon: float) -> Tuple[str, int, int]:
+        scale = 10 ** self.decimals
+        return provider, int(round(float(lat) * scale)), int(round(float(lon) * scale))
+
+    def get(self, provider: str, lat: float, lon: float):
+        """
+        Cached answer for the coordinates.
+
+        Returns:
+            The postcode, None for a cached "not found", or _MISSING if there is
+            no fresh entry
+        """
+        key = self.key(provider, lat, lon)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT postcode, fetched_at FROM geocodes WHERE provider = ? AND lat_key = ? AND lon_key = ?",
+                key
+            ).fetchone()
+        if row is None:
+            return _MISSING
+        postcode, fetched_at = row
+        if time.time() - fetched_at > (self.ttl if postcode else self.not_found_ttl):
+            self.expired += 1
+            return _MISSING
+        return postcode
+
+    def store(self, provider: str, lat: float, lon: float, postcode: Optional[str]):
+        """Insert or replace the answer for the coordinates."""
+        key = self.key(provider, lat, lon)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocodes (provider, lat_key, lon_key, postcode, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                key + (postcode, time.time())
+            )
+            self._conn.commit()
+            self._run[key] = postcode
+
+    def lookup(self, provider: str, lat: float, lon: float,
+               fetch: Callable[[float, float], Optional[str]]) -> Optional[str]:
+        """
+        Postcode for the coordinates: from this run, from disk, or from fetch().
+
+        fetch should raise on failed requests (those answers aren't cached) and
+        return None when the provider has no postcode for the location.
+        """
+        key = self.key(provider, lat, lon)
+        if key in self._run:
+            self.deduped += 1
+            return self._run[key]
+
+        postcode = self.get(provider, lat, lon)
+        if postcode is not _MISSING:
+            self.hits += 1
+            self._run[key] = postcode
+            return postcode
+
+        self.misses += 1
+        try:
+            postcode = fetch(lat, lon)
+        except Exception:
+            self.errors += 1
+            raise
+        self.store(provider, lat, lon, postcode)
+        return postcode
+
+    def describe(self) -> str:
+        return (f"{self.hits} cached, {self.deduped} repeated in this run, "
+                f"{self.misses} requested ({self.expired} expired, {self.errors} failed)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
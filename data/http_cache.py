@@ -0,0 +1,163 @@
+"""
+Persistent on-disk HTTP response cache for the parkrun scrapers.
+
+Every downloaded page is stored in a local SQLite database together with its
+ETag and Last-Modified headers. Later runs revalidate with conditional GETs,
+so unchanged pages come back as 304s and are served from disk. In offline
+("cache-only") mode no network requests are made at all, which lets the
+extraction code be re-run over the whole corpus in seconds.
+
+Usage:
+    cache = ResponseCache('http_cache.sqlite')
+    response = cached_get(session, url, cache)
+    response = cached_get(session, url, cache, offline=True)  # disk only
+"""
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+
+DEFAULT_CACHE_FILE = 'http_cache.sqlite'
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """Raised in offline mode when a URL is not in the cache."""
+
+
+@dataclass
+class CachedResponse:
+    """A response body plus the validators needed to revalidate it."""
+    url: str
+    status_code: int
+    content: bytes
+    encoding: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        """Body decoded the same way requests.Response.text does."""
+        return str(self.content, self.encoding or 'utf-8', errors='replace')
+
+
+class ResponseCache:
+    """SQLite-backed store of response bodies keyed by URL (thread-safe)."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status_code INTEGER NOT NULL,
+                content BLOB NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the stored response for url, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status_code, content, encoding, etag, last_modified, fetched_at "
+                "FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        status_code, content, encoding, etag, last_modified, fetched_at = row
+        return CachedResponse(url, status_code, bytes(content), encoding, etag, last_modified, fetched_at, True)
+
+    def store(self, response: CachedResponse):
+        """Insert or replace the stored response for response.url."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, status_code, content, encoding, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (response.url, response.status_code, response.content, response.encoding,
+                 response.etag, response.last_modified, response.fetched_at)
+            )
+            self._conn.commit()
+
+    def touch(self, url: str):
+        """Record that a cached response was just revalidated."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cached_get(session: requests.Session, url: str, cache: ResponseCache,
+               timeout: float = 10, offline: bool = False) -> CachedResponse:
+    """
+    GET url through the cache.
+
+    - offline: serve from disk only (raises CacheMiss if not cached)
+    - cached with validators: conditional GET, 304 is served from disk
+    - otherwise: normal GET, successful responses are stored
+
+    Raises:
+        requests.RequestException: on connection errors, HTTP error statuses
+                                   and offline cache misses
+    """
+    cached = cache.get(url)
+
+    if offline:
+        if cached is None:
+            cache.misses += 1
+            raise CacheMiss(f"Not in cache (offline mode): {url}")
+        cache.hits += 1
+        return cached
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+    response = session.get(url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and cached is not None:
+        cache.revalidated += 1
+        cache.touch(url)
+        return cached
+
+    response.raise_for_status()
+    cache.misses += 1
+
+    fresh = CachedResponse(
+        url=url,
+        status_code=response.status_code,
+        content=response.content,
+        encoding=response.encoding or response.apparent_encoding,
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'),
+        fetched_at=time.time()
+    )
+    cache.store(fresh)
+    return fresh
@@ -0,0 +1,235 @@
+"""
+Shared HTTP client for every external call in the data pipeline.
+
+One HttpClient wraps pooled keep-alive requests sessions (one per thread,
+connections reused per host) and adds what a plain requests.get lacks:
+- a uniform default timeout
+- bounded retries with jittered exponential backoff on connection errors,
+  timeouts, 429 and 5xx (honouring Retry-After), never faster than the
+  caller's per-host pacing: each retry waits at least min_delay and then
+  for the throttle (e.g. RateController.wait)
+- a circuit breaker per host: after repeated failures a host is skipped
+  for a while instead of timing out on every remaining row
+
+HttpClient.get() takes the same arguments as requests.Session.get(), so a
+client can be passed anywhere the scrapers expect a session.
+
+Usage:
+    client = HttpClient(headers={'User-Agent': '...'})
+    response = client.get(url, params={...})     # retried, pooled, timed out
+    client.hooks['response'].append(hook)        # every response, retries included
+    client.hooks['error'].append(hook)           # every connection error / timeout
+
+    # Retries paced like the caller's own requests to a host
+    client = HttpClient(throttle=rate_controller.wait, min_delay=1.0)
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from host_scheduler import host_key
+from rate_control import parse_retry_after
+
+DEFAULT_TIMEOUT = 10           # Seconds
+DEFAULT_RETRIES = 3            # Extra attempts after the first one
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without making a request while a host's circuit breaker is open."""
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one host.
+
+    closed -> open after failure_threshold failed requests in a row;
+    open -> half-open after reset_timeout seconds (one trial request);
+    half-open -> closed on success, back to open on failure.
+    """
+    failure_threshold: int = 5
+    reset_timeout: float = 60.0
+    failures: int = 0
+    opened_at: Optional[float] = None
+    trial_in_flight: bool = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Whether a request may go out now (claims the half-open trial)."""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """Pooled, retrying, circuit-breaking GET client (thread-safe)."""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, backoff: float = 0.5, max_backoff: float = 30.0,
+                 failure_threshold: int = 5, reset_timeout: float = 60.0, pool_size: int = 10,
+                 throttle: Optional[Callable[[str], None]] = None, min_delay: float = 0.0):
+        """
+        Args:
+            headers: Default headers sent with every request (e.g. User-Agent)
+            timeout: Default (connect, read) timeout in seconds
+            retries: Extra attempts after a failed one (0 disables retries)
+            backoff: Base of the exponential backoff, in seconds
+            max_backoff: Longest single wait between attempts (also caps Retry-After)
+            failure_threshold: Failed requests in a row that open a host's circuit
+            reset_timeout: Seconds an open circuit waits before a trial request
+            pool_size: Keep-alive connections kept per host
+            throttle: Optional callback(host), called before every retry and
+                      expected to block until the host may be requested again
+                      (e.g. RateController.wait). The first attempt is paced
+                      by the caller, which has already claimed its slot.
+            min_delay: Shortest wait between two attempts, in seconds (the
+                       caller's minimum delay between requests to one host)
+        """
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.pool_size = pool_size
+        self.throttle = throttle
+        self.min_delay = min_delay
+        # 'response': hook(response) for every response (like requests' hooks)
+        # 'error': hook(url, exception) for every attempt that got no response
+        self.hooks: Dict[str, List[Callable]] = {'response': [], 'error': []}
+        self.retried = 0
+        self.short_circuited = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """This thread's pooled session (requests sessions aren't thread-safe)."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.hooks['response'] = self.hooks['response']  # Shared list, later hooks apply too
+            self._local.session = session
+        return session
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _backoff_delay(self, attempt: int, response: Optional[requests.Response],
+                       min_delay: float = 0.0) -> float:
+        """
+        Full-jitter exponential backoff, or Retry-After if the server asked for
+        longer; never less than min_delay.
+        """
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return max(min(delay, self.max_backoff), min_delay)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+            throttle: Optional[Callable[[str], None]] = None, min_delay: Optional[float] = None,
+            **kwargs) -> requests.Response:
+        """
+        GET url like requests.Session.get, with retries and circuit breaking.
+
+        Retryable failures (connection errors, timeouts, 429, 5xx) are retried
+        up to `retries` times. If they persist, the last response is returned
+        (callers still see the error status) or the last exception is raised.
+        Each retry sleeps the backoff (at least min_delay), then calls
+        throttle(host); both default to the client's.
+
+        Raises:
+            CircuitOpenError: host has failed repeatedly and is being skipped
+            requests.RequestException: connection error/timeout on the last attempt
+        """
+        host = host_key(url)
+        breaker = self.breaker(host)
+        with self._lock:
+            allowed = breaker.allow()
+            if not allowed:
+                self.short_circuited += 1
+        if not allowed:
+            raise CircuitOpenError(f"Circuit open for {host} after {breaker.failures} failures, skipping {url}")
+
+        timeout = self.timeout if timeout is None else timeout
+        throttle = self.throttle if throttle is None else throttle
+        min_delay = self.min_delay if min_delay is None else min_delay
+        attempt = 0
+        while True:
+            response = None
+            error: Optional[requests.RequestException] = None
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+                for hook in self.hooks['error']:
+                    hook(url, e)
+
+            failed = error is not None or response.status_code in RETRY_STATUSES
+            if not failed or attempt >= self.retries:
+                with self._lock:
+                    if failed:
+                        breaker.failure()
+                    else:
+                        breaker.success()
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff_delay(attempt, response, min_delay)
+            if response is not None:
+                response.close()  # Give the connection back to the pool
+            time.sleep(delay)
+            if throttle is not None:
+                throttle(host)
+            attempt += 1
+            with self._lock:
+                self.retried += 1
+
+    def close(self):
+        """Close this thread's session."""
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            session.close()
+            self._local.session = None
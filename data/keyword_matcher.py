@@ -0,0 +1,108 @@
+"""
+Keyword matcher compiled once from keywords.json.
+
+analyze_accessibility.find_keyword_matches used to build and run one
+'\\bkeyword\\b' regex per keyword per event (~200 keywords x ~2,750 events).
+KeywordMatcher merges every normalized keyword into one trie regex (see
+trie_regex.py) and finds all of them in a single scan of each description:
+the scan visits every position where some keyword starts, and the keywords
+found there (the longest one and the other keywords that are its prefixes)
+are kept if they have a word boundary on both sides. The result is the same
+list of matches, in keywords.json order, as the per-keyword regexes.
+
+Usage:
+    matcher = KeywordMatcher(load_keywords('keywords.json'))
+    matches = matcher.find(description)     # [{'keyword', 'category', 'subcategory', 'impacts'}, ...]
+
+    python benchmark_keywords.py            # parity check and timing against the per-keyword regexes
+"""
+
+import re
+from typing import Dict, List, Set, Tuple
+
+from trie_regex import trie_pattern
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for keyword matching."""
+    # Convert to lowercase
+    text = text.lower()
+    # Replace common variations
+    text = _WHITESPACE.sub(' ', text)  # Normalize whitespace
+    return text
+
+
+def _is_word(char: str) -> bool:
+    """Same test as the regex \\w for str patterns."""
+    return char.isalnum() or char == '_'
+
+
+def _at_boundary(text: str, index: int) -> bool:
+    """Whether \\b matches at text[index]."""
+    before = index > 0 and _is_word(text[index - 1])
+    after = index < len(text) and _is_word(text[index])
+    return before != after
+
+
+class KeywordMatcher:
+    """All keywords of a keywords.json config, compiled into one word-boundary scan."""
+
+    def __init__(self, keywords_config: Dict):
+        # (keyword as written, category, subcategory, impacts, normalized keyword), in config order
+        self.entries: List[Tuple[str, str, str, Dict, str]] = []
+        for category_name, category_data in keywords_config.items():
+            if category_name == 'metadata':
+                continue
+            for subcategory_name, subcategory_data in category_data.items():
+                impacts = subcategory_data.get('impact', {})
+                for keyword_phrase in subcategory_data.get('keywords', []):
+                    self.entries.append((keyword_phrase, category_name, subcategory_name,
+                                         impacts, normalize_text(keyword_phrase)))
+
+        phrases = sorted({entry[4] for entry in self.entries if entry[4]})
+        # Keywords found at a position: the longest one and those that are its prefixes
+        self.prefixes = {p: [(q, len(q)) for q in phrases if p.startswith(q)] for p in phrases}
+        self.pattern = re.compile(trie_pattern(phrases)) if phrases else None
+        self.has_empty = any(not entry[4] for entry in self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def found_keywords(self, normalized: str) -> Set[str]:
+        """Normalized keywords that occur in normalized text with a word boundary on both sides."""
+        found: Set[str] = set()
+        if self.has_empty and any(_at_boundary(normalized, i) for i in range(len(normalized) + 1)):
+            found.add('')
+        if self.pattern is None:
+            return found
+        match = self.pattern.search(normalized)
+        while match:
+            start = match.start()
+            if _at_boundary(normalized, start):
+                for keyword, length in self.prefixes[match.group()]:
+                    if keyword not in found and _at_boundary(normalized, start + length):
+                        found.add(keyword)
+            # Resume right after the match start: keywords can overlap ("gravel path" + "path")
+            match = self.pattern.search(normalized, start + 1)
+        return found
+
+    def find(self, description: str) -> List[Dict]:
+        """
+        All keyword matches in a description (same output as re.search with
+        '\\b' + keyword + '\\b' for each keyword in turn).
+        """
+        if not description:
+            return []
+        found = self.found_keywords(normalize_text(description))
+        return [
+            {
+                'keyword': keyword_phrase,
+                'category': category_name,
+                'subcategory': subcategory_name,
+                'impacts': impacts
+            }
+            for keyword_phrase, category_name, subcategory_name, impacts, normalized in self.entries
+            if normalized in found
+        ]
@@ -0,0 +1,238 @@
+"""
+Mine the scraped descriptions for template text shared by many events.
+
+boilerplate.txt is maintained by hand, so template paragraphs parkrun adds
+or rewords slip through into the cleaned descriptions. This script makes one
+streaming pass over the detail data. It hashes every normalized paragraph
+and sentence (whitespace collapsed, blake2b) and counts how many events each
+hash appears in (once per event, however often the event repeats it). Every
+paragraph or sentence shared by at least the threshold number of events is
+written to generated_boilerplate.txt.
+That file uses the same format as boilerplate.txt (one phrase per block,
+separated by blank lines), and clean_data.py loads it after the hand-written
+list.
+
+Memory stays proportional to the number of distinct paragraphs/sentences,
+not the corpus size: only 8-byte digests are counted, and the text of a hash
+is kept from the second event it appears in.
+
+Usage:
+    python mine_boilerplate.py                                  # parkrun_detail.json
+    python mine_boilerplate.py --input parkrun_detail.journal.jsonl
+    python mine_boilerplate.py --min-fraction 0.05 --min-chars 40 --show 20
+
+Output:
+    generated_boilerplate.txt - Phrases shared by many events (paragraphs, then sentences)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import time
+from typing import Dict, Iterator, List, Tuple
+
+INPUT_FILE = 'parkrun_detail.json'
+OUTPUT_FILE = 'generated_boilerplate.txt'
+MIN_EVENTS = 5            # Never call something boilerplate with fewer events than this
+MIN_FRACTION = 0.02       # ... or than this fraction of all events
+MIN_CHARS = 30            # Ignore shorter paragraphs/sentences ("Course Map", "Yes.")
+READ_CHUNK = 1 << 20      # Bytes read at a time when streaming a .json file
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(])')
+
+
+def iter_events(path: str) -> Iterator[Dict]:
+    """
+    Stream the events of a parkrun_detail.json (or of a JSONL journal) one at a time.
+
+    The .json file is decoded event by event from a rolling buffer, so the
+    whole file is never held in memory as one string or object tree.
+    """
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Partial last line of an interrupted run
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        # Skip ahead to the start of the events array
+        while True:
+            chunk = f.read(READ_CHUNK)
+            buffer += chunk
+            match = re.search(r'"events"\s*:\s*\[', buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            if not chunk:
+                return
+            buffer = buffer[-64:]  # Keep enough to match a key split across chunks
+
+        position = 0
+        while True:
+            # Skip separators between events
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer):
+                    break
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    return
+                buffer, position = chunk, 0
+            if buffer[position] == ']':
+                return
+            try:
+                event, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    raise
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield event
+            position = end
+            if position > READ_CHUNK:
+                buffer, position = buffer[position:], 0
+
+
+def normalize(text: str) -> str:
+    """Collapse whitespace runs to one space (same as re.sub(r'\\s+', ' ', text).strip())."""
+    return ' '.join(text.split())
+
+
+def digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+
+def split_units(description: str, min_chars: int = MIN_CHARS) -> List[Tuple[str, str]]:
+    """
+    Paragraphs and sentences of a description worth counting.
+
+    Returns:
+        List of (kind, text) with kind 'paragraph' or 'sentence'; text is the
+        original (stripped) wording, so it can be removed verbatim later
+    """
+    units = []
+    for paragraph in description.split('\n\n'):
+        paragraph = paragraph.strip()
+        if len(paragraph) < min_chars:
+            continue
+        units.append(('paragraph', paragraph))
+        sentences = SENTENCE_BREAK.split(paragraph)
+        if len(sentences) > 1:
+            units.extend(('sentence', s.strip()) for s in sentences if len(s.strip()) >= min_chars)
+    return units
+
+
+class BoilerplateMiner:
+    """Counts, per normalized paragraph/sentence hash, the number of events containing it."""
+
+    def __init__(self, min_chars: int = MIN_CHARS):
+        self.min_chars = min_chars
+        self.events = 0
+        self.units = 0
+        self.counts: Dict[bytes, int] = {}
+        self.texts: Dict[bytes, Tuple[str, str]] = {}  # Only for hashes seen in 2+ events
+
+    def add(self, description: str):
+        """Count one event's description."""
+        self.events += 1
+        seen = set()
+        for kind, text in split_units(description, self.min_chars):
+            key = digest(normalize(text))
+            if key in seen:
+                continue
+            seen.add(key)
+            self.units += 1
+            count = self.counts.get(key, 0) + 1
+            self.counts[key] = count
+            if count == 2:
+                self.texts[key] = (kind, text)
+
+    def threshold(self, min_events: int = MIN_EVENTS, min_fraction: float = MIN_FRACTION) -> int:
+        return max(min_events, math.ceil(min_fraction * self.events))
+
+    def boilerplate(self, min_events: int = MIN_EVENTS,
+                    min_fraction: float = MIN_FRACTION) -> List[Tuple[int, str, str]]:
+        """
+        Paragraphs and sentences shared by at least threshold() events.
+
+        A sentence is left out when it only ever occurs inside a selected
+        paragraph (same event count), since removing the paragraph removes it.
+
+        Returns:
+            List of (event count, kind, text): paragraphs first, then sentences,
+            each most common first (clean_data removes phrases in this order, so
+            whole paragraphs go before any sentence could break them up)
+        """
+        threshold = self.threshold(min_events, min_fraction)
+        selected = [(self.counts[key], kind, text) for key, (kind, text) in self.texts.items()
+                    if self.counts[key] >= threshold]
+        paragraphs = [(count, text) for count, kind, text in selected if kind == 'paragraph']
+
+        result = []
+        for count, kind, text in selected:
+            if kind == 'sentence' and any(text in p and count <= p_count for p_count, p in paragraphs):
+                continue
+            result.append((count, kind, text))
+        result.sort(key=lambda item: (item[1] != 'paragraph', -item[0], item[2]))
+        return result
+
+
+def save_boilerplate(phrases: List[str], filename: str = OUTPUT_FILE):
+    """Write phrases in boilerplate.txt format (blocks separated by blank lines)."""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('\n\n'.join(phrases) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate boilerplate phrases from text shared by many events")
+    parser.add_argument('--input', default=INPUT_FILE, help="parkrun_detail.json or a .jsonl journal")
+    parser.add_argument('--output', default=OUTPUT_FILE, help=f"Generated boilerplate file (default: {OUTPUT_FILE})")
+    parser.add_argument('--min-events', type=int, default=MIN_EVENTS,
+                        help=f"Minimum number of events sharing a phrase (default: {MIN_EVENTS})")
+    parser.add_argument('--min-fraction', type=float, default=MIN_FRACTION,
+                        help=f"Minimum fraction of events sharing a phrase (default: {MIN_FRACTION})")
+    parser.add_argument('--min-chars', type=int, default=MIN_CHARS,
+                        help=f"Ignore paragraphs/sentences shorter than this (default: {MIN_CHARS})")
+    parser.add_argument('--show', type=int, default=10, help="Print the N most common phrases")
+    args = parser.parse_args()
+
+    print("⛏️  Boilerplate Mining")
+    print("=" * 50)
+
+    miner = BoilerplateMiner(args.min_chars)
+    start = time.perf_counter()
+    for event in iter_events(args.input):
+        if event.get('description'):
+            miner.add(event['description'])
+    elapsed = time.perf_counter() - start
+
+    print(f"📄 {miner.events} descriptions, {miner.units} paragraphs/sentences, "
+          f"{len(miner.counts)} distinct ({elapsed:.2f}s)")
+
+    found = miner.boilerplate(args.min_events, args.min_fraction)
+    threshold = miner.threshold(args.min_events, args.min_fraction)
+    paragraphs = sum(1 for _, kind, _ in found if kind == 'paragraph')
+    print(f"🔁 {len(found)} phrases shared by {threshold}+ events "
+          f"({paragraphs} paragraphs, {len(found) - paragraphs} sentences)")
+
+    for count, kind, text in found[:args.show]:
+        preview = text if len(text) <= 80 else text[:77] + '...'
+        print(f"   {count:>5} {kind:<9} {preview}")
+
+    save_boilerplate([text for _, _, text in found], args.output)
+    print(f"\n✅ Saved to {args.output} (loaded by clean_data.py after boilerplate.txt)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+Local stand-in for the parkrun course pages, for offline scraper benchmarks.
+
+Starts one HTTP server per simulated parkrun host (www.parkrun.org.uk,
+www.parkrun.dk, ...) on consecutive ports, so the scrapers' per-host
+scheduling sees as many hosts as the real run. Every server answers
+GET /{slug}/course with a recorded page (from the response cache, the page
+archive or a folder of saved .html files) or, without a corpus, a synthetic
+course page.
+
+Server behaviour is configurable to exercise the scrapers under load:
+- latency (plus random jitter) before each response
+- injected 429 Too Many Requests (with Retry-After) and 5xx errors
+- ETag / Last-Modified headers and 304 Not Modified on conditional GETs
+
+GET /__stats returns the per-server request log summary as JSON and
+GET /__reset clears it.
+
+Usage:
+    python mock_parkrun_server.py --hosts 20                      # synthetic pages on ports 8800-8819
+    python mock_parkrun_server.py --cache http_cache.sqlite --latency-ms 80 --jitter-ms 40
+    python mock_parkrun_server.py --html-dir pages/ --throttle-rate 0.05 --error-rate 0.02
+    python mock_parkrun_server.py --archive course_pages.archive
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from http_cache import DEFAULT_CACHE_FILE
+from page_archive import PageArchive
+
+DEFAULT_PORT = 8800
+DEFAULT_HOSTS = 10
+LAST_MODIFIED = formatdate(1760572800, usegmt=True)  # Fixed, so revalidation gives 304s
+
+
+@dataclass
+class MockConfig:
+    """How the mock servers misbehave."""
+    latency_ms: float = 0.0      # Delay before every response
+    jitter_ms: float = 0.0       # Extra uniform random delay (0..jitter_ms)
+    throttle_rate: float = 0.0   # Fraction of page requests answered with 429
+    error_rate: float = 0.0      # Fraction of page requests answered with a 5xx
+    retry_after: int = 1         # Retry-After seconds sent with 429s
+    seed: int = 0                # Random seed (each host gets seed + host index)
+
+
+class RequestLog:
+    """Per-server request statistics (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latencies: List[float] = []
+            self.statuses: Dict[int, int] = {}
+            self.bytes_sent = 0
+
+    def record(self, status: int, latency: float, size: int):
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes_sent += size
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': len(self.latencies),
+                'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+                'bytes_sent': self.bytes_sent,
+                'latencies': list(self.latencies),
+            }
+
+
+def load_corpus(cache_path: Optional[str] = None, html_dir: Optional[str] = None,
+                archive_path: Optional[str] = None) -> Dict[str, bytes]:
+    """
+    Load recorded course pages keyed by URL path ('/{slug}/course').
+
+    Pages come from the scrapers' response cache, the page archive or a
+    directory of saved .html files (file name without extension is used as
+    the slug).
+    """
+    pages: Dict[str, bytes] = {}
+    if html_dir:
+        for path in sorted(Path(html_dir).glob('*.html')):
+            pages[f"/{path.stem}/course"] = path.read_bytes()
+    elif archive_path:
+        archive = PageArchive(archive_path)
+        for url, content in archive.iter_pages():
+            pages[urlparse(url).path] = content
+        archive.close()
+    elif cache_path and Path(cache_path).exists():
+        conn = sqlite3.connect(cache_path)
+        for url, content in conn.execute("SELECT url, content FROM responses WHERE status_code = 200"):
+            pages[urlparse(url).path] = bytes(content)
+        conn.close()
+    return pages
+
+
+def synthetic_page(slug: str, paragraphs: int = 12) -> bytes:
+    """A deterministic parkrun-like course page for slug."""
+    rng = random.Random(slug)
+    words = ['path', 'tarmac', 'gravel', 'grass', 'lake', 'loop', 'hill', 'gentle', 'slope', 'finish',
+             'start', 'bridge', 'woodland', 'flat', 'steps', 'car', 'park', 'cafe', 'toilets', 'marshal']
+    body = []
+    for _ in range(paragraphs):
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(12, 40)))
+        body.append(f"<p>{sentence.capitalize()}.</p>")
+    area = ''.join(rng.choice('ABCDEFGHJKLMNPRSTUWY') for _ in range(2))
+    postcode = f"{area}{rng.randint(1, 20)} {rng.randint(1, 9)}{rng.choice('ABDEFGHJLNPQRSTUWXYZ')}{rng.choice('ABDEFGHJLNPQRSTUWXYZ')}"
+    name = slug.replace('-', ' ').title()
+    html = f"""<!DOCTYPE html>
+<html><head><title>Course | {name} parkrun</title></head>
+<body>
+<nav><ul><li><a href="/">Home</a></li><li><a href="/{slug}/results/">Results</a></li></ul></nav>
+<div id="primary">
+<h1>{name} parkrun</h1>
+<h2>Course Description</h2>
+{''.join(body)}
+<h2>Getting there by road</h2>
+<p>Parking is available on site. Postcode for satnav: {postcode}.</p>
+<iframe src="https://www.google.com/maps/d/embed?mid={hashlib.md5(slug.encode()).hexdigest()}" width="640" height="480"></iframe>
+</div>
+<footer><p>parkrun is a registered trademark.</p></footer>
+</body></html>"""
+    return html.encode('utf-8')
+
+
+class MockParkrunServer(ThreadingHTTPServer):
+    """One simulated parkrun host."""
+    daemon_threads = True
+
+    def __init__(self, address, pages: Dict[str, bytes], config: MockConfig, host_index: int):
+        super().__init__(address, MockParkrunHandler)
+        self.pages = pages
+        self.fallback_pages = [pages[path] for path in sorted(pages)]
+        self.config = config
+        self.log = RequestLog()
+        self._rng = random.Random(config.seed + host_index)
+        self._rng_lock = threading.Lock()
+
+    def random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def page_for(self, path: str) -> Optional[bytes]:
+        """Recorded page for path; any other /{slug}/course gets a stand-in page."""
+        if path in self.pages:
+            return self.pages[path]
+        parts = path.strip('/').split('/')
+        if len(parts) != 2 or parts[1] != 'course':
+            return None
+        if self.fallback_pages:
+            digest = int(hashlib.md5(parts[0].encode('utf-8')).hexdigest()[:8], 16)
+            return self.fallback_pages[digest % len(self.fallback_pages)]
+        return synthetic_page(parts[0])
+
+
+class MockParkrunHandler(BaseHTTPRequestHandler):
+    server: MockParkrunServer
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real servers
+
+    def do_GET(self):
+        started = time.perf_counter()
+        path = urlparse(self.path).path
+
+        if path == '/__stats':
+            self._send(200, json.dumps(self.server.log.snapshot()).encode('utf-8'), 'application/json')
+            return
+        if path == '/__reset':
+            self.server.log.reset()
+            self._send(200, b'{}', 'application/json')
+            return
+
+        config = self.server.config
+        delay = config.latency_ms + config.jitter_ms * self.server.random()
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = self.server.random()
+        if roll < config.throttle_rate:
+            status, body = 429, b'Too Many Requests'
+            headers = {'Retry-After': str(config.retry_after)}
+        elif roll < config.throttle_rate + config.error_rate:
+            status, body, headers = (500, 502, 503)[int(self.server.random() * 3)], b'Server Error', {}
+        else:
+            page = self.server.page_for(path)
+            if page is None:
+                status, body, headers = 404, b'Not Found', {}
+            else:
+                etag = '"' + hashlib.md5(page).hexdigest() + '"'
+                headers = {'ETag': etag, 'Last-Modified': LAST_MODIFIED}
+                if self.headers.get('If-None-Match') == etag:
+                    status, body = 304, b''
+                else:
+                    status, body = 200, page
+
+        self._send(status, body, 'text/html; charset=utf-8', headers)
+        self.server.log.record(status, time.perf_counter() - started, len(body))
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+
+def start_servers(pages: Dict[str, bytes], hosts: int = DEFAULT_HOSTS, port: int = DEFAULT_PORT,
+                  config: Optional[MockConfig] = None, bind: str = '127.0.0.1') -> List[MockParkrunServer]:
+    """
+    Start one server per simulated host on ports port .. port + hosts - 1.
+
+    Each server runs in its own daemon thread; call shutdown() to stop it.
+    """
+    config = config or MockConfig()
+    servers = []
+    for index in range(hosts):
+        server = MockParkrunServer((bind, port + index), pages, config, index)
+        threading.Thread(target=server.serve_forever, name=f'mock-host-{index}', daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve parkrun-like course pages locally for benchmarks")
+    parser.add_argument('--hosts', type=int, default=DEFAULT_HOSTS, help="Number of simulated parkrun hosts")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="First port (one port per host)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE, help="Serve pages recorded in this response cache")
+    parser.add_argument('--html-dir', help="Serve *.html files from this directory instead")
+    parser.add_argument('--archive', help="Serve the pages of this page archive instead")
+    parser.add_argument('--synthetic', action='store_true', help="Ignore any recorded corpus, generate pages")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Delay before every response")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Extra random delay (0..N ms)")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 5xx")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for latency and error injection")
+    args = parser.parse_args()
+
+    pages = {} if args.synthetic else load_corpus(args.cache, args.html_dir, args.archive)
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.throttle_rate, args.error_rate,
+                        args.retry_after, args.seed)
+    servers = start_servers(pages, args.hosts, args.port, config)
+
+    corpus = f"{len(pages)} recorded pages" if pages else "synthetic pages"
+    print(f"🧪 Mock parkrun: {args.hosts} hosts on ports {args.port}-{args.port + args.hosts - 1}, {corpus}")
+    print("ready", flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Offline reverse geocoding: nearest postcode centroid from a local file.
+
+clean_data.py (Nominatim, 1 request/second) and create_gold_parkrun_data.py
+(Google Geocoding API) look up a postcode for every event's coordinates on
+every run. With a postcode centroid file dropped into data/ the same lookups
+are answered locally for all events in one batch; the online geocoders are
+only asked for events the file doesn't cover.
+
+Supported centroid files (format detected from the header):
+- ONS Postcode Directory CSV (columns pcds, lat, long; terminated postcodes
+  are skipped)
+- GeoNames postal code dump (allCountries.txt / GB_full.txt: tab-separated,
+  no header, postal code in column 2, latitude/longitude in columns 10/11)
+- any CSV with postcode and lat/lon (or latitude/longitude) columns
+
+Points are indexed as unit vectors on the sphere, so straight-line (chord)
+nearest neighbours are exactly the great-circle nearest neighbours. The
+index is scipy's cKDTree when scipy is installed, else a small numpy
+KD-tree. Parsed files are cached next to the source as .npz.
+
+Usage:
+    geocoder = load_geocoder()                        # None if there is no centroid file
+    postcodes = geocoder.nearest_postcodes([(51.41, -0.34), (53.80, -1.55)])
+
+    python offline_geocoder.py --lat 51.4103 --lon -0.3375
+    python offline_geocoder.py --file ONSPD_FEB_2025_UK.csv --benchmark silver_data.json
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # numpy KD-tree fallback
+    cKDTree = None
+
+DEFAULT_CENTROIDS_FILE = 'postcode_centroids.csv'
+EARTH_RADIUS_KM = 6371.0088
+MAX_DISTANCE_KM = 5.0   # Farther than this from any centroid: no offline answer
+LEAF_SIZE = 32          # Points per leaf of the numpy KD-tree
+
+
+def to_unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """(N,) latitudes/longitudes in degrees -> (N, 3) points on the unit sphere."""
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Straight-line distance between unit vectors -> great-circle distance in km."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class NumpyKDTree:
+    """
+    Minimal static KD-tree for (N, 3) points: nearest neighbour only.
+
+    Stand-in for scipy.spatial.cKDTree (same query() return values) when
+    scipy isn't installed. Built with numpy partitions, queried per point.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        self.points = points
+        self.order = np.arange(len(points))
+        # Node arrays: split axis (-1 for leaves), split value, children, leaf slice
+        self.axis: List[int] = []
+        self.split: List[float] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.bounds: List[Tuple[int, int]] = []
+        if len(points):
+            self._build(leaf_size)
+
+    def _new_node(self, start: int, end: int) -> int:
+        self.axis.append(-1)
+        self.split.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.bounds.append((start, end))
+        return len(self.axis) - 1
+
+    def _build(self, leaf_size: int):
+        stack = [self._new_node(0, len(self.points))]
+        while stack:
+            node = stack.pop()
+            start, end = self.bounds[node]
+            if end - start <= leaf_size:
+                continue
+            indices = self.order[start:end]
+            coords = self.points[indices]
+            axis = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+            middle = (end - start) // 2
+            partition = np.argpartition(coords[:, axis], middle)
+            self.order[start:end] = indices[partition]
+            self.axis[node] = axis
+            self.split[node] = float(self.points[self.order[start + middle], axis])
+            self.left[node] = self._new_node(start, start + middle)
+            self.right[node] = self._new_node(start + middle, end)
+            stack.extend((self.left[node], self.right[node]))
+
+    def _query_one(self, point: np.ndarray, max_distance: float) -> Tuple[float, int]:
+        best_distance, best_index = max_distance, len(self.points)
+        heap = [(0.0, 0)]  # (lower bound of the distance to the node's region, node)
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if bound >= best_distance:
+                break
+            axis = self.axis[node]
+            if axis < 0:
+                start, end = self.bounds[node]
+                indices = self.order[start:end]
+                distances = np.sqrt(((self.points[indices] - point) ** 2).sum(axis=1))
+                nearest = int(np.argmin(distances))
+                if distances[nearest] < best_distance:
+                    best_distance, best_index = float(distances[nearest]), int(indices[nearest])
+                continue
+            offset = point[axis] - self.split[node]
+            near, far = (self.left[node], self.right[node]) if offset < 0 else (self.right[node], self.left[node])
+            heapq.heappush(heap, (bound, near))
+            heapq.heappush(heap, (max(bound, abs(offset)), far))
+        return best_distance, best_index
+
+    def query(self, points: np.ndarray, distance_upper_bound: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest neighbour of every query point (like cKDTree.query with k=1).
+
+        Returns:
+            (distances, indices); inf and len(points) where nothing is within the bound
+        """
+        results = [self._query_one(point, distance_upper_bound) for point in points]
+        distances = np.array([d for d, _ in results], dtype=float)
+        indices = np.array([i for _, i in results], dtype=int)
+        distances[indices == len(self.points)] = np.inf
+        return distances, indices
+
+
+def _column(header: List[str], *names: str) -> Optional[int]:
+    lowered = [name.strip().lower() for name in header]
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+    return None
+
+
+def read_centroids(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Parse a centroid file.
+
+    Returns:
+        (postcodes, latitudes, longitudes) arrays
+
+    Raises:
+        ValueError: if the file's columns aren't recognised
+    """
+    postcodes: List[str] = []
+    lats: List[float] = []
+    lons: List[float] = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        first = f.readline()
+        f.seek(0)
+        if '\t' in first:
+            # GeoNames: country, postal code, place, admin1..3 (name, code), lat, lon, accuracy
+            for row in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+                if len(row) >= 11 and row[1]:
+                    postcodes.append(row[1])
+                    lats.append(float(row[9]))
+                    lons.append(float(row[10]))
+        else:
+            reader = csv.reader(f)
+            header = next(reader)
+            code = _column(header, 'pcds', 'postcode', 'postal_code', 'pcd')
+            lat = _column(header, 'lat', 'latitude')
+            lon = _column(header, 'long', 'lon', 'lng', 'longitude')
+            terminated = _column(header, 'doterm')
+            if code is None or lat is None or lon is None:
+                raise ValueError(f"{path}: expected postcode and lat/lon columns, got {header[:10]}")
+            for row in reader:
+                if terminated is not None and row[terminated].strip():
+                    continue
+                try:
+                    latitude, longitude = float(row[lat]), float(row[lon])
+                except (ValueError, IndexError):
+                    continue
+                if abs(latitude) > 90:
+                    continue  # ONSPD uses 99.999999 for postcodes without a grid reference
+                postcodes.append(row[code].strip())
+                lats.append(latitude)
+                lons.append(longitude)
+    return np.array(postcodes), np.array(lats, dtype=float), np.array(lons, dtype=float)
+
+
+def load_centroids(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """read_centroids through a .npz cache (rebuilt when the source file changes)."""
+    cache = path + '.npz'
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        with np.load(cache) as data:
+            return data['postcodes'], data['lats'], data['lons']
+    postcodes, lats, lons = read_centroids(path)
+    try:
+        with open(cache + '.tmp', 'wb') as f:
+            np.savez(f, postcodes=postcodes, lats=lats, lons=lons)
+        os.replace(cache + '.tmp', cache)
+    except OSError:
+        pass  # Read-only directory: parse again next time
+    return postcodes, lats, lons
+
+
+class OfflineGeocoder:
+    """Nearest postcode centroid for batches of coordinates."""
+
+    def __init__(self, postcodes: np.ndarray, lats: np.ndarray, lons: np.ndarray, source: str = ''):
+        self.postcodes = postcodes
+        self.source = source
+        points = to_unit_vectors(lats, lons)
+        self.index = cKDTree(points) if cKDTree is not None else NumpyKDTree(points)
+        self.lookups = 0
+        self.found = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> 'OfflineGeocoder':
+        postcodes, lats, lons = load_centroids(path)
+        return cls(postcodes, lats, lons, source=path)
+
+    def __len__(self) -> int:
+        return len(self.postcodes)
+
+    def nearest(self, coordinates: Sequence[Tuple[float, float]],
+                max_km: float = MAX_DISTANCE_KM) -> List[Tuple[Optional[str], Optional[float]]]:
+        """
+        Nearest centroid of every (lat, lon) pair, in one batch.
+
+        Returns:
+            (postcode, distance in km) per pair; (None, None) if no centroid
+            is within max_km
+        """
+        if not len(coordinates):
+            return []
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        chords, indices = self.index.query(to_unit_vectors(coords[:, 0], coords[:, 1]),
+                                           distance_upper_bound=km_to_chord(max_km))
+        distances = chord_to_km(np.where(np.isfinite(chords), chords, 0))
+        results = []
+        for chord, index, km in zip(chords, indices, distances):
+            if np.isfinite(chord):
+                results.append((str(self.postcodes[index]), round(float(km), 3)))
+            else:
+                results.append((None, None))
+        self.lookups += len(results)
+        self.found += sum(1 for postcode, _ in results if postcode)
+        return results
+
+    def nearest_postcodes(self, coordinates: Sequence[Tuple[float, float]],
+                          max_km: float = MAX_DISTANCE_KM) -> List[Optional[str]]:
+        """Like nearest(), postcodes only."""
+        return [postcode for postcode, _ in self.nearest(coordinates, max_km)]
+
+
+def load_geocoder(path: str = DEFAULT_CENTROIDS_FILE) -> Optional[OfflineGeocoder]:
+    """The offline geocoder for path, or None (with a note) if the file isn't there."""
+    if not os.path.exists(path):
+        print(f"ℹ️  No postcode centroid file ({path}) - using online geocoding only")
+        return None
+    start = time.perf_counter()
+    geocoder = OfflineGeocoder.from_file(path)
+    print(f"🗺️  Offline geocoder: {len(geocoder)} postcode centroids from {path} "
+          f"({time.perf_counter() - start:.1f}s)")
+    return geocoder
+
+
+def event_coordinates(event: dict) -> Optional[Tuple[float, float]]:
+    """(lat, lon) of an event: silver [lon, lat] lists or {'lat', 'lng'} dicts."""
+    coords = event.get('coordinates')
+    if isinstance(coords, (list, tuple)) and len(coords) == 2:
+        lon, lat = coords
+    elif isinstance(coords, dict):
+        lat, lon = coords.get('lat'), coords.get('lng', coords.get('lon'))
+    else:
+        return None
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nearest postcode from a local centroid file")
+    parser.add_argument('--file', default=DEFAULT_CENTROIDS_FILE, help="Postcode centroid file")
+    parser.add_argument('--lat', type=float, help="Latitude to look up")
+    parser.add_argument('--lon', type=float, help="Longitude to look up")
+    parser.add_argument('--max-km', type=float, default=MAX_DISTANCE_KM, help="Maximum distance to a centroid")
+    parser.add_argument('--benchmark', metavar='EVENTS_JSON',
+                        help="Look up every event in a silver/bronze JSON in one batch and time it")
+    args = parser.parse_args()
+
+    geocoder = load_geocoder(args.file)
+    if geocoder is None:
+        return
+
+    if args.lat is not None and args.lon is not None:
+        (postcode, km), = geocoder.nearest([(args.lat, args.lon)], args.max_km)
+        print(f"📮 {postcode} ({km} km)" if postcode else f"❌ No postcode within {args.max_km} km")
+
+    if args.benchmark:
+        with open(args.benchmark, 'r', encoding='utf-8') as f:
+            events = json.load(f)['events']
+        coordinates = [c for c in map(event_coordinates, events) if c is not None]
+        start = time.perf_counter()
+        results = geocoder.nearest(coordinates, args.max_km)
+        elapsed = time.perf_counter() - start
+        found = [km for postcode, km in results if postcode]
+        print(f"⏱️  {len(coordinates)} lookups in {elapsed * 1000:.1f} ms, {len(found)} within {args.max_km} km"
+              + (f" (median {float(np.median(found)):.2f} km)" if found else ""))
+
+
+if __name__ == '__main__':
+    main()
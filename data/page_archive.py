@@ -0,0 +1,352 @@
+"""
+Append-only compressed archive of raw parkrun course pages.
+
+Only the extracted description ends up in the JSON outputs, so without the
+raw HTML every change to the extraction code needs a full re-crawl. The
+scrapers therefore append every fetched course page to one archive file
+(course_pages.archive), WARC-style: a sequence of self-describing records,
+each compressed on its own (zstandard if installed, zlib otherwise; the
+codec is flagged per record, so archives written with either stay readable).
+
+A sidecar index (course_pages.archive.idx, one JSON line per record) maps
+each slug to the offset of its latest record. Readers mmap the archive and
+decompress only the records they ask for; a missing or truncated index is
+rebuilt by scanning the record headers. Pages whose content hasn't changed
+since the slug's latest record are not appended again.
+
+Several processes (e.g. process_to_silver.py --shard workers) may share one
+archive: appends, index rewrites and rescans hold an exclusive lock on
+course_pages.archive.lock, and an append first indexes any records other
+processes wrote since this one last looked.
+
+Record layout (little-endian):
+    magic 'PKRA' | codec u8 | slug length u16 | url length u16 | fetched_at f64
+    | payload length u32 | crc32 of the uncompressed page u32
+    | slug | url | compressed page
+
+Usage:
+    archive = PageArchive('course_pages.archive')
+    archive.append('bushy', url, content)
+    content = archive.get('bushy')
+    for url, content in archive.iter_pages(): ...
+
+    python page_archive.py                          # archive statistics
+    python page_archive.py --import-cache           # seed from http_cache.sqlite
+    python page_archive.py --verify                 # decompress and CRC-check every record
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import zstandard
+except ImportError:  # zlib fallback
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from http_cache import DEFAULT_CACHE_FILE
+
+DEFAULT_ARCHIVE_FILE = 'course_pages.archive'
+MAGIC = b'PKRA'
+HEADER = struct.Struct('<4sBHHdII')
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+COMPRESSION_LEVEL = 9
+
+
+@dataclass
+class ArchiveRecord:
+    """One archived page."""
+    slug: str
+    url: str
+    fetched_at: float
+    content: bytes
+
+
+@dataclass
+class IndexEntry:
+    """Where the latest record of a slug lives in the archive."""
+    offset: int
+    length: int      # Whole record, header included
+    crc: int
+
+
+def slug_from_url(url: str) -> str:
+    """'https://www.parkrun.org.uk/bushy/course' -> 'bushy'."""
+    return urlparse(url).path.strip('/').split('/')[0]
+
+
+def compress(content: bytes) -> Tuple[int, bytes]:
+    """Compress a page with the best available codec; returns (codec, payload)."""
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(content)
+    return CODEC_ZLIB, zlib.compress(content, COMPRESSION_LEVEL)
+
+
+def decompress(codec: int, payload: bytes) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Archive record is zstd-compressed - pip install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown archive codec {codec}")
+
+
+class FileLock:
+    """Exclusive lock between processes on a lock file (fcntl, or msvcrt on Windows)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a+b')
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 s
+                    pass
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        self._file.close()
+
+
+class PageArchive:
+    """Append-only page archive with a slug -> offset index (thread- and process-safe)."""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_FILE):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.index: Dict[str, IndexEntry] = {}
+        self.appended = 0
+        self.unchanged = 0
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._file = open(path, 'a+b')
+        self._file_lock = FileLock(path + '.lock')
+        self._end = 0    # Archive size up to which records are indexed
+        with self._file_lock:
+            self._load_index()
+
+    def _load_index(self):
+        """Read the sidecar index; rescan the archive for anything it misses (caller holds the file lock)."""
+        size = os.path.getsize(self.path)
+        indexed_end = 0
+        clean = True
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        slug, offset, length, crc = json.loads(line)
+                    except ValueError:
+                        clean = False  # Partial last line from an interrupted write
+                        break
+                    if offset + length > size:
+                        clean = False
+                        break
+                    self.index[slug] = IndexEntry(offset, length, crc)
+                    indexed_end = max(indexed_end, offset + length)
+        self._end = indexed_end
+        if indexed_end < size or not clean:
+            self._scan(indexed_end, size)
+            self._write_index()
+
+    def _scan(self, start: int, size: int):
+        """
+        Index records from start to the end of the archive (drops a torn last
+        record; caller holds the file lock, so no other process is mid-write).
+        """
+        with open(self.path, 'rb') as f:
+            offset = start
+            while offset + HEADER.size <= size:
+                f.seek(offset)
+                magic, codec, slug_len, url_len, fetched_at, payload_len, crc = HEADER.unpack(f.read(HEADER.size))
+                length = HEADER.size + slug_len + url_len + payload_len
+                if magic != MAGIC or offset + length > size:
+                    break
+                slug = f.read(slug_len).decode('utf-8')
+                self.index[slug] = IndexEntry(offset, length, crc)
+                offset += length
+        if offset < size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+        self._end = offset
+
+    def _write_index(self):
+        """Rewrite the sidecar index from the in-memory one."""
+        entries = sorted(self.index.items(), key=lambda item: item[1].offset)
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            for slug, entry in entries:
+                f.write(json.dumps([slug, entry.offset, entry.length, entry.crc]) + '\n')
+
+    def append(self, slug: str, url: str, content: bytes, fetched_at: Optional[float] = None) -> bool:
+        """
+        Archive a fetched page.
+
+        Returns:
+            False if the page is unchanged since the slug's latest record (nothing written)
+        """
+        crc = zlib.crc32(content)
+        with self._lock:
+            latest = self.index.get(slug)
+            if latest is not None and latest.crc == crc and self._read(slug).content == content:
+                self.unchanged += 1
+                return False
+
+        codec, payload = compress(content)
+        slug_bytes, url_bytes = slug.encode('utf-8'), url.encode('utf-8')
+        header = HEADER.pack(MAGIC, codec, len(slug_bytes), len(url_bytes),
+                             fetched_at if fetched_at is not None else time.time(), len(payload), crc)
+        record = header + slug_bytes + url_bytes + payload
+
+        with self._lock, self._file_lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            if offset > self._end:
+                # Records appended by other processes sharing the archive
+                self._scan(self._end, offset)
+                latest = self.index.get(slug)
+                if latest is not None and latest.crc == crc and self._read(slug).content == content:
+                    self.unchanged += 1
+                    return False
+            self._file.write(record)
+            self._file.flush()
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps([slug, offset, len(record), crc]) + '\n')
+            self.index[slug] = IndexEntry(offset, len(record), crc)
+            self._end = offset + len(record)
+            self.appended += 1
+        return True
+
+    def _view(self, end: int) -> mmap.mmap:
+        """mmap of the archive covering at least [0, end) (caller holds the lock)."""
+        if self._mmap is None or len(self._mmap) < end:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _read(self, slug: str) -> Optional[ArchiveRecord]:
+        """Decode the latest record of slug (caller holds the lock)."""
+        entry = self.index.get(slug)
+        if entry is None:
+            return None
+        view = self._view(entry.offset + entry.length)
+        magic, codec, slug_len, url_len, fetched_at, payload_len, crc = HEADER.unpack_from(view, entry.offset)
+        start = entry.offset + HEADER.size
+        url = view[start + slug_len:start + slug_len + url_len].decode('utf-8')
+        payload_start = start + slug_len + url_len
+        content = decompress(codec, view[payload_start:payload_start + payload_len])
+        if zlib.crc32(content) != crc:
+            raise ValueError(f"Corrupt archive record for {slug} at offset {entry.offset}")
+        return ArchiveRecord(slug, url, fetched_at, content)
+
+    def record(self, slug: str) -> Optional[ArchiveRecord]:
+        """Latest archived record of slug, or None."""
+        with self._lock:
+            return self._read(slug)
+
+    def get(self, slug: str) -> Optional[bytes]:
+        """Latest archived page content of slug, or None."""
+        record = self.record(slug)
+        return record.content if record is not None else None
+
+    def slugs(self) -> List[str]:
+        with self._lock:
+            return sorted(self.index)
+
+    def iter_pages(self, limit: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+        """Yield (url, content) of the latest record of every slug, in slug order."""
+        for slug in self.slugs()[:limit]:
+            record = self.record(slug)
+            yield record.url, record.content
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._file.close()
+            self._file_lock.close()
+
+
+def import_cache(archive: PageArchive, cache_path: str) -> int:
+    """Archive every course page held in the response cache; returns the number added."""
+    conn = sqlite3.connect(cache_path)
+    added = 0
+    for url, content, fetched_at in conn.execute(
+            "SELECT url, content, fetched_at FROM responses WHERE status_code = 200 ORDER BY url"):
+        if urlparse(url).path.rstrip('/').endswith('/course'):
+            added += archive.append(slug_from_url(url), url, bytes(content), fetched_at)
+    conn.close()
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or seed the raw course page archive")
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_FILE, help="Archive file")
+    parser.add_argument('--import-cache', nargs='?', const=DEFAULT_CACHE_FILE, metavar='CACHE',
+                        help=f"Add the course pages of a response cache (default: {DEFAULT_CACHE_FILE})")
+    parser.add_argument('--verify', action='store_true', help="Decompress and CRC-check every latest record")
+    args = parser.parse_args()
+
+    print("🗄️  Course Page Archive")
+    print("=" * 50)
+
+    archive = PageArchive(args.archive)
+    if args.import_cache:
+        added = import_cache(archive, args.import_cache)
+        print(f"📥 Imported {added} pages from {args.import_cache} ({archive.unchanged} unchanged)")
+
+    start = time.perf_counter()
+    raw_bytes = 0
+    if args.verify:
+        for _, content in archive.iter_pages():
+            raw_bytes += len(content)
+        print(f"✅ {len(archive)} records verified in {time.perf_counter() - start:.2f}s")
+
+    size = os.path.getsize(args.archive)
+    print(f"📄 {len(archive)} pages, {size / 1024 / 1024:.1f} MB on disk "
+          f"({'zstd' if zstandard is not None else 'zlib'} for new records)")
+    if raw_bytes:
+        print(f"📦 Latest pages: {raw_bytes / 1024 / 1024:.1f} MB uncompressed")
+    archive.close()
+
+
+if __name__ == '__main__':
+    main()
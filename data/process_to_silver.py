@@ -13,8 +13,11 @@ Author: Wheelchair Racer Project
 Created: 2025-10-16
 """
 
+import argparse
+import hashlib
 import json
 import sys
+import threading
 import time
 import requests
 from pathlib import Path
@@ -23,6 +26,23 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from course_page import DEFAULT_PARSER, available_parsers, extract_fields, fetch_course_page
+from http_cache import DEFAULT_CACHE_FILE, ResponseCache
+from page_archive import DEFAULT_ARCHIVE_FILE, PageArchive
+from http_client import HttpClient
+from host_scheduler import group_by_host, host_key, run_per_host
+from rate_control import RateController
+from scrape_journal import ScrapeJournal
+from scrape_parkrun_details import (
+    JOURNAL_FILE as DETAIL_JOURNAL_FILE,
+    OUTPUT_FILE as DETAIL_OUTPUT_FILE,
+    build_detail_output,
+    build_detail_record,
+    save_detail_json,
+)
+
+SILVER_JOURNAL_FILE = 'silver_data.journal.jsonl'
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -51,19 +71,133 @@ class SilverEvent:
     courseMapUrl: Optional[str] = None  # The actual course map with route highlighted
     scrapingStatus: str = "pending"
     lastUpdated: str = ""
+    countryCode: Optional[int] = None  # Bronze country code (selects the postcode format)
+
+def shard_of(slug: str, shard_count: int) -> int:
+    """
+    Stable shard number for an event slug.
+    
+    Uses a hash of the slug (not Python's randomised hash()) so every worker
+    process and machine agrees on which shard an event belongs to.
+    """
+    digest = hashlib.md5(slug.encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % shard_count
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse a '--shard i/n' argument (0-based i) into (i, n)."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{value}', expected i/n (e.g. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{value}', need 0 <= i < n")
+    return index, count
+
+
+def select_events(events: List[Dict], shard: Optional[Tuple[int, int]] = None,
+                  offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Select a disjoint slice of events for one worker.
+    
+    Args:
+        events: Bronze events in file order
+        shard: (index, count) - keep only events whose slug hashes to this shard
+        offset: Skip this many events (after shard filtering)
+        limit: Keep at most this many events (after offset)
+    """
+    if shard is not None:
+        index, count = shard
+        events = [e for e in events if shard_of(e['slug'], count) == index]
+    end = offset + limit if limit is not None else None
+    return events[offset:end]
+
+
+def merge_silver_files(paths: List[str]) -> Dict:
+    """
+    Deterministically merge shard/partial silver outputs into one silver structure.
+    
+    Events are de-duplicated by slug - a 'completed' scrape wins over any
+    other status, otherwise the file that sorts last wins - and ordered by uid.
+    The result doesn't depend on the order the paths are given in.
+    """
+    merged: Dict[str, Dict] = {}
+    processed_count = 0
+    error_count = 0
+    
+    for path in sorted(paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        summary = data.get('metadata', {}).get('processing_summary', {})
+        processed_count += summary.get('processed_count', 0)
+        error_count += summary.get('error_count', 0)
+        
+        for event in data.get('events', []):
+            existing = merged.get(event['slug'])
+            if existing and existing.get('scrapingStatus') == 'completed' and event.get('scrapingStatus') != 'completed':
+                continue
+            merged[event['slug']] = event
+    
+    processor = SilverProcessor()
+    processor.processed_count = processed_count
+    processor.error_count = error_count
+    events = sorted(merged.values(), key=lambda e: (e['uid'], e['slug']))
+    silver_data = processor.create_silver_data({}, events)
+    silver_data['metadata']['processing_summary']['merged_from'] = [Path(p).name for p in sorted(paths)]
+    return silver_data
+
 
 class SilverProcessor:
     """Processes bronze data to silver level with web scraping capabilities."""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.session = self._create_session()
+        self.session.hooks['response'].append(self._observe_response)
+        self.session.hooks['error'].append(self._observe_error)
         self.processed_count = 0
         self.error_count = 0
-        self.rate_limit_delay = 2.5  # seconds between requests - being respectful!
-        
+        self.rate_limit_delay = 2.5  # minimum seconds between requests to one host - being respectful!
+        # Retries keep to the same per-host pacing as first attempts
+        self.session.throttle = self._throttle
+        # Adaptive per-host pacing below that ceiling (created on the first scraping batch)
+        self.rate_controller: Optional[RateController] = None
+        self._counter_lock = threading.Lock()
+        # When enabled, the same page download also produces parkrun_detail.json records
+        self.collect_details = False
+        self.detail_records: Dict[str, Dict] = {}
+        # Optional on-disk response cache; offline serves pages from it only
+        self.cache: Optional[ResponseCache] = None
+        self.offline = False
+        # Optional raw page archive every fetched course page is appended to
+        self.archive: Optional[PageArchive] = None
+        self.parser = DEFAULT_PARSER  # HTML parser backend for the detail extractors
+        # Optional append-only journals for resumable runs
+        self.journal: Optional[ScrapeJournal] = None
+        self.detail_journal: Optional[ScrapeJournal] = None
+        self.resume = False
+
+    @staticmethod
+    def _create_session() -> HttpClient:
+        """Create the HTTP client (pooled, retrying, thread-safe) with the scraper's headers."""
+        return HttpClient(headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+
+    def _observe_response(self, response: requests.Response, *args, **kwargs):
+        """Client response hook feeding every response into the rate controller."""
+        if self.rate_controller is not None:
+            self.rate_controller.observe_response(response)
+
+    def _throttle(self, host: str):
+        """Client throttle holding retries to the rate controller's pace for host."""
+        if self.rate_controller is not None:
+            self.rate_controller.wait(host)
+
+    def _observe_error(self, url: str, error: Exception):
+        """Client error hook feeding connection errors/timeouts into the rate controller."""
+        if self.rate_controller is not None:
+            self.rate_controller.observe_error(url, error)
+
     def load_bronze_data(self) -> Dict:
         """Load bronze-level data from JSON file."""
         try:
@@ -93,47 +227,30 @@ class SilverProcessor:
             
         return urljoin(base_url, f"/{slug}/course")
 
-    def scrape_course_map_url(self, course_url: str) -> Optional[str]:
+    def scrape_course_page_fields(self, course_url: str, fields: Optional[List[str]] = None,
+                                  session: Optional[HttpClient] = None,
+                                  country_code: Optional[int] = None) -> Optional[Dict[str, Optional[str]]]:
         """
-        Scrape course map URL from parkrun course page.
+        Download a course page once and run the requested extractors over it.
+        
+        Args:
+            course_url: Parkrun course page URL
+            fields: Extractor names from course_page.EXTRACTORS (default: all)
+            session: HTTP session to use (defaults to the processor's session)
+            country_code: Bronze countryCode of the event (selects the postcode format)
         
         Returns:
-            Google Maps embed URL with course route highlighted, or None if not found
+            Dictionary of field -> value, or None if the page couldn't be fetched
         """
         if not course_url:
             return None
             
         try:
-            logger.debug(f"Scraping course map from: {course_url}")
-            
-            response = self.session.get(course_url, timeout=10)
-            response.raise_for_status()
-            
-            content = response.text
-            
-            # Extract Google Maps iframe URL with course route
-            import re
-            
-            # Look for iframe with Google Maps embed
-            iframe_pattern = r'<iframe[^>]*src=["\']([^"\']*maps[^"\']*)["\'][^>]*>'
-            iframe_matches = re.findall(iframe_pattern, content, re.IGNORECASE)
-            
-            for iframe_url in iframe_matches:
-                if 'google.com/maps' in iframe_url and ('embed' in iframe_url or 'pb=' in iframe_url):
-                    logger.debug(f"Found course map URL: {iframe_url[:100]}...")
-                    return iframe_url
-            
-            # Alternative: look for maps URLs in the page content
-            maps_pattern = r'https://[^"\s]*google\.com/maps[^"\s]*'
-            maps_matches = re.findall(maps_pattern, content)
-            
-            for maps_url in maps_matches:
-                if 'embed' in maps_url or 'pb=' in maps_url:
-                    logger.debug(f"Found alternative course map URL: {maps_url[:100]}...")
-                    return maps_url
-            
-            logger.debug("No course map URL found")
-            return None
+            logger.debug(f"Scraping course page: {course_url}")
+            page = fetch_course_page(course_url, session or self.session, timeout=10,
+                                     cache=self.cache, offline=self.offline, parser=self.parser,
+                                     country_code=country_code, archive=self.archive)
+            return extract_fields(page, fields)
             
         except requests.exceptions.RequestException as e:
             logger.warning(f"Failed to scrape {course_url}: {e}")
@@ -142,6 +259,26 @@ class SilverProcessor:
             logger.error(f"Unexpected error scraping {course_url}: {e}")
             return None
 
+    def scrape_course_map_url(self, course_url: str, session: Optional[HttpClient] = None) -> Optional[str]:
+        """
+        Scrape course map URL from parkrun course page.
+        
+        Args:
+            course_url: Parkrun course page URL
+            session: HTTP session to use (defaults to the processor's session)
+        
+        Returns:
+            Google Maps embed URL with course route highlighted, or None if not found
+        """
+        fields = self.scrape_course_page_fields(course_url, ['course_map_url'], session)
+        course_map = fields['course_map_url'] if fields else None
+        
+        if course_map:
+            logger.debug(f"Found course map URL: {course_map[:100]}...")
+        else:
+            logger.debug("No course map URL found")
+        return course_map
+
     def process_event(self, event_data: Dict) -> SilverEvent:
         """Process a single event from bronze to silver level."""
         
@@ -160,6 +297,7 @@ class SilverProcessor:
             location=event_data['location'],
             coordinates=event_data['coordinates'],
             country=event_data['country'],
+            countryCode=event_data.get('countryCode'),
             baseUrl=event_data.get('baseUrl', ''),
             junior=event_data['junior'],
             coursePageUrl=course_page_url,
@@ -168,69 +306,187 @@ class SilverProcessor:
         
         return silver_event
 
-    def process_events_batch(self, events: List[Dict], batch_size: int = 50, enable_scraping: bool = False) -> List[Dict]:
+    def _scrape_event(self, event_data: Dict, enable_scraping: bool, session: Optional[HttpClient] = None) -> Optional[Dict]:
+        """
+        Process and (optionally) scrape one event, returning its silver dict.
+        
+        Returns None if the event could not be processed.
+        """
+        try:
+            # Process basic silver-level data
+            silver_event = self.process_event(event_data)
+            
+            # Optional web scraping (rate limiting is handled by the caller)
+            if enable_scraping and silver_event.coursePageUrl:
+                if self.collect_details:
+                    # One download/parse feeds both silver and detail outputs
+                    fields = self.scrape_course_page_fields(silver_event.coursePageUrl, session=session,
+                                                            country_code=silver_event.countryCode) or {}
+                    self._record_detail(silver_event, fields.get('description'), fields.get('postcode'))
+                    course_map = fields.get('course_map_url')
+                else:
+                    course_map = self.scrape_course_map_url(silver_event.coursePageUrl, session)
+                silver_event.courseMapUrl = course_map
+                silver_event.scrapingStatus = "completed" if course_map else "failed"
+            else:
+                silver_event.scrapingStatus = "skipped"
+                if enable_scraping and self.collect_details:
+                    self._record_detail(silver_event, None, None)
+            
+            with self._counter_lock:
+                self.processed_count += 1
+            
+            # Convert to dict for JSON serialization
+            event_dict = {
+                'uid': silver_event.uid,
+                'name': silver_event.name,
+                'slug': silver_event.slug,
+                'shortName': silver_event.shortName,
+                'location': silver_event.location,
+                'coordinates': silver_event.coordinates,
+                'country': silver_event.country,
+                'countryCode': silver_event.countryCode,
+                'baseUrl': silver_event.baseUrl,
+                'junior': silver_event.junior,
+                'coursePageUrl': silver_event.coursePageUrl,
+                'courseMapUrl': silver_event.courseMapUrl,
+                'scrapingStatus': silver_event.scrapingStatus,
+                'lastUpdated': silver_event.lastUpdated
+            }
+            
+            if self.journal is not None and enable_scraping:
+                self.journal.append(event_dict)
+            return event_dict
+            
+        except Exception as e:
+            logger.error(f"Error processing event {event_data.get('uid', 'unknown')}: {e}")
+            with self._counter_lock:
+                self.error_count += 1
+            return None
+
+    def _record_detail(self, silver_event: SilverEvent, description: Optional[str], postcode: Optional[str]):
+        """Keep (and journal) the parkrun_detail.json record built from the same page download."""
+        detail = build_detail_record(
+            {'uid': silver_event.uid, 'name': silver_event.name, 'slug': silver_event.slug,
+             'countryCode': silver_event.countryCode, 'coursePageUrl': silver_event.coursePageUrl},
+            description,
+            postcode
+        )
+        self.detail_records[silver_event.slug] = detail
+        if self.detail_journal is not None:
+            self.detail_journal.append(detail)
+
+    def process_events_batch(self, events: List[Dict], batch_size: int = 50, enable_scraping: bool = False,
+                             concurrent: bool = False, max_hosts: Optional[int] = None) -> List[Dict]:
         """
         Process a batch of events with optional web scraping.
         
+        With a journal set, every finished event is appended to it straight
+        away, and with resume set, events already in the journal are reused
+        instead of being scraped again.
+        
         Args:
             events: List of bronze event data
             batch_size: Maximum number of events to process  
             enable_scraping: Whether to scrape course descriptions (slow!)
+            concurrent: Scrape different country domains in parallel, each
+                        host paced by its own rate
+            max_hosts: Maximum number of hosts scraped at once in concurrent mode
         """
+        batch = events[:batch_size]
+        if enable_scraping and self.rate_controller is None:
+            self.rate_controller = RateController(min_delay=self.rate_limit_delay)
+        
+        done: Dict[str, Dict] = {}
+        if self.journal is not None and enable_scraping:
+            if self.resume:
+                done = self.journal.load()
+                if self.collect_details and self.detail_journal is not None:
+                    self.detail_records.update(self.detail_journal.load())
+                logger.info(f"Resuming: {sum(1 for e in batch if e['slug'] in done)}/{len(batch)} events already in {self.journal.path}")
+            else:
+                self.journal.reset()
+                if self.detail_journal is not None:
+                    self.detail_journal.reset()
+        
+        pending = [e for e in batch if e['slug'] not in done]
+        
+        if concurrent and enable_scraping:
+            new_events = self._process_events_concurrently(pending, max_hosts)
+        else:
+            new_events = self._process_events_sequentially(pending, enable_scraping)
+        
+        if not done:
+            return new_events
+        
+        # Merge resumed and freshly scraped events back into batch order
+        new_by_slug = {e['slug']: e for e in new_events}
+        return [done.get(e['slug']) or new_by_slug[e['slug']]
+                for e in batch if e['slug'] in done or e['slug'] in new_by_slug]
+
+    def _process_events_sequentially(self, events: List[Dict], enable_scraping: bool) -> List[Dict]:
+        """Process events one at a time, paced by the rate controller (at most one request per rate_limit_delay)."""
         processed_events = []
         
-        for i, event_data in enumerate(events[:batch_size]):
-            try:
-                # Process basic silver-level data
-                silver_event = self.process_event(event_data)
-                
-                # Optional web scraping (rate limited)
-                if enable_scraping and silver_event.coursePageUrl:
-                    course_map = self.scrape_course_map_url(silver_event.coursePageUrl)
-                    silver_event.courseMapUrl = course_map
-                    silver_event.scrapingStatus = "completed" if course_map else "failed"
-                    
-                    # Rate limiting
-                    time.sleep(self.rate_limit_delay)
-                else:
-                    silver_event.scrapingStatus = "skipped"
-                
-                # Convert to dict for JSON serialization
-                event_dict = {
-                    'uid': silver_event.uid,
-                    'name': silver_event.name,
-                    'slug': silver_event.slug,
-                    'shortName': silver_event.shortName,
-                    'location': silver_event.location,
-                    'coordinates': silver_event.coordinates,
-                    'country': silver_event.country,
-                    'baseUrl': silver_event.baseUrl,
-                    'junior': silver_event.junior,
-                    'coursePageUrl': silver_event.coursePageUrl,
-                    'courseMapUrl': silver_event.courseMapUrl,
-                    'scrapingStatus': silver_event.scrapingStatus,
-                    'lastUpdated': silver_event.lastUpdated
-                }
-                
-                processed_events.append(event_dict)
-                self.processed_count += 1
-                
-                # Progress reporting - more frequent for long runs
-                if (i + 1) % 50 == 0:
-                    progress = (i + 1) / min(batch_size, len(events)) * 100
-                    elapsed_time = (i + 1) * self.rate_limit_delay / 60  # minutes
-                    remaining_time = ((min(batch_size, len(events)) - i - 1) * self.rate_limit_delay) / 60
-                    logger.info(f"Progress: {i + 1}/{min(batch_size, len(events))} ({progress:.1f}%) - Elapsed: {elapsed_time:.1f}min, Remaining: ~{remaining_time:.1f}min")
-                elif (i + 1) % 10 == 0:
-                    logger.info(f"Processed {i + 1}/{min(batch_size, len(events))} events")
-                    
-            except Exception as e:
-                logger.error(f"Error processing event {event_data.get('uid', 'unknown')}: {e}")
-                self.error_count += 1
+        for i, event_data in enumerate(events):
+            # Rate limiting
+            if enable_scraping and event_data.get('baseUrl'):
+                self.rate_controller.wait(host_key(event_data['baseUrl']))
+            
+            event_dict = self._scrape_event(event_data, enable_scraping)
+            if event_dict is None:
                 continue
+            
+            processed_events.append(event_dict)
+            
+            # Progress reporting - more frequent for long runs
+            if (i + 1) % 50 == 0:
+                progress = (i + 1) / len(events) * 100
+                elapsed_time = (i + 1) * self.rate_limit_delay / 60  # minutes
+                remaining_time = ((len(events) - i - 1) * self.rate_limit_delay) / 60
+                logger.info(f"Progress: {i + 1}/{len(events)} ({progress:.1f}%) - Elapsed: {elapsed_time:.1f}min, Remaining: ~{remaining_time:.1f}min")
+            elif (i + 1) % 10 == 0:
+                logger.info(f"Processed {i + 1}/{len(events)} events")
         
         return processed_events
 
+    def _process_events_concurrently(self, events: List[Dict], max_hosts: Optional[int] = None) -> List[Dict]:
+        """
+        Scrape events with one worker per baseUrl host, hosts in parallel.
+        
+        Every host still gets at most one request per rate_limit_delay, and
+        fewer while the rate controller is backing off.
+        """
+        hosts = group_by_host(events, lambda e: host_key(e.get('baseUrl', '')))
+        largest = max((len(indices) for indices in hosts.values()), default=0)
+        logger.info(f"Concurrent scraping across {len(hosts)} hosts "
+                    f"(largest host: {largest} events, ~{largest * self.rate_limit_delay / 60:.1f}min)")
+        
+        started = time.time()
+        completed = [0]
+        
+        def handle(event_data: Dict) -> Optional[Dict]:
+            return self._scrape_event(event_data, True)
+        
+        def on_result(index: int, event_data: Dict, result: Optional[Dict]):
+            completed[0] += 1
+            done = completed[0]
+            if done % 50 == 0 or done == len(events):
+                elapsed = (time.time() - started) / 60
+                logger.info(f"Progress: {done}/{len(events)} ({done / len(events) * 100:.1f}%) - Elapsed: {elapsed:.1f}min")
+        
+        results = run_per_host(
+            events,
+            key=lambda e: host_key(e.get('baseUrl', '')),
+            handle=handle,
+            delay=self.rate_limit_delay,
+            max_hosts=max_hosts,
+            on_result=on_result,
+            throttle=self.rate_controller.wait
+        )
+        
+        return [event_dict for event_dict in results if event_dict is not None]
+
     def create_silver_data(self, bronze_data: Dict, processed_events: List[Dict]) -> Dict:
         """Create the final silver data structure."""
         
@@ -254,6 +510,7 @@ class SilverProcessor:
                     "location": "Event location description",
                     "coordinates": "[longitude, latitude]",
                     "country": "Country name",
+                    "countryCode": "Numeric country code (from bronze)",
                     "baseUrl": "Base parkrun URL for country",
                     "junior": "Boolean - true if junior parkrun",
                     "coursePageUrl": "Parkrun course description page URL",
@@ -288,44 +545,144 @@ def main():
     bronze_data = processor.load_bronze_data()
     
     # Determine batch size and processing mode from command line
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "all":
-            batch_size = len(bronze_data['events'])  # Process all 2,747 events
+    parser = argparse.ArgumentParser(description="Process bronze parkrun data to silver level")
+    parser.add_argument('batch', nargs='?', default=None,
+                        help="'all', 'sample' or a number of events (default: 50)")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="Scrape country domains in parallel, each host keeping its own rate limit")
+    parser.add_argument('--max-hosts', type=int, default=None,
+                        help="Maximum number of hosts scraped at once with --concurrent")
+    parser.add_argument('--min-delay', type=float, default=processor.rate_limit_delay,
+                        help=f"Minimum seconds between requests to one host (default: {processor.rate_limit_delay})")
+    parser.add_argument('--with-details', action='store_true',
+                        help=f"Also extract descriptions/postcodes from the same page downloads into {DETAIL_OUTPUT_FILE}")
+    parser.add_argument('--parser', choices=available_parsers(), default=DEFAULT_PARSER,
+                        help=f"HTML parser backend for --with-details (default: {DEFAULT_PARSER}; 'lxml' is faster)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE,
+                        help=f"On-disk response cache (default: {DEFAULT_CACHE_FILE})")
+    parser.add_argument('--no-cache', action='store_true', help="Don't read or write the response cache")
+    parser.add_argument('--cache-only', action='store_true',
+                        help="Offline mode: re-run extraction over cached pages, no network requests")
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_FILE,
+                        help=f"Raw course page archive (default: {DEFAULT_ARCHIVE_FILE})")
+    parser.add_argument('--no-archive', action='store_true', help="Don't archive fetched course pages")
+    parser.add_argument('--journal', default=SILVER_JOURNAL_FILE,
+                        help=f"Append-only progress journal (default: {SILVER_JOURNAL_FILE})")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip events already in the journal (continue an interrupted run)")
+    parser.add_argument('--compact', action='store_true',
+                        help="Only turn the journal into the silver JSON, don't scrape")
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                        help="Process only shard I of N (0-based), keyed by a stable hash of the slug")
+    parser.add_argument('--offset', type=int, default=0, help="Skip this many events (after --shard)")
+    parser.add_argument('--limit', type=int, default=None, help="Process at most this many events (after --offset)")
+    parser.add_argument('--merge', nargs='+', metavar='FILE',
+                        help="Merge shard/partial silver files into silver_data.json and exit")
+    args = parser.parse_args()
+    
+    if args.merge:
+        print(f"🔗 Merging {len(args.merge)} silver files...")
+        silver_data = merge_silver_files(args.merge)
+        processor.save_silver_data(silver_data, "silver_data.json")
+        print(f"✅ Merged {silver_data['metadata']['total_events']} events into silver_data.json")
+        return
+    
+    # Partition the events for this worker
+    partitioned = args.shard is not None or args.offset or args.limit is not None
+    events = select_events(bronze_data['events'], args.shard, args.offset, args.limit)
+    if args.shard is not None:
+        suffix = f"shard_{args.shard[0]}of{args.shard[1]}"
+    elif partitioned:
+        suffix = f"{args.offset}-{args.offset + len(events)}"
+    else:
+        suffix = None
+    if partitioned:
+        print(f"🧩 Selected {len(events)} of {len(bronze_data['events'])} events ({suffix})")
+    
+    processor.collect_details = args.with_details
+    processor.parser = args.parser
+    processor.rate_limit_delay = args.min_delay
+    # Each partition gets its own journals so workers never share a file
+    journal_path = args.journal if suffix is None else args.journal.replace('.journal', f'.{suffix}.journal')
+    processor.journal = ScrapeJournal(journal_path)
+    processor.resume = args.resume
+    if args.with_details:
+        detail_journal_path = DETAIL_JOURNAL_FILE if suffix is None else DETAIL_JOURNAL_FILE.replace('.journal', f'.{suffix}.journal')
+        processor.detail_journal = ScrapeJournal(detail_journal_path)
+    if not args.no_cache:
+        processor.cache = ResponseCache(args.cache)
+        if args.cache_only:
+            processor.offline = True
+            processor.rate_limit_delay = 0  # No requests go out, so no need to wait
+    if not args.no_archive and not processor.offline:
+        processor.archive = PageArchive(args.archive)
+    
+    if args.batch is not None:
+        if args.batch == "all":
+            batch_size = len(events)  # Process all 2,747 events
             enable_scraping = True
-        elif sys.argv[1] == "sample":
+        elif args.batch == "sample":
             batch_size = 5  # Process small sample
             enable_scraping = True
         else:
             try:
-                batch_size = int(sys.argv[1])
-                batch_size = min(batch_size, len(bronze_data['events']))
+                batch_size = int(args.batch)
+                batch_size = min(batch_size, len(events))
                 enable_scraping = True
             except ValueError:
                 print("❌ Invalid batch size. Use 'all', 'sample', or a number.")
                 return
+    elif partitioned:
+        batch_size = len(events)  # Whole partition
+        enable_scraping = True
     else:
         batch_size = 50  # Default batch size
         enable_scraping = True
     
-    print(f"⚙️  Processing {batch_size} events (scraping: {'enabled' if enable_scraping else 'disabled'})...")
-    print(f"⏰ Estimated time: ~{(batch_size * 2.5) // 60:.0f} minutes with rate limiting")
-    print("🤖 Being respectful to Parkrun servers with 2.5 second delays...")
-    
-    processed_events = processor.process_events_batch(
-        bronze_data['events'], 
-        batch_size=batch_size,
-        enable_scraping=enable_scraping
-    )
+    if args.compact:
+        # Rebuild the output from the journal(s) without scraping
+        slugs = [e['slug'] for e in events[:batch_size]]
+        processed_events = processor.journal.compact(slugs)
+        print(f"🗜️  Compacted {len(processed_events)}/{len(slugs)} events from {processor.journal.path}")
+        if processor.detail_journal is not None:
+            processor.detail_records.update(processor.detail_journal.load())
+    else:
+        print(f"⚙️  Processing {batch_size} events (scraping: {'enabled' if enable_scraping else 'disabled'})...")
+        if args.concurrent:
+            hosts = group_by_host(events[:batch_size], lambda e: host_key(e.get('baseUrl', '')))
+            largest = max((len(indices) for indices in hosts.values()), default=0)
+            print(f"⏰ Estimated time: ~{(largest * processor.rate_limit_delay) // 60:.0f} minutes ({len(hosts)} hosts in parallel)")
+        else:
+            print(f"⏰ Estimated time: ~{(batch_size * processor.rate_limit_delay) // 60:.0f} minutes with rate limiting")
+        print(f"🤖 Being respectful to Parkrun servers with {processor.rate_limit_delay} second delays (longer if a server struggles)...")
+        
+        processed_events = processor.process_events_batch(
+            events, 
+            batch_size=batch_size,
+            enable_scraping=enable_scraping,
+            concurrent=args.concurrent,
+            max_hosts=args.max_hosts
+        )
     
     # Create silver data structure
     print("🔧 Creating silver data structure...")
     silver_data = processor.create_silver_data(bronze_data, processed_events)
     
-    # Save result with batch info in filename if not processing all
-    filename = "silver_data.json" if batch_size == len(bronze_data['events']) else f"silver_data_batch_{batch_size}.json"
+    # Save result with partition/batch info in filename if not processing all
+    if suffix is not None and batch_size == len(events):
+        filename = f"silver_data_{suffix}.json"
+    elif batch_size == len(bronze_data['events']):
+        filename = "silver_data.json"
+    else:
+        filename = f"silver_data_batch_{batch_size}.json"
     print(f"💾 Saving silver data to {filename}...")
     processor.save_silver_data(silver_data, filename)
     
+    if processor.collect_details:
+        detail_events = [processor.detail_records[e['slug']] for e in processed_events if e['slug'] in processor.detail_records]
+        detail_filename = filename.replace("silver_data", "parkrun_detail")
+        save_detail_json(build_detail_output(detail_events), detail_filename)
+    
     print(f"✅ Successfully created {filename} with {len(processed_events)} events")
     print(f"📊 Processing Summary:")
     print(f"   • Processed: {processor.processed_count}")
@@ -336,6 +693,19 @@ def main():
         completed_scraping = sum(1 for e in processed_events if e.get('scrapingStatus') == 'completed')
         print(f"   • Successfully scraped: {completed_scraping}")
     
+    if processor.rate_controller is not None and processor.rate_controller.summary():
+        print(f"   • Rate control: {processor.rate_controller.describe()}")
+    
+    if processor.cache is not None:
+        cache = processor.cache
+        print(f"   • Cache: {cache.hits} served offline, {cache.revalidated} unchanged (304), {cache.misses} downloaded/missing")
+        cache.close()
+    
+    if processor.archive is not None:
+        archive = processor.archive
+        print(f"   • Archive: {archive.appended} pages added, {archive.unchanged} unchanged ({len(archive)} in {archive.path})")
+        archive.close()
+    
     print("🎉 Silver data processing complete!")
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+"""
+Adaptive per-host request pacing for the parkrun scrapers.
+
+Instead of sleeping a fixed delay after every request, each host gets an
+AIMD (additive-increase / multiplicative-decrease) request rate:
+- every fast, successful response adds a little to the host's rate
+- 429 / 503 / other 5xx responses and connection errors halve it
+- a latency well above the host's usual latency halves it (at most once
+  per cooldown period)
+- Retry-After on a 429/503 blocks the host for that long
+
+The configured politeness delay (RATE_LIMIT_DELAY / rate_limit_delay) is the
+ceiling: a host is never asked for pages faster than one per min_delay
+seconds, the controller only decides how far below that to run.
+
+Usage:
+    controller = RateController(min_delay=1.0)
+    client.hooks['response'].append(controller.observe_response)
+    client.hooks['error'].append(controller.observe_error)
+    controller.wait(host)            # before each request to host
+    controller.summary()             # current rate and backoffs per host
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from host_scheduler import host_key
+
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+UNLIMITED_BACKOFF_RATE = 10.0  # First backoff of a host without a ceiling (min_delay=0), requests/second
+
+
+@dataclass
+class BackoffEvent:
+    """One multiplicative decrease (or Retry-After block) of a host's rate."""
+    time: float
+    host: str
+    reason: str
+    old_rate: float
+    new_rate: float
+    blocked_for: float = 0.0
+
+
+@dataclass
+class HostRate:
+    """Pacing state of one host."""
+    rate: float                              # Requests per second
+    next_slot: float = 0.0                   # Earliest time of the next request
+    blocked_until: float = 0.0               # Retry-After
+    latency_avg: Optional[float] = None      # EWMA of response latency
+    latency_baseline: Optional[float] = None # Lowest latency_avg seen
+    last_decrease: float = 0.0
+    requests: int = 0
+    backoffs: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateController:
+    """AIMD request rate per host (thread-safe)."""
+
+    def __init__(self, min_delay: float = 1.0, max_delay: float = 60.0, increase: float = 0.1,
+                 decrease: float = 0.5, latency_factor: float = 3.0, min_latency: float = 0.5,
+                 cooldown: float = 5.0):
+        """
+        Args:
+            min_delay: Politeness ceiling - never more than one request per min_delay seconds
+            max_delay: Slowest rate backoffs can reach (one request per max_delay seconds)
+            increase: Requests/second added after each fast successful response
+            decrease: Factor the rate is multiplied by on a backoff
+            latency_factor: Back off when latency exceeds this multiple of the host's baseline
+            min_latency: ... and is above this many seconds (ignore noise on fast responses)
+            cooldown: Minimum seconds between two latency-triggered backoffs of one host
+        """
+        self.max_rate = 1 / min_delay if min_delay > 0 else float('inf')
+        self.min_rate = 1 / max_delay
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.min_latency = min_latency
+        self.cooldown = cooldown
+        self.events: List[BackoffEvent] = []
+        self._hosts: Dict[str, HostRate] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host: str) -> HostRate:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = HostRate(rate=self.max_rate)
+            return state
+
+    def rate(self, host: str) -> float:
+        """Current requests/second allowed for host."""
+        return self._host(host).rate
+
+    def wait(self, host: str):
+        """Block until the next request to host is allowed, and claim that slot."""
+        state = self._host(host)
+        with state.lock:
+            now = time.monotonic()
+            start = max(now, state.next_slot, state.blocked_until)
+            state.next_slot = start + 1 / state.rate
+            state.requests += 1
+        if start > now:
+            time.sleep(start - now)
+
+    def record(self, host: str, status: Optional[int], latency: Optional[float] = None,
+               retry_after: Optional[float] = None):
+        """
+        Feed the outcome of one request back into host's rate.
+
+        Args:
+            host: Host the request went to (see host_scheduler.host_key)
+            status: HTTP status code, or None for a connection error/timeout
+            latency: Seconds until the response headers arrived
+            retry_after: Seconds from the response's Retry-After header
+        """
+        state = self._host(host)
+        with state.lock:
+            now = time.monotonic()
+
+            if status is None or status in BACKOFF_STATUSES:
+                reason = 'connection error' if status is None else f'HTTP {status}'
+                blocked_for = retry_after if retry_after and status in (429, 503) else 0.0
+                if blocked_for:
+                    state.blocked_until = max(state.blocked_until, now + blocked_for)
+                self._back_off(host, state, now, reason, blocked_for)
+                return
+
+            if latency is not None:
+                state.latency_avg = latency if state.latency_avg is None else 0.8 * state.latency_avg + 0.2 * latency
+                if state.latency_baseline is None or state.latency_avg < state.latency_baseline:
+                    state.latency_baseline = state.latency_avg
+                slow = (latency > self.min_latency
+                        and latency > self.latency_factor * state.latency_baseline)
+                if slow:
+                    if now - state.last_decrease >= self.cooldown:
+                        self._back_off(host, state, now, f'latency {latency:.2f}s')
+                    return
+
+            state.rate = min(self.max_rate, state.rate + self.increase)
+
+    def _back_off(self, host: str, state: HostRate, now: float, reason: str, blocked_for: float = 0.0):
+        """Multiplicative decrease (caller holds state.lock)."""
+        old_rate = state.rate
+        if old_rate == float('inf'):
+            state.rate = UNLIMITED_BACKOFF_RATE
+        else:
+            state.rate = max(self.min_rate, state.rate * self.decrease)
+        state.last_decrease = now
+        state.backoffs += 1
+        # Space the next request by the new, slower rate
+        state.next_slot = max(state.next_slot, now + 1 / state.rate)
+        with self._lock:
+            self.events.append(BackoffEvent(time.time(), host, reason, old_rate, state.rate, blocked_for))
+
+    def observe_response(self, response: requests.Response, *args, **kwargs):
+        """requests response hook: record status, latency and Retry-After of every response."""
+        self.record(
+            host_key(response.url),
+            response.status_code,
+            response.elapsed.total_seconds(),
+            parse_retry_after(response.headers.get('Retry-After'))
+        )
+
+    def observe_error(self, url: str, error: Optional[Exception] = None):
+        """HttpClient error hook: record a request to url that failed without a response."""
+        self.record(host_key(url), None)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Current rate, request count and backoff count per host."""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {
+            host: {
+                'rate': state.rate,
+                'delay': 1 / state.rate,
+                'requests': state.requests,
+                'backoffs': state.backoffs,
+            }
+            for host, state in sorted(hosts.items())
+        }
+
+    def describe(self) -> str:
+        """One-line summary for the end-of-run report."""
+        summary = self.summary()
+        requests_made = sum(host['requests'] for host in summary.values())
+        backed_off = {name: host for name, host in summary.items() if host['backoffs']}
+        line = f"{requests_made} requests to {len(summary)} hosts, {len(self.events)} backoffs"
+        if backed_off:
+            slowest = min(backed_off, key=lambda name: backed_off[name]['rate'])
+            line += f" (slowest: {slowest} at one request per {backed_off[slowest]['delay']:.1f}s)"
+        return line
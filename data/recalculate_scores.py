@@ -1,11 +1,21 @@
 """
 Recalculate accessibility scores from existing gold data
 Uses cleaned descriptions instead of full descriptions to avoid boilerplate text
+
+Keyword matches are kept in score_index.json (see score_index.py), so after a
+keywords.json change only the events it affects are rescored:
+    python recalculate_scores.py            # incremental when the index exists
+    python recalculate_scores.py --full     # rescan every description
 """
 
+import argparse
 import json
+import time
 from typing import Dict, List
 
+from score_index import DEFAULT_INDEX_FILE, ScoreIndex
+from scoring import MATCH_SUBSTRING, KeywordScorer, compile_scorer
+
 # Base scores for each mobility aid type
 BASE_SCORES = {
     "racing_chair": 35,
@@ -19,84 +29,50 @@ BASE_SCORES = {
 }
 
 
-def find_keywords_in_text(text: str, keywords_dict: Dict) -> List[Dict]:
-    """
-    Find all keyword matches in text and return with their impacts
-    """
-    text_lower = text.lower()
-    matches = []
-    
-    # Skip metadata
-    for category, category_data in keywords_dict.items():
-        if category == "metadata":
-            continue
-        
-        # Check if this is a category with subcategories
-        if isinstance(category_data, dict):
-            for subcategory, subcat_data in category_data.items():
-                if isinstance(subcat_data, dict) and 'keywords' in subcat_data:
-                    keywords_list = subcat_data['keywords']
-                    impact = subcat_data.get('impact', {})
-                    
-                    for keyword in keywords_list:
-                        if keyword.lower() in text_lower:
-                            matches.append({
-                                "keyword": keyword,
-                                "category": f"{category}/{subcategory}",
-                                "impacts": impact
-                            })
-    
-    return matches
-
-
-def calculate_keyword_adjustment(keywords: List[Dict], mobility_type: str) -> Dict:
+def calculate_accessibility_scores_batch(
+    matched_per_event: List[List[int]],
+    base_scores: Dict[str, int],
+    scorer: KeywordScorer
+) -> List[Dict]:
     """
-    Calculate total keyword adjustment for a mobility type
-    """
-    total_adjustment = 0
-    applied_keywords = []
-    
-    for kw in keywords:
-        impact = kw['impacts'].get(mobility_type, 0)
-        if impact != 0:
-            total_adjustment += impact
-            applied_keywords.append({
-                "keyword": kw['keyword'],
-                "category": kw['category'],
-                "impact": impact
-            })
-    
-    return {
-        "total": total_adjustment,
-        "applied": applied_keywords
-    }
-
+    Calculate final accessibility scores with full breakdown for many parkruns at once
 
-def calculate_accessibility_scores(keywords: List[Dict], base_scores: Dict[str, int]) -> Dict:
-    """
-    Calculate final accessibility scores with full breakdown
+    matched_per_event holds each parkrun's matched keyword entries (see scoring.py).
     """
-    accessibility = {}
-    
-    for mobility_type, starting_score in base_scores.items():
-        # Calculate keyword adjustment
-        keyword_data = calculate_keyword_adjustment(keywords, mobility_type)
-        
-        # Calculate final score (capped between 0-100)
-        final_score = max(0, min(100, starting_score + keyword_data['total']))
-        
-        accessibility[mobility_type] = {
-            "starting_score": starting_score,
-            "keyword_adjustment": keyword_data['total'],
-            "user_adjustment": 0,  # Keep existing user adjustments
-            "final_score": final_score,
-            "breakdown": keyword_data['applied']
-        }
-    
-    return accessibility
+    batch = scorer.score(matched_per_event, base_scores)
+    columns = [scorer.mobility_types.index(mt) for mt in base_scores]
+    adjustments = batch.adjustment[:, columns].tolist()
+    final_scores = batch.final[:, columns].tolist()
+    
+    results = []
+    for event in range(len(batch)):
+        accessibility = {}
+        for j, (mobility_type, starting_score) in enumerate(base_scores.items()):
+            accessibility[mobility_type] = {
+                "starting_score": starting_score,
+                "keyword_adjustment": adjustments[event][j],
+                "user_adjustment": 0,  # Keep existing user adjustments
+                "final_score": final_scores[event][j],
+                "breakdown": [
+                    {
+                        "keyword": entry.keyword,
+                        "category": f"{entry.category}/{entry.subcategory}",
+                        "impact": impact
+                    }
+                    for entry, impact in batch.breakdown(event, mobility_type)
+                ]
+            }
+        results.append(accessibility)
+    
+    return results
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Recalculate accessibility scores in gold_parkrun_data.json")
+    parser.add_argument('--index', default=DEFAULT_INDEX_FILE, help="Keyword index for incremental rescoring")
+    parser.add_argument('--full', action='store_true', help="Rebuild the index and rescore every parkrun")
+    args = parser.parse_args()
+    
     print("Loading existing gold data...")
     with open('gold_parkrun_data.json', 'r', encoding='utf-8') as f:
         gold_data = json.load(f)
@@ -108,26 +84,41 @@ def main():
     with open('keywords.json', 'r', encoding='utf-8') as f:
         keywords_dict = json.load(f)
     
-    print(f"\nRecalculating scores for all parkruns...")
+    start = time.perf_counter()
+    index = None if args.full else ScoreIndex.load(args.index)
+    if index is None:
+        print(f"\nRecalculating scores for all parkruns...")
+        index = ScoreIndex.build(parkruns, keywords_dict, BASE_SCORES)
+        affected = {parkrun['slug'] for parkrun in parkruns}
+    else:
+        affected = index.update(parkruns, keywords_dict, BASE_SCORES)
+        diff = index.diff
+        print(f"\nKeyword changes since {args.index}: {len(diff.added)} added, {len(diff.removed)} removed, "
+              f"{len(diff.reweighted)} re-weighted, {len(diff.base_scores)} base scores changed"
+              f"{', keyword order changed' if diff.reordered else ''}")
+        print(f"Recalculating scores for {len(affected)} affected parkruns...")
     print("Using CLEANED descriptions (not full) to avoid boilerplate text")
     print("="*80)
     
-    updated_count = 0
-    
-    for parkrun in parkruns:
-        # Extract keywords from cleaned description and summary ONLY
-        cleaned_desc = parkrun.get('descriptions', {}).get('cleaned', '')
-        summary = parkrun.get('descriptions', {}).get('summary', '')
-        
-        keywords_cleaned = find_keywords_in_text(cleaned_desc, keywords_dict) if cleaned_desc else []
-        keywords_summary = find_keywords_in_text(summary, keywords_dict) if summary else []
+    scorer = compile_scorer(keywords_dict, MATCH_SUBSTRING)
+    rescored = [parkrun for parkrun in parkruns if parkrun['slug'] in affected]
+    matched_per_parkrun = []
+    previous = []
+    changed_slugs = []
+    
+    for parkrun in rescored:
+        # Keywords found in cleaned description and summary ONLY
+        found = index.found_keys(parkrun['slug'])
+        matched_cleaned = scorer.entries_for_keys(found['cleaned_description'])
+        matched_summary = scorer.entries_for_keys(found['summary'])
         
         # Combine and deduplicate
-        all_keywords = {kw['keyword']: kw for kw in (keywords_cleaned + keywords_summary)}
-        matched_keywords = list(all_keywords.values())
-        
-        # Recalculate accessibility scores
-        accessibility = calculate_accessibility_scores(matched_keywords, BASE_SCORES)
+        matched = scorer.unique_keywords(matched_cleaned + matched_summary)
+        matched_per_parkrun.append(matched)
+        keywords_cleaned = scorer.details(matched_cleaned)
+        keywords_summary = scorer.details(matched_summary)
+        matched_keywords = scorer.details(matched)
+        previous.append((parkrun.get('keywords'), parkrun.get('accessibility')))
         
         # Update the parkrun data
         parkrun['keywords'] = {
@@ -140,24 +131,37 @@ def main():
             "details": matched_keywords
         }
         
+        if len(matched_per_parkrun) % 100 == 0:
+            print(f"Processed {len(matched_per_parkrun)} parkruns...")
+    
+    # Recalculate accessibility scores for every affected parkrun at once
+    all_accessibility = calculate_accessibility_scores_batch(matched_per_parkrun, BASE_SCORES, scorer)
+    for parkrun, accessibility, before in zip(rescored, all_accessibility, previous):
         parkrun['accessibility'] = accessibility
+        if (parkrun['keywords'], accessibility) != before:
+            changed_slugs.append(parkrun['slug'])
+    
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Recalculated scores for {len(rescored)} parkruns in {elapsed:.2f}s")
+    print(f"   Scoring: {scorer.timings.describe()}")
+    print(f"   {len(changed_slugs)} parkruns have new scores")
+    for slug in changed_slugs[:50]:
+        print(f"   - {slug}")
+    if len(changed_slugs) > 50:
+        print(f"   ... and {len(changed_slugs) - 50} more")
+    
+    index.save(args.index)
+    
+    if changed_slugs:
+        # Update metadata
+        gold_data['metadata']['last_updated'] = "Scores recalculated from cleaned descriptions"
         
-        updated_count += 1
+        # Save updated data
+        print("\nSaving updated gold data...")
+        with open('gold_parkrun_data.json', 'w', encoding='utf-8') as f:
+            json.dump(gold_data, f, ensure_ascii=False, indent=2)
         
-        if updated_count % 100 == 0:
-            print(f"Processed {updated_count} parkruns...")
-    
-    print(f"\n✅ Recalculated scores for {updated_count} parkruns")
-    
-    # Update metadata
-    gold_data['metadata']['last_updated'] = "Scores recalculated from cleaned descriptions"
-    
-    # Save updated data
-    print("\nSaving updated gold data...")
-    with open('gold_parkrun_data.json', 'w', encoding='utf-8') as f:
-        json.dump(gold_data, f, ensure_ascii=False, indent=2)
-    
-    print("✅ Saved to gold_parkrun_data.json")
+        print("✅ Saved to gold_parkrun_data.json")
     
     # Show sample of changes
     print("\n" + "="*80)
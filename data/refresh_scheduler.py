@@ -0,0 +1,200 @@
+"""
+Freshness-aware selection of course pages to re-scrape.
+
+Most parkrun course pages change rarely, so a nightly refresh doesn't need
+to re-crawl all ~2,750 of them. Every parkrun_detail.json record carries
+a hash of its description and a small change history (how often the page
+was checked, how often it had changed, when it last changed). From that
+each page gets an estimated probability of having changed since it was
+last scraped, and only the most likely stale pages are refreshed, within a
+request or time budget.
+
+Priority order:
+    1. never scraped (no record, or still 'pending')
+    2. last scrape failed
+    3. everything else, by estimated staleness
+
+Usage:
+    previous = load_previous_details('parkrun_detail.json')
+    selected = select_for_refresh(events, previous, budget=300)
+    ...scrape selected...
+    record = with_change_history(new_record, previous.get(slug))
+"""
+
+import hashlib
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from host_scheduler import host_key
+
+# Prior for the change-rate estimate: a page nobody has seen change yet is
+# assumed to change about once per PRIOR_DAYS days
+PRIOR_CHANGES = 1.0
+PRIOR_DAYS = 180.0
+
+TIER_NEVER_SCRAPED = 0
+TIER_FAILED = 1
+TIER_SCRAPED = 2
+
+
+def content_hash(text: Optional[str]) -> Optional[str]:
+    """Short stable hash of a page's extracted description (None if there is none)."""
+    if not text:
+        return None
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def load_previous_details(path: str) -> Dict[str, Dict]:
+    """Records of the last parkrun_detail.json, keyed by slug (empty if there is none)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {event['slug']: event for event in data.get('events', []) if event.get('slug')}
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def with_change_history(record: Dict, previous: Optional[Dict]) -> Dict:
+    """
+    Carry the change history of previous over to a freshly scraped record.
+
+    A failed refresh of a page that was scraped successfully before keeps the
+    old content (and notes when the refresh failed) instead of losing it.
+
+    Returns:
+        The record to store: record with contentHash, firstScrapedAt,
+        checkCount, changeCount and lastChangedAt filled in
+    """
+    previous_ok = previous is not None and previous.get('scrapingStatus') == 'success'
+    if previous_ok and record.get('scrapedAt') == previous.get('scrapedAt'):
+        return previous  # Same check (e.g. re-compacting the journal), nothing new
+
+    if record.get('scrapingStatus') != 'success':
+        if previous_ok:
+            return {**previous, 'lastFailedAt': datetime.now().isoformat()}
+        return record
+
+    record = dict(record)
+    record['contentHash'] = record.get('contentHash') or content_hash(record.get('description'))
+
+    if not previous_ok:
+        record['firstScrapedAt'] = record.get('scrapedAt')
+        record['checkCount'] = 1
+        record['changeCount'] = 0
+        record['lastChangedAt'] = record.get('scrapedAt')
+        return record
+
+    previous_hash = previous.get('contentHash') or content_hash(previous.get('description'))
+    record['firstScrapedAt'] = previous.get('firstScrapedAt') or previous.get('scrapedAt')
+    record['checkCount'] = previous.get('checkCount', 1) + 1
+    if record['contentHash'] != previous_hash:
+        record['changeCount'] = previous.get('changeCount', 0) + 1
+        record['lastChangedAt'] = record.get('scrapedAt')
+    else:
+        record['changeCount'] = previous.get('changeCount', 0)
+        record['lastChangedAt'] = previous.get('lastChangedAt') or previous.get('scrapedAt')
+    return record
+
+
+def staleness(record: Dict, now: Optional[datetime] = None) -> float:
+    """
+    Estimated probability that the page changed since it was last scraped.
+
+    Changes are modelled as a Poisson process whose rate is the number of
+    observed changes over the observed time span, smoothed with a prior.
+    """
+    now = now or datetime.now()
+    scraped_at = _parse_time(record.get('scrapedAt'))
+    if scraped_at is None:
+        return 1.0
+
+    age_days = max(0.0, (now - scraped_at).total_seconds() / 86400)
+    first_seen = _parse_time(record.get('firstScrapedAt')) or scraped_at
+    checks = record.get('checkCount', 1)
+    # Observed span: time between the first and the last check, at least a day per check
+    span_days = max((scraped_at - first_seen).total_seconds() / 86400, float(checks))
+    rate = (record.get('changeCount', 0) + PRIOR_CHANGES) / (span_days + PRIOR_DAYS)
+    return 1.0 - math.exp(-rate * age_days)
+
+
+def refresh_priority(event: Dict, record: Optional[Dict], now: Optional[datetime] = None) -> Tuple[int, float]:
+    """Sort key for an event (lower sorts first): (tier, -staleness)."""
+    status = record.get('scrapingStatus') if record else None
+    if status == 'failed':
+        return TIER_FAILED, -1.0
+    if status != 'success' or not record.get('scrapedAt'):
+        return TIER_NEVER_SCRAPED, -1.0
+    return TIER_SCRAPED, -staleness(record, now)
+
+
+def request_capacity(events: List[Dict], time_budget: float, min_delay: float,
+                     per_host: bool) -> Dict[str, int]:
+    """
+    Requests that fit in time_budget seconds at one request per min_delay.
+
+    Returns:
+        host -> capacity when hosts are fetched in parallel (per_host),
+        otherwise {'': total capacity}
+    """
+    capacity = int(time_budget / min_delay) + 1 if min_delay > 0 else len(events)
+    if not per_host:
+        return {'': capacity}
+    return {host_key(e.get('coursePageUrl') or ''): capacity for e in events}
+
+
+def select_for_refresh(events: List[Dict], previous: Dict[str, Dict], budget: Optional[int] = None,
+                       time_budget: Optional[float] = None, min_delay: float = 1.0,
+                       per_host: bool = False, now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Pick the events to re-scrape, most likely stale first.
+
+    Args:
+        events: Silver events (with coursePageUrl)
+        previous: Last detail records by slug (see load_previous_details)
+        budget: Maximum number of requests
+        time_budget: Maximum run time in seconds, converted to requests at
+                     one request per min_delay (per host if per_host)
+        min_delay: Minimum seconds between requests to one host
+        per_host: Hosts are fetched in parallel (pipelined mode)
+        now: Reference time (default: now)
+
+    Returns:
+        Selected events in priority order
+    """
+    now = now or datetime.now()
+    candidates = [e for e in events if e.get('coursePageUrl')]
+    ranked = sorted(
+        enumerate(candidates),
+        key=lambda item: (refresh_priority(item[1], previous.get(item[1].get('slug')), now), item[0])
+    )
+
+    capacity = request_capacity(candidates, time_budget, min_delay, per_host) if time_budget is not None else None
+
+    selected = []
+    for _, event in ranked:
+        if budget is not None and len(selected) >= budget:
+            break
+        if capacity is not None:
+            host = host_key(event.get('coursePageUrl') or '') if per_host else ''
+            if capacity[host] <= 0:
+                continue
+            capacity[host] -= 1
+        selected.append(event)
+    return selected
+
+
+def describe_selection(selected: List[Dict], previous: Dict[str, Dict], now: Optional[datetime] = None) -> str:
+    """One-line breakdown of a selection by priority tier."""
+    now = now or datetime.now()
+    tiers = [refresh_priority(e, previous.get(e.get('slug')), now)[0] for e in selected]
+    return (f"{tiers.count(TIER_NEVER_SCRAPED)} never scraped, {tiers.count(TIER_FAILED)} failed, "
+            f"{tiers.count(TIER_SCRAPED)} possibly stale")
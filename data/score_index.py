@@ -0,0 +1,268 @@
+"""
+Inverted keyword -> events index for incremental rescoring.
+
+Every keywords.json revision used to mean re-scanning every cleaned
+description and summary in gold_parkrun_data.json. recalculate_scores.py
+now keeps score_index.json next to it, holding:
+
+- the keyword config it was built with (each keyword entry with its
+  impacts, the base scores, and a fingerprint of both)
+- for each keyword, the slugs whose cleaned description or summary
+  contains it (postings, per source)
+- a fingerprint of each event's texts
+
+With a new config, ScoreIndex.update diffs it against the stored one.
+Only events that contain an added, removed or re-weighted keyword need
+rescoring, plus every event when a base score changed. Only added keywords
+are looked for in the stored texts, and only events whose texts changed
+are scanned in full.
+
+Keys are lowercased keywords, matched as substrings of the lowercased text
+(the MATCH_SUBSTRING mode of scoring.py).
+
+Usage:
+    index = ScoreIndex.load('score_index.json')
+    affected = index.update(parkruns, keywords_dict, BASE_SCORES)
+    found = index.found_keys(slug)          # {'cleaned_description': {...}, 'summary': {...}}
+    index.save('score_index.json')
+"""
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_INDEX_FILE = 'score_index.json'
+INDEX_VERSION = 1
+SOURCES = ('cleaned_description', 'summary')
+
+
+def keyword_entries(keywords_dict: Dict) -> List[Tuple[str, str, str, Dict]]:
+    """(keyword, category, subcategory, impacts) of every keyword, in config order."""
+    entries = []
+    for category, category_data in keywords_dict.items():
+        if category == "metadata" or not isinstance(category_data, dict):
+            continue
+        for subcategory, subcat_data in category_data.items():
+            if isinstance(subcat_data, dict) and 'keywords' in subcat_data:
+                impact = subcat_data.get('impact', {})
+                for keyword in subcat_data['keywords']:
+                    entries.append((keyword, category, subcategory, impact))
+    return entries
+
+
+def config_fingerprint(entries: List[Tuple[str, str, str, Dict]], base_scores: Dict[str, int]) -> str:
+    """Hash of everything in a keyword config and base scores that affects scores."""
+    canonical = json.dumps([entries, base_scores], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def parkrun_texts(parkrun: Dict) -> Dict[str, str]:
+    """The texts keywords are matched in, by source."""
+    descriptions = parkrun.get('descriptions', {})
+    return {
+        'cleaned_description': descriptions.get('cleaned', '') or '',
+        'summary': descriptions.get('summary', '') or ''
+    }
+
+
+def text_fingerprint(texts: Dict[str, str]) -> str:
+    joined = '\0'.join(texts[source] for source in SOURCES)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+
+def _signatures(entries: List[Tuple[str, str, str, Dict]]) -> Dict[str, List]:
+    """Entries (with impacts) of each key, in config order."""
+    signatures = defaultdict(list)
+    for keyword, category, subcategory, impact in entries:
+        signatures[keyword.lower()].append([keyword, category, subcategory, impact])
+    return signatures
+
+
+@dataclass
+class ConfigDiff:
+    """What changed between the indexed keyword config and a new one."""
+    added: Set[str] = field(default_factory=set)
+    removed: Set[str] = field(default_factory=set)
+    reweighted: Set[str] = field(default_factory=set)
+    base_scores: Set[str] = field(default_factory=set)  # mobility types whose base score changed
+    reordered: bool = False                             # matches would come out in a new order
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.reweighted or self.base_scores or self.reordered)
+
+
+class ScoreIndex:
+    """Keyword postings of every event, with the config they were built for."""
+
+    def __init__(self, entries: List[Tuple[str, str, str, Dict]], base_scores: Dict[str, int],
+                 postings: Dict[str, Dict[str, Set[str]]], texts: Dict[str, str]):
+        self.entries = [tuple(entry) for entry in entries]
+        self.base_scores = dict(base_scores)
+        self.postings = postings    # key -> source -> slugs
+        self.texts = texts          # slug -> text fingerprint
+        self.diff = ConfigDiff()    # of the last update
+        self._found: Optional[Dict[str, Dict[str, Set[str]]]] = None
+
+    @property
+    def fingerprint(self) -> str:
+        return config_fingerprint(self.entries, self.base_scores)
+
+    @property
+    def keys(self) -> Set[str]:
+        return {keyword.lower() for keyword, _, _, _ in self.entries}
+
+    @classmethod
+    def build(cls, parkruns: Iterable[Dict], keywords_dict: Dict, base_scores: Dict[str, int]) -> 'ScoreIndex':
+        """Index every parkrun from scratch."""
+        index = cls(keyword_entries(keywords_dict), base_scores, {}, {})
+        keys = index.keys
+        for parkrun in parkruns:
+            index._index_parkrun(parkrun, keys)
+        return index
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_FILE) -> Optional['ScoreIndex']:
+        """The saved index, or None if it is missing, unreadable or from another version."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        postings = {
+            key: {source: set(slugs) for source, slugs in by_source.items()}
+            for key, by_source in data['postings'].items()
+        }
+        index = cls(data['entries'], data['base_scores'], postings, data['texts'])
+        if index.fingerprint != data.get('fingerprint'):
+            return None
+        return index
+
+    def save(self, path: str = DEFAULT_INDEX_FILE):
+        data = {
+            'version': INDEX_VERSION,
+            'fingerprint': self.fingerprint,
+            'base_scores': self.base_scores,
+            'entries': self.entries,
+            'postings': {
+                key: {source: sorted(slugs) for source, slugs in by_source.items() if slugs}
+                for key, by_source in sorted(self.postings.items())
+            },
+            'texts': self.texts
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def found_keys(self, slug: str) -> Dict[str, Set[str]]:
+        """Keys found in each source of one event."""
+        if self._found is None:
+            found = defaultdict(lambda: {source: set() for source in SOURCES})
+            for key, by_source in self.postings.items():
+                for source, slugs in by_source.items():
+                    for posting_slug in slugs:
+                        found[posting_slug][source].add(key)
+            self._found = found
+        return self._found.get(slug, {source: set() for source in SOURCES})
+
+    def events_with(self, keys: Iterable[str]) -> Set[str]:
+        """Slugs whose texts contain any of the keys."""
+        slugs = set()
+        for key in keys:
+            for source_slugs in self.postings.get(key, {}).values():
+                slugs |= source_slugs
+        return slugs
+
+    def _index_parkrun(self, parkrun: Dict, keys: Iterable[str]):
+        """Scan an event's texts for keys and add it to their postings."""
+        slug = parkrun['slug']
+        texts = parkrun_texts(parkrun)
+        self.texts[slug] = text_fingerprint(texts)
+        for source in SOURCES:
+            text_lower = texts[source].lower()
+            if not text_lower:
+                continue
+            for key in keys:
+                if key in text_lower:
+                    self.postings.setdefault(key, {}).setdefault(source, set()).add(slug)
+        self._found = None
+
+    def _drop_events(self, slugs: Set[str]):
+        for by_source in self.postings.values():
+            for source_slugs in by_source.values():
+                source_slugs -= slugs
+        for slug in slugs:
+            self.texts.pop(slug, None)
+        self._found = None
+
+    def update(self, parkruns: List[Dict], keywords_dict: Dict, base_scores: Dict[str, int]) -> Set[str]:
+        """
+        Bring the index up to date with new parkrun texts and keyword config.
+
+        Returns:
+            Slugs whose matches or scores may have changed (the diff is in self.diff)
+        """
+        entries = [tuple(entry) for entry in keyword_entries(keywords_dict)]
+        old_signatures = _signatures(self.entries)
+        new_signatures = _signatures(entries)
+
+        diff = ConfigDiff()
+        diff.added = set(new_signatures) - set(old_signatures)
+        diff.removed = set(old_signatures) - set(new_signatures)
+        diff.reweighted = {
+            key for key in set(old_signatures) & set(new_signatures)
+            if old_signatures[key] != new_signatures[key]
+        }
+        diff.base_scores = {
+            mt for mt in set(self.base_scores) | set(base_scores)
+            if self.base_scores.get(mt) != base_scores.get(mt)
+        }
+        # Matches are listed in config order, so moving an unchanged keyword changes every event it is in
+        unchanged = (set(old_signatures) & set(new_signatures)) - diff.reweighted
+        old_order = [entry[:3] for entry in self.entries if entry[0].lower() in unchanged]
+        new_order = [entry[:3] for entry in entries if entry[0].lower() in unchanged]
+        diff.reordered = old_order != new_order
+        if list(base_scores) != list(self.base_scores):
+            diff.reordered = True  # mobility types come out in base_scores order
+
+        affected = set()
+        # Events that were added, removed or had their texts edited
+        current = {parkrun['slug']: parkrun for parkrun in parkruns}
+        gone = set(self.texts) - set(current)
+        self._drop_events(gone)
+        rescan = [
+            parkrun for slug, parkrun in current.items()
+            if self.texts.get(slug) != text_fingerprint(parkrun_texts(parkrun))
+        ]
+        if rescan:
+            self._drop_events({parkrun['slug'] for parkrun in rescan})
+            for parkrun in rescan:
+                self._index_parkrun(parkrun, new_signatures.keys())
+            affected |= {parkrun['slug'] for parkrun in rescan}
+
+        # Keyword changes: only added keywords need looking for in the texts
+        affected |= self.events_with(diff.removed | diff.reweighted)
+        for key in diff.removed:
+            self.postings.pop(key, None)
+        if diff.added:
+            rescanned = {parkrun['slug'] for parkrun in rescan}
+            for slug, parkrun in current.items():
+                if slug not in rescanned:
+                    self._index_parkrun(parkrun, diff.added)
+            affected |= self.events_with(diff.added)
+
+        if diff.base_scores or diff.reordered:
+            affected |= set(current)
+
+        self.entries = entries
+        self.base_scores = dict(base_scores)
+        self.diff = diff
+        self._found = None
+        return affected
@@ -0,0 +1,149 @@
+"""
+Streaming score statistics for analyze_accessibility.analyze_all_events.
+
+analyze_all_events used to append every event's score to a best and a
+worst list per mobility type, then sort each list in full to keep 5
+courses. ScoreStatistics takes one event at a time and keeps, per mobility
+type:
+
+- the top and bottom K courses, in bounded heaps (O(log K) per event)
+- the category counts (excellent, good, ...)
+- a histogram with one bin per score point (0-100)
+
+It also keeps a histogram per country. The p10/p50/p90 quantiles come from
+the histograms, so memory stays fixed however many events there are.
+Quantiles are exact for whole-number scores and round fractional scores
+down to the point. Ties in the top/bottom K go to the course seen first,
+the same result as the stable sort used before.
+
+Usage:
+    summary = ScoreStatistics(mobility_types, categorize_score)
+    for event in events:
+        summary.add(event['name'], country, scores)    # scores: {mobility_type: score}
+    summary.best('racing_chair'); summary.quantiles('racing_chair')
+    statistics.update(summary.to_dict())
+"""
+
+import heapq
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+TOP_K = 5
+QUANTILES = (0.1, 0.5, 0.9)
+MIN_SCORE = 0
+MAX_SCORE = 100
+BAND_WIDTH = 10  # Histogram bands in the output statistics
+
+
+class ScoreHistogram:
+    """Counts of scores per whole point from MIN_SCORE to MAX_SCORE."""
+
+    def __init__(self):
+        self.counts = [0] * (MAX_SCORE - MIN_SCORE + 1)
+        self.total = 0
+
+    def add(self, score: float):
+        point = min(max(int(math.floor(score)), MIN_SCORE), MAX_SCORE)
+        self.counts[point - MIN_SCORE] += 1
+        self.total += 1
+
+    def quantile(self, q: float) -> Optional[int]:
+        """Smallest score point with at least q of the scores at or below it (None if empty)."""
+        if self.total == 0:
+            return None
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return MIN_SCORE + i
+        return MAX_SCORE
+
+    def quantiles(self) -> Dict[str, Optional[int]]:
+        return {f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES}
+
+    def bands(self, width: int = BAND_WIDTH) -> List[int]:
+        """Counts per band of width points; the last band also holds MAX_SCORE."""
+        bands = [sum(self.counts[i:i + width]) for i in range(0, MAX_SCORE - MIN_SCORE, width)]
+        bands[-1] += sum(self.counts[len(bands) * width:])
+        return bands
+
+
+class ScoreStatistics:
+    """Top/bottom K courses, category counts, histograms and quantiles of a stream of events."""
+
+    def __init__(self, mobility_types: Sequence[str], categorize: Callable[[float], str], k: int = TOP_K):
+        self.mobility_types = list(mobility_types)
+        self.categorize = categorize
+        self.k = k
+        self.events = 0
+        # Min-heap of the k highest (score, -seq, name); max-heap (negated) of the k lowest
+        self._best: Dict[str, List[Tuple[float, int, str]]] = {mt: [] for mt in self.mobility_types}
+        self._worst: Dict[str, List[Tuple[float, int, str]]] = {mt: [] for mt in self.mobility_types}
+        self.distribution: Dict[str, Dict[str, int]] = {mt: {} for mt in self.mobility_types}
+        self.histograms = {mt: ScoreHistogram() for mt in self.mobility_types}
+        self.country_histograms: Dict[str, Dict[str, ScoreHistogram]] = {}
+        self.country_events: Dict[str, int] = {}
+
+    def add(self, name: str, country: Optional[str], scores: Dict[str, float]):
+        """Add one event's score for every mobility type."""
+        seq = self.events
+        self.events += 1
+        country = str(country) if country not in (None, '') else 'unknown'
+        if country not in self.country_histograms:
+            self.country_histograms[country] = {mt: ScoreHistogram() for mt in self.mobility_types}
+            self.country_events[country] = 0
+        self.country_events[country] += 1
+
+        for mt in self.mobility_types:
+            score = scores[mt]
+            category = self.categorize(score)
+            self.distribution[mt][category] = self.distribution[mt].get(category, 0) + 1
+            self.histograms[mt].add(score)
+            self.country_histograms[country][mt].add(score)
+
+            best = self._best[mt]
+            if len(best) < self.k:
+                heapq.heappush(best, (score, -seq, name))
+            elif (score, -seq) > best[0][:2]:
+                heapq.heapreplace(best, (score, -seq, name))
+
+            worst = self._worst[mt]
+            if len(worst) < self.k:
+                heapq.heappush(worst, (-score, -seq, name))
+            elif (-score, -seq) > worst[0][:2]:
+                heapq.heapreplace(worst, (-score, -seq, name))
+
+    def best(self, mobility_type: str) -> List[Dict]:
+        """Highest-scoring courses, best first."""
+        ranked = sorted(self._best[mobility_type], key=lambda item: (-item[0], -item[1]))
+        return [{'name': name, 'score': score} for score, _, name in ranked]
+
+    def worst(self, mobility_type: str) -> List[Dict]:
+        """Lowest-scoring courses, worst first."""
+        ranked = sorted(self._worst[mobility_type], key=lambda item: (-item[0], -item[1]))
+        return [{'name': name, 'score': -neg_score} for neg_score, _, name in ranked]
+
+    def quantiles(self, mobility_type: str) -> Dict[str, Optional[int]]:
+        return self.histograms[mobility_type].quantiles()
+
+    def country_quantiles(self) -> Dict[str, Dict]:
+        """Event count and quantiles per mobility type of each country, by country."""
+        return {
+            country: {
+                'events': self.country_events[country],
+                **{mt: histograms[mt].quantiles() for mt in self.mobility_types}
+            }
+            for country, histograms in sorted(self.country_histograms.items())
+        }
+
+    def to_dict(self) -> Dict:
+        """The summary as stored in the output's statistics."""
+        return {
+            'score_distribution': {mt: dict(self.distribution[mt]) for mt in self.mobility_types},
+            'best_courses': {mt: self.best(mt) for mt in self.mobility_types},
+            'worst_courses': {mt: self.worst(mt) for mt in self.mobility_types},
+            'score_quantiles': {mt: self.quantiles(mt) for mt in self.mobility_types},
+            'score_histograms': {mt: self.histograms[mt].bands() for mt in self.mobility_types},
+            'country_quantiles': self.country_quantiles()
+        }
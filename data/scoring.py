@@ -0,0 +1,195 @@
+"""
+One keyword scorer for the analyze, gold and recalculate entry points.
+
+analyze_accessibility.py, create_gold_parkrun_data.py and
+recalculate_scores.py each walked the nested keywords.json structure for
+every event, with their own matching rules. compile_scorer turns a keyword
+config into a KeywordScorer once, and caches it by a hash of the config and
+the matching mode, so every later call with the same config gets the same
+object. Matching mode and base scores are explicit:
+
+- MATCH_WORD: '\\bkeyword\\b' on lowercased, whitespace-normalized text
+  (analyze_accessibility.py; one compiled scan, see keyword_matcher.py)
+- MATCH_SUBSTRING: keyword.lower() in text.lower()
+  (create_gold_parkrun_data.py and recalculate_scores.py)
+
+Matches are entry indices in keywords.json order; scores come from one
+batch matrix product (see batch_scoring.py). Each scorer counts how often
+and for how long it matched and scored.
+
+Usage:
+    scorer = compile_scorer(keywords_config, MATCH_SUBSTRING)
+    rows = [scorer.find(text) for text in texts]
+    scores = scorer.score(rows, BASE_SCORES)     # BatchScores
+    print(scorer.timings.describe())
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Set, Tuple
+
+from batch_scoring import BatchScores, ImpactMatrix, Incidence, KeywordEntry, score_batch
+from keyword_matcher import KeywordMatcher, normalize_text
+
+MATCH_WORD = 'word'
+MATCH_SUBSTRING = 'substring'
+MATCH_MODES = (MATCH_WORD, MATCH_SUBSTRING)
+
+
+def config_hash(keywords_config: Dict) -> str:
+    """Hash of a keyword config (key order included: matches are listed in config order)."""
+    canonical = json.dumps(keywords_config, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class ScorerTimings:
+    """Call counts and time spent by one scorer."""
+    compile_seconds: float = 0.0
+    match_calls: int = 0
+    match_seconds: float = 0.0
+    score_calls: int = 0
+    score_seconds: float = 0.0
+    events_scored: int = 0
+
+    def describe(self) -> str:
+        return (f"compiled in {self.compile_seconds * 1000:.1f} ms, "
+                f"{self.match_calls} texts matched in {self.match_seconds:.3f}s, "
+                f"{self.events_scored} events scored in {self.score_seconds:.3f}s "
+                f"({self.score_calls} calls)")
+
+
+class KeywordScorer:
+    """
+    A keyword config compiled for one matching mode.
+
+    Treat it as immutable: it is shared by everyone who compiles the same
+    config. Only the timing counters change.
+    """
+
+    def __init__(self, keywords_config: Dict, mode: str = MATCH_WORD):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown matching mode {mode!r} (expected one of {MATCH_MODES})")
+        start = time.perf_counter()
+        self.mode = mode
+        self.impacts = ImpactMatrix(keywords_config, _mobility_types(keywords_config))
+        self.impacts.matrix.setflags(write=False)
+        self.entries: Tuple[KeywordEntry, ...] = tuple(self.impacts.entries)
+        self.mobility_types: Tuple[str, ...] = tuple(self.impacts.mobility_types)
+        # Each entry's impact dict as written in the config (copied: the config may change later)
+        self.entry_impacts: Tuple[Dict, ...] = tuple(
+            dict(keywords_config[entry.category][entry.subcategory].get('impact', {}))
+            for entry in self.entries
+        )
+
+        if mode == MATCH_WORD:
+            self._matcher = KeywordMatcher(keywords_config)
+            self.keys = tuple(normalize_text(entry.keyword) for entry in self.entries)
+        else:
+            self._matcher = None
+            self.keys = tuple(entry.keyword.lower() for entry in self.entries)
+        self._unique_keys = tuple(dict.fromkeys(self.keys))
+
+        self.timings = ScorerTimings(compile_seconds=time.perf_counter() - start)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def found_keys(self, text: str) -> Set[str]:
+        """Keys (normalized keywords) that occur in a text under this scorer's mode."""
+        if not text:
+            return set()
+        if self.mode == MATCH_WORD:
+            return self._matcher.found_keywords(normalize_text(text))
+        text_lower = text.lower()
+        return {key for key in self._unique_keys if key in text_lower}
+
+    def entries_for_keys(self, found: Set[str]) -> List[int]:
+        """Entry indices of the keys, in config order."""
+        return [i for i, key in enumerate(self.keys) if key in found]
+
+    def find(self, text: str) -> List[int]:
+        """Entry indices of every keyword in a text, in config order."""
+        start = time.perf_counter()
+        found = self.entries_for_keys(self.found_keys(text))
+        self._count('match', start)
+        return found
+
+    def unique_keywords(self, indices: Sequence[int]) -> List[int]:
+        """
+        One entry per keyword text: the last entry of each keyword, at the
+        position of its first (same as {keyword: match} over the matches).
+        """
+        by_keyword = {}
+        for i in indices:
+            by_keyword[self.entries[i].keyword] = i
+        return list(by_keyword.values())
+
+    def details(self, indices: Sequence[int]) -> List[Dict]:
+        """Matches as stored in gold_parkrun_data.json ('keywords' -> 'details')."""
+        return [
+            {
+                "keyword": self.entries[i].keyword,
+                "category": f"{self.entries[i].category}/{self.entries[i].subcategory}",
+                "impacts": self.entry_impacts[i]
+            }
+            for i in indices
+        ]
+
+    def score(self, rows: Sequence[Sequence[int]], base_scores: Dict[str, float]) -> BatchScores:
+        """
+        Score many events at once: rows[i] holds event i's entry indices.
+
+        Raises:
+            ValueError: if base_scores names a mobility type the config doesn't have
+        """
+        unknown = [mt for mt in base_scores if mt not in self.mobility_types]
+        if unknown:
+            raise ValueError(f"No impacts for mobility types {unknown} in the keyword config")
+        start = time.perf_counter()
+        scores = score_batch(Incidence.from_rows(rows), self.impacts, base_scores)
+        self._count('score', start, events=len(rows))
+        return scores
+
+    def _count(self, counter: str, start: float, events: int = 0):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if counter == 'match':
+                self.timings.match_calls += 1
+                self.timings.match_seconds += elapsed
+            else:
+                self.timings.score_calls += 1
+                self.timings.score_seconds += elapsed
+                self.timings.events_scored += events
+
+
+def _mobility_types(keywords_config: Dict) -> List[str]:
+    """Mobility types of the config's metadata, then any others its impacts name."""
+    mobility_types = list(keywords_config.get('metadata', {}).get('mobility_types', []))
+    for category_name, category_data in keywords_config.items():
+        if category_name == 'metadata' or not isinstance(category_data, dict):
+            continue
+        for subcategory_data in category_data.values():
+            if isinstance(subcategory_data, dict):
+                for mobility_type in subcategory_data.get('impact', {}):
+                    if mobility_type not in mobility_types:
+                        mobility_types.append(mobility_type)
+    return mobility_types
+
+
+_SCORERS: Dict[Tuple[str, str], KeywordScorer] = {}
+_SCORERS_LOCK = threading.Lock()
+
+
+def compile_scorer(keywords_config: Dict, mode: str = MATCH_WORD) -> KeywordScorer:
+    """The KeywordScorer of a config and matching mode, compiled on first use."""
+    key = (config_hash(keywords_config), mode)
+    with _SCORERS_LOCK:
+        scorer = _SCORERS.get(key)
+        if scorer is None:
+            scorer = _SCORERS[key] = KeywordScorer(keywords_config, mode)
+    return scorer
@@ -0,0 +1,86 @@
+"""
+Append-only JSONL journal for resumable scraping.
+
+Each event is written to the journal as soon as it finishes, so a network
+drop or Ctrl-C only loses the page that was in flight. A resumed run skips
+every slug already in the journal, and compaction turns the journal back
+into the ordered event list that goes into parkrun_detail.json /
+silver_data.json.
+
+Usage:
+    journal = ScrapeJournal('parkrun_detail.journal.jsonl')
+    done = journal.load()              # slug -> record
+    journal.append(record)             # after each event
+    events = journal.compact(slugs)    # final ordered list
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List
+
+
+class ScrapeJournal:
+    """One JSON record per line, keyed by the record's 'slug'."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict]:
+        """
+        Read all journalled records.
+
+        A later record for the same slug replaces an earlier one. A partially
+        written last line (e.g. from Ctrl-C) is dropped from the file.
+
+        Returns:
+            Dictionary of slug -> record
+        """
+        records: Dict[str, Dict] = {}
+        if not os.path.exists(self.path):
+            return records
+
+        self._drop_partial_line()
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record['slug']] = record
+        return records
+
+    def _drop_partial_line(self):
+        """Truncate a half-written last line so new records start on a fresh line."""
+        with self._lock:
+            with open(self.path, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b'\n'):
+                    f.truncate(data.rfind(b'\n') + 1)
+
+    def append(self, record: Dict):
+        """Append one finished record and flush it to disk (thread-safe)."""
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+
+    def reset(self):
+        """Start a fresh journal, discarding previous records."""
+        with self._lock:
+            open(self.path, 'w', encoding='utf-8').close()
+
+    def compact(self, slugs: Iterable[str]) -> List[Dict]:
+        """
+        Return journalled records in the given slug order.
+
+        Slugs that are not in the journal are left out.
+        """
+        records = self.load()
+        return [records[slug] for slug in slugs if slug in records]
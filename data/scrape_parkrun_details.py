@@ -6,33 +6,57 @@ This script scrapes detailed information from parkrun course pages including:
 - Postcodes (from 'getting there by road' sections)
 
 Usage:
-    python scrape_parkrun_details.py
+    python scrape_parkrun_details.py             # full scrape
+    python scrape_parkrun_details.py --resume    # continue an interrupted run
+    python scrape_parkrun_details.py --compact   # merge the journal into the JSON, no scraping
+    python scrape_parkrun_details.py --refresh --refresh-budget 300   # nightly: only the stalest pages
+    python scrape_parkrun_details.py --from-archive   # re-extract from course_pages.archive, no network
 
 Output:
     parkrun_detail.json - Detailed course information for all parkrun events
+    parkrun_detail.journal.jsonl - Progress journal, one line per finished event
+    course_pages.archive - Raw HTML of every fetched course page (see page_archive.py)
 """
 
+import argparse
 import json
+import queue
 import requests
-from bs4 import BeautifulSoup
-import time
-import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from typing import Dict, List, Optional
 from datetime import datetime
 
+from course_page import (
+    DEFAULT_PARSER,
+    available_parsers,
+    extract_fields,
+    extract_page_fields,
+    fetch_course_page,
+)
+from host_scheduler import host_key, run_per_host
+from http_cache import DEFAULT_CACHE_FILE, ResponseCache
+from http_client import HttpClient
+from page_archive import DEFAULT_ARCHIVE_FILE, PageArchive
+from rate_control import RateController
+from refresh_scheduler import (
+    content_hash,
+    describe_selection,
+    load_previous_details,
+    select_for_refresh,
+    with_change_history,
+)
+from scrape_journal import ScrapeJournal
+
 # Configuration
 INPUT_FILE = 'silver_data.json'
 OUTPUT_FILE = 'parkrun_detail.json'
-RATE_LIMIT_DELAY = 1.0  # Seconds between requests (respectful scraping)
+JOURNAL_FILE = 'parkrun_detail.journal.jsonl'
+RATE_LIMIT_DELAY = 1.0  # Minimum seconds between requests to one host (respectful scraping)
 REQUEST_TIMEOUT = 10  # Seconds
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-
-# UK Postcode regex pattern
-# Matches formats like: SW1A 1AA, EC1A 1BB, W1A 0AX, etc.
-UK_POSTCODE_PATTERN = re.compile(
-    r'\b([A-Z]{1,2}\d{1,2}[A-Z]?)\s*(\d[A-Z]{2})\b',
-    re.IGNORECASE
-)
+PAGE_QUEUE_SIZE = 64  # Max downloaded pages waiting for a parser (pipelined mode)
+DEFAULT_REFRESH_BUDGET = 200  # Pages re-scraped by --refresh without an explicit budget
 
 def load_silver_data() -> Dict:
     """Load the silver_data.json file"""
@@ -40,142 +64,52 @@ def load_silver_data() -> Dict:
     with open(INPUT_FILE, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def extract_text_content(soup: BeautifulSoup) -> str:
-    """
-    Extract ALL relevant text content from the page.
-    This is critical for accessibility analysis - we need every detail.
-    
-    Args:
-        soup: BeautifulSoup object of the page
-        
-    Returns:
-        Combined text content as a single string
-    """
-    text_parts = []
-    
-    # Find the main content area (usually div with id 'primary' or class 'content')
-    main_content = soup.find('div', id='primary') or soup.find('main') or soup
-    
-    if not main_content:
-        main_content = soup
-    
-    # Strategy: Get ALL text from all relevant tags, including div, span, li, etc.
-    # This ensures we capture everything including course descriptions not in p tags
-    relevant_tags = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div', 'span', 'li', 'td', 'th', 'strong', 'em', 'b', 'i']
-    
-    # Get all text-containing elements
-    seen_texts = set()  # Avoid duplicates
-    
-    for tag in main_content.find_all(relevant_tags):
-        # Get direct text from this tag (not from children)
-        direct_text = tag.find(text=True, recursive=False)
-        if direct_text:
-            text = direct_text.strip()
-            if text and len(text) > 3 and text not in seen_texts:
-                text_parts.append(text)
-                seen_texts.add(text)
-        
-        # Also get complete text from certain important tags
-        if tag.name in ['h1', 'h2', 'h3', 'h4', 'p', 'li']:
-            full_text = tag.get_text(strip=True)
-            if full_text and len(full_text) > 5 and full_text not in seen_texts:
-                text_parts.append(full_text)
-                seen_texts.add(full_text)
-    
-    # Also capture any standalone text nodes not in tags
-    for text_node in main_content.find_all(text=True):
-        text = text_node.strip()
-        if text and len(text) > 10 and text not in seen_texts:
-            # Skip script and style content
-            parent = text_node.parent
-            if parent and parent.name not in ['script', 'style', 'noscript', 'meta', 'link']:
-                text_parts.append(text)
-                seen_texts.add(text)
-    
-    # Join all text parts with newlines
-    description = '\n\n'.join(text_parts)
-    
-    return description.strip()
-
-def find_postcode_in_section(soup: BeautifulSoup) -> Optional[str]:
+def create_session(rate_controller: Optional[RateController] = None) -> HttpClient:
     """
-    Find postcode anywhere on the page - search thoroughly.
-    This is important for location data.
-    
-    Args:
-        soup: BeautifulSoup object of the page
-        
-    Returns:
-        Postcode string if found, None otherwise
+    Create the scraper's HTTP client (pooled keep-alive connections, retries,
+    per-host circuit breaking) with its User-Agent, reporting every response
+    and connection error to rate_controller and pacing retries by it (or by
+    RATE_LIMIT_DELAY without one)
     """
-    # Strategy 1: Look in common sections first
-    priority_sections = []
-    
-    # Find headings that might contain location info
-    for heading in soup.find_all(['h2', 'h3', 'h4']):
-        text = heading.get_text().lower()
-        if any(phrase in text for phrase in [
-            'getting there', 'by road', 'by car', 'driving', 'on foot',
-            'location', 'address', 'directions', 'how to find', 'parking'
-        ]):
-            priority_sections.append(heading)
-    
-    # Search priority sections first
-    for section in priority_sections:
-        # Get the heading and next few siblings
-        search_text = section.get_text() + " "
-        current = section
-        for _ in range(10):  # Check next 10 elements
-            current = current.find_next_sibling()
-            if current:
-                search_text += " " + current.get_text()
-            else:
-                break
-        
-        # Search for UK postcode pattern
-        match = UK_POSTCODE_PATTERN.search(search_text)
-        if match:
-            postcode = f"{match.group(1).upper()} {match.group(2).upper()}"
-            return postcode
-    
-    # Strategy 2: Search the entire page text if not found in priority sections
-    full_text = soup.get_text()
-    
-    # Find ALL postcode matches on the page
-    all_matches = UK_POSTCODE_PATTERN.findall(full_text)
-    
-    if all_matches:
-        # Take the first match (usually the most relevant)
-        first_match = all_matches[0]
-        postcode = f"{first_match[0].upper()} {first_match[1].upper()}"
-        return postcode
-    
-    return None
+    if rate_controller is not None:
+        session = HttpClient(headers={'User-Agent': USER_AGENT}, timeout=REQUEST_TIMEOUT,
+                             throttle=rate_controller.wait)
+    else:
+        session = HttpClient(headers={'User-Agent': USER_AGENT}, timeout=REQUEST_TIMEOUT,
+                             min_delay=RATE_LIMIT_DELAY)
+    if rate_controller is not None:
+        session.hooks['response'].append(rate_controller.observe_response)
+        session.hooks['error'].append(rate_controller.observe_error)
+    return session
 
-def scrape_course_page(url: str) -> tuple[Optional[str], Optional[str]]:
+def scrape_course_page(url: str, session: Optional[HttpClient] = None,
+                       cache: Optional[ResponseCache] = None, offline: bool = False,
+                       parser: str = DEFAULT_PARSER, country_code: Optional[int] = None,
+                       archive: Optional[PageArchive] = None) -> tuple[Optional[str], Optional[str]]:
     """
     Scrape a single parkrun course page.
     
     Args:
         url: The course page URL
+        session: HTTP client to reuse (a new one is created if not given)
+        cache: Optional on-disk response cache
+        offline: Only read pages from the cache (no network)
+        parser: HTML parser backend (see course_page.PARSER_BACKENDS)
+        country_code: Bronze countryCode of the event (selects the postcode format)
+        archive: Optional raw page archive (offline without a cache: read pages from it)
         
     Returns:
         Tuple of (description, postcode) - either can be None if not found
     """
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        page = fetch_course_page(url, session or create_session(), timeout=REQUEST_TIMEOUT,
+                                 cache=cache, offline=offline, parser=parser, country_code=country_code,
+                                 archive=archive)
         
-        # Extract description
-        description = extract_text_content(soup)
+        # Extract description and postcode from a single parse of the page
+        fields = extract_fields(page, ['description', 'postcode'])
         
-        # Find postcode
-        postcode = find_postcode_in_section(soup)
-        
-        return description, postcode
+        return fields['description'], fields['postcode']
         
     except requests.RequestException as e:
         print(f"  ⚠️  Error fetching {url}: {str(e)}")
@@ -184,78 +118,75 @@ def scrape_course_page(url: str) -> tuple[Optional[str], Optional[str]]:
         print(f"  ⚠️  Error parsing {url}: {str(e)}")
         return None, None
 
-def create_detail_json(silver_data: Dict) -> Dict:
+def build_detail_record(event: Dict, description: Optional[str], postcode: Optional[str]) -> Dict:
     """
-    Create the parkrun_detail.json structure by scraping course pages.
+    Build one parkrun_detail.json event from a silver event and its scraped fields.
     
     Args:
-        silver_data: The loaded silver_data.json data
+        event: The silver event (uid, name, slug, countryCode, coursePageUrl)
+        description: Scraped description, None if scraping failed
+        postcode: Postcode found on the page, if any
         
     Returns:
-        Dictionary ready to be saved as parkrun_detail.json
+        Detail event dictionary
     """
-    events = silver_data.get('events', [])
-    total_events = len(events)
+    course_url = event.get('coursePageUrl')
     
-    print(f"\n📊 Starting to scrape {total_events} parkrun course pages...")
-    print(f"⏱️  Estimated time: ~{(total_events * RATE_LIMIT_DELAY) / 60:.1f} minutes")
-    print(f"🤝 Using respectful rate limiting ({RATE_LIMIT_DELAY}s between requests)\n")
+    detail = {
+        'uid': event.get('uid'),
+        'name': event.get('name'),
+        'slug': event.get('slug'),
+        'countryCode': event.get('countryCode'),
+        'coursePageUrl': course_url,
+        'description': None,
+        'postcode': None,
+        'scrapingStatus': 'pending',
+        'scrapedAt': None,
+        'contentHash': None
+    }
     
-    detail_events = []
-    success_count = 0
-    postcode_found_count = 0
+    if not course_url:
+        detail['scrapingStatus'] = 'no_url'
+    elif description:
+        detail['description'] = description
+        detail['scrapingStatus'] = 'success'
+        detail['scrapedAt'] = datetime.now().isoformat()
+        detail['contentHash'] = content_hash(description)
+        if postcode:
+            detail['postcode'] = postcode
+    else:
+        detail['scrapingStatus'] = 'failed'
     
-    for idx, event in enumerate(events, 1):
-        uid = event.get('uid')
-        name = event.get('name')
-        slug = event.get('slug')
-        course_url = event.get('coursePageUrl')
-        
-        print(f"[{idx}/{total_events}] {name} ({slug})...")
-        
-        # Create base detail object
-        detail = {
-            'uid': uid,
-            'name': name,
-            'slug': slug,
-            'coursePageUrl': course_url,
-            'description': None,
-            'postcode': None,
-            'scrapingStatus': 'pending',
-            'scrapedAt': None
-        }
-        
-        # Scrape if URL exists
-        if course_url:
-            description, postcode = scrape_course_page(course_url)
-            
-            if description:
-                detail['description'] = description
-                detail['scrapingStatus'] = 'success'
-                detail['scrapedAt'] = datetime.now().isoformat()
-                success_count += 1
-                
-                if postcode:
-                    detail['postcode'] = postcode
-                    postcode_found_count += 1
-                    print(f"  ✅ Scraped successfully (postcode: {postcode})")
-                else:
-                    print(f"  ✅ Scraped successfully (no postcode found)")
-            else:
-                detail['scrapingStatus'] = 'failed'
-                print(f"  ❌ Scraping failed")
+    return detail
+
+def print_detail_status(detail: Dict):
+    """Print the one-line outcome for a scraped event"""
+    status = detail['scrapingStatus']
+    if status == 'success':
+        if detail['postcode']:
+            print(f"  ✅ Scraped successfully (postcode: {detail['postcode']})")
         else:
-            detail['scrapingStatus'] = 'no_url'
-            print(f"  ⚠️  No course URL available")
-        
-        detail_events.append(detail)
+            print(f"  ✅ Scraped successfully (no postcode found)")
+    elif status == 'failed':
+        print(f"  ❌ Scraping failed")
+    elif status == 'no_url':
+        print(f"  ⚠️  No course URL available")
+
+def build_detail_output(detail_events: List[Dict]) -> Dict:
+    """
+    Wrap detail events in the parkrun_detail.json structure.
+    
+    Args:
+        detail_events: Detail event dictionaries (see build_detail_record)
         
-        # Rate limiting - be respectful to parkrun servers
-        if idx < total_events:  # Don't wait after the last request
-            time.sleep(RATE_LIMIT_DELAY)
+    Returns:
+        Dictionary ready to be saved as parkrun_detail.json
+    """
+    total_events = len(detail_events)
+    success_count = sum(1 for e in detail_events if e['scrapingStatus'] == 'success')
+    postcode_found_count = sum(1 for e in detail_events if e['scrapingStatus'] == 'success' and e['postcode'])
     
-    # Create output structure
-    output = {
+    return {
         'metadata': {
             'version': '1.0',
             'created': datetime.now().isoformat(),
@@ -271,35 +202,346 @@ def create_detail_json(silver_data: Dict) -> Dict:
                 'uid': 'Unique identifier from silver data',
                 'name': 'Full event name',
                 'slug': 'URL slug',
+                'countryCode': 'Numeric country code (from silver; selects the description markers)',
                 'coursePageUrl': 'Parkrun course description page URL',
                 'description': 'Full course description text from h2, h3, p tags',
                 'postcode': 'Postcode from getting there by road section (UK events)',
                 'scrapingStatus': 'Status: success, failed, no_url, pending',
-                'scrapedAt': 'ISO timestamp of when page was scraped'
+                'scrapedAt': 'ISO timestamp of when page was scraped',
+                'contentHash': 'blake2b hash of the description (change detection)',
+                'firstScrapedAt': 'ISO timestamp of the first successful scrape',
+                'checkCount': 'Number of successful scrapes of the page',
+                'changeCount': 'Number of scrapes that found a changed description',
+                'lastChangedAt': 'ISO timestamp of the scrape that last found a change',
+                'lastFailedAt': 'ISO timestamp of the last failed refresh (previous content kept)'
             }
         },
         'events': detail_events
     }
+
+def scrape_events_pipelined(events: List[Dict], cache: Optional[ResponseCache] = None, offline: bool = False,
+                            journal: Optional[ScrapeJournal] = None, parse_workers: int = 4,
+                            queue_size: int = PAGE_QUEUE_SIZE, parser: str = DEFAULT_PARSER,
+                            rate_controller: Optional[RateController] = None,
+                            archive: Optional[PageArchive] = None) -> Dict[str, Dict]:
+    """
+    Scrape events with network fetching and HTML parsing overlapped.
+    
+    Fetcher threads (one per host, paced by rate_controller, or RATE_LIMIT_DELAY
+    between requests to the same host without one) put raw pages on a bounded queue. The main thread hands them to
+    a ProcessPoolExecutor of parser workers, which return description and
+    postcode, so parsing uses all cores while the network stays busy.
     
-    return output
+    Args:
+        events: Silver events to scrape
+        cache: Optional on-disk response cache
+        offline: Cache-only mode
+        journal: Optional JSONL journal; every finished event is appended to it
+        parse_workers: Number of parser processes
+        queue_size: Max downloaded pages waiting for a parser (back-pressure on fetchers)
+        parser: HTML parser backend used by the parser processes
+        rate_controller: Adaptive per-host pacing (None: fixed RATE_LIMIT_DELAY)
+        archive: Optional raw page archive
+        
+    Returns:
+        Dictionary of slug -> detail record
+    """
+    page_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    session = create_session(rate_controller)  # Shared by the fetcher threads
+    finished = object()  # Sentinel: all fetchers are done
+    total_events = len(events)
+    
+    def fetch(event: Dict):
+        url = event.get('coursePageUrl')
+        page = None
+        if url:
+            try:
+                page = fetch_course_page(url, session, timeout=REQUEST_TIMEOUT, cache=cache, offline=offline,
+                                         archive=archive)
+            except requests.RequestException as e:
+                print(f"  ⚠️  Error fetching {url}: {str(e)}")
+            except Exception as e:
+                # Anything else (cache/archive I/O, ...) must not kill this host's
+                # worker or leave the event out of the queue
+                print(f"  ⚠️  Error fetching {url}: {type(e).__name__}: {str(e)}")
+        page_queue.put((event, page))  # Blocks while the parsers are behind
+    
+    def run_fetchers():
+        try:
+            run_per_host(events, key=lambda e: host_key(e.get('coursePageUrl') or ''), handle=fetch,
+                         delay=0 if offline else RATE_LIMIT_DELAY,
+                         throttle=rate_controller.wait if rate_controller is not None else None)
+        finally:
+            page_queue.put(finished)
+    
+    fetcher_thread = threading.Thread(target=run_fetchers, name='fetchers', daemon=True)
+    fetcher_thread.start()
+    
+    results: Dict[str, Dict] = {}
+    
+    def finish(event: Dict, description: Optional[str], postcode: Optional[str]):
+        detail = build_detail_record(event, description, postcode)
+        results[event.get('slug')] = detail
+        print(f"[{len(results)}/{total_events}] {event.get('name')} ({event.get('slug')})...")
+        print_detail_status(detail)
+        if journal is not None:
+            journal.append(detail)
+    
+    in_flight = {}
+    fetching = True
+    
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        while fetching or in_flight:
+            # Keep every parser busy, but don't pull more pages than we can parse
+            while fetching and len(in_flight) < parse_workers * 2:
+                try:
+                    item = page_queue.get(timeout=0.05 if in_flight else None)
+                except queue.Empty:
+                    break
+                if item is finished:
+                    fetching = False
+                    break
+                event, page = item
+                if page is None:
+                    finish(event, None, None)
+                    continue
+                future = pool.submit(extract_page_fields, page.url, page.content, '',
+                                     ['description', 'postcode'], parser, event.get('countryCode'))
+                in_flight[future] = event
+            
+            if not in_flight:
+                continue
+            
+            completed, _ = wait(in_flight, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in completed:
+                event = in_flight.pop(future)
+                try:
+                    fields = future.result()
+                    finish(event, fields['description'], fields['postcode'])
+                except Exception as e:
+                    print(f"  ⚠️  Error parsing {event.get('coursePageUrl')}: {str(e)}")
+                    finish(event, None, None)
+    
+    fetcher_thread.join()
+    return results
+
+def create_detail_json(silver_data: Dict, cache: Optional[ResponseCache] = None, offline: bool = False,
+                       journal: Optional[ScrapeJournal] = None, resume: bool = False,
+                       parse_workers: int = 0, parser: str = DEFAULT_PARSER,
+                       rate_controller: Optional[RateController] = None,
+                       archive: Optional[PageArchive] = None) -> Dict:
+    """
+    Create the parkrun_detail.json structure by scraping course pages.
+    
+    Args:
+        silver_data: The loaded silver_data.json data
+        cache: Optional on-disk response cache (unchanged pages come back as 304s)
+        offline: Cache-only mode - re-run extraction without any network requests
+        journal: Optional JSONL journal; every finished event is appended to it
+        resume: Skip events already in the journal instead of starting over
+        parse_workers: If > 0, fetch per host in threads and parse in this many
+                       worker processes (see scrape_events_pipelined)
+        parser: HTML parser backend (see course_page.PARSER_BACKENDS)
+        rate_controller: Adaptive per-host pacing (default: one with RATE_LIMIT_DELAY
+                         as the minimum delay; not used offline)
+        archive: Optional raw page archive every fetched page is appended to
+                 (offline without a cache: pages are read from it instead)
+        
+    Returns:
+        Dictionary ready to be saved as parkrun_detail.json
+    """
+    events = silver_data.get('events', [])
+    if offline:
+        rate_controller = None
+    elif rate_controller is None:
+        rate_controller = RateController(min_delay=RATE_LIMIT_DELAY)
+    total_events = len(events)
+    
+    done = {}
+    if journal is not None:
+        if resume:
+            done = journal.load()
+            print(f"\n♻️  Resuming: {len(done)} events already in {journal.path}")
+        else:
+            journal.reset()
+    
+    print(f"\n📊 Starting to scrape {total_events - len(done)} parkrun course pages...")
+    if offline:
+        source = "local cache" if cache is not None else "page archive"
+        print(f"📦 Offline mode: reading pages from the {source}, no network requests\n")
+    else:
+        print(f"⏱️  Estimated time: ~{((total_events - len(done)) / rate_controller.max_rate) / 60:.1f} minutes")
+        print(f"🤝 Using respectful adaptive rate limiting (at least {1 / rate_controller.max_rate:.1f}s between "
+              f"requests to one host, slower when a server struggles)\n")
+    
+    if parse_workers > 0:
+        pending = [event for event in events if event.get('slug') not in done]
+        print(f"🧵 Pipelined mode: per-host fetchers, {parse_workers} parser processes\n")
+        scraped = scrape_events_pipelined(pending, cache, offline, journal, parse_workers, parser=parser,
+                                          rate_controller=rate_controller, archive=archive)
+        detail_events = [done.get(event.get('slug')) or scraped[event.get('slug')] for event in events]
+        return build_detail_output(detail_events)
+    
+    detail_events = []
+    session = create_session(rate_controller)
+    
+    for idx, event in enumerate(events, 1):
+        course_url = event.get('coursePageUrl')
+        
+        if event.get('slug') in done:
+            detail_events.append(done[event['slug']])
+            continue
+        
+        print(f"[{idx}/{total_events}] {event.get('name')} ({event.get('slug')})...")
+        
+        # Rate limiting - be respectful to parkrun servers
+        if course_url and rate_controller is not None:
+            rate_controller.wait(host_key(course_url))
+        
+        # Scrape if URL exists
+        description, postcode = scrape_course_page(course_url, session, cache, offline, parser,
+                                                 event.get('countryCode'), archive) if course_url else (None, None)
+        
+        detail = build_detail_record(event, description, postcode)
+        print_detail_status(detail)
+        detail_events.append(detail)
+        if journal is not None:
+            journal.append(detail)
+    
+    return build_detail_output(detail_events)
+
+def compact_journal(silver_data: Dict, journal: ScrapeJournal) -> Dict:
+    """
+    Build the parkrun_detail.json structure from the journal alone (no scraping).
+    
+    Events are ordered as in silver_data.json; events missing from the journal are left out.
+    """
+    slugs = [event.get('slug') for event in silver_data.get('events', [])]
+    detail_events = journal.compact(slugs)
+    print(f"\n🗜️  Compacted {len(detail_events)}/{len(slugs)} events from {journal.path}")
+    return build_detail_output(detail_events)
 
-def save_detail_json(data: Dict):
+def merge_with_previous(events: List[Dict], scraped: Dict[str, Dict], previous: Dict[str, Dict]) -> List[Dict]:
+    """
+    Combine this run's records with the previous parkrun_detail.json.
+    
+    Events scraped this run get their change history updated (see
+    refresh_scheduler.with_change_history); events not scraped this run
+    keep their previous record, and events never scraped are left pending.
+    
+    Args:
+        events: All silver events, in output order
+        scraped: Records produced by this run, by slug
+        previous: Records of the previous parkrun_detail.json, by slug
+        
+    Returns:
+        Detail events in silver order
+    """
+    detail_events = []
+    for event in events:
+        slug = event.get('slug')
+        if slug in scraped:
+            detail_events.append(with_change_history(scraped[slug], previous.get(slug)))
+        elif slug in previous:
+            detail_events.append(previous[slug])
+        else:
+            detail = build_detail_record(event, None, None)
+            if detail['scrapingStatus'] == 'failed':
+                detail['scrapingStatus'] = 'pending'
+            detail_events.append(detail)
+    return detail_events
+
+def save_detail_json(data: Dict, filename: str = OUTPUT_FILE):
     """Save the detail data to JSON file"""
-    print(f"\n💾 Saving to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+    print(f"\n💾 Saving to {filename}...")
+    with open(filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
     print(f"✅ Saved successfully!")
 
 def main():
     """Main execution flow"""
+    parser = argparse.ArgumentParser(description="Scrape parkrun course pages into parkrun_detail.json")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE,
+                        help=f"On-disk response cache (default: {DEFAULT_CACHE_FILE})")
+    parser.add_argument('--no-cache', action='store_true', help="Don't read or write the response cache")
+    parser.add_argument('--cache-only', action='store_true',
+                        help="Offline mode: re-run extraction over cached pages, no network requests")
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_FILE,
+                        help=f"Raw course page archive (default: {DEFAULT_ARCHIVE_FILE})")
+    parser.add_argument('--no-archive', action='store_true', help="Don't archive fetched course pages")
+    parser.add_argument('--from-archive', action='store_true',
+                        help="Offline mode: re-run extraction over the archived pages, no network requests")
+    parser.add_argument('--journal', default=JOURNAL_FILE,
+                        help=f"Append-only progress journal (default: {JOURNAL_FILE})")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip events already in the journal (continue an interrupted run)")
+    parser.add_argument('--compact', action='store_true',
+                        help=f"Only merge the journal into {OUTPUT_FILE}, don't scrape")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="Overlap fetching and parsing: per-host fetcher threads feed N parser processes")
+    parser.add_argument('--parser', choices=available_parsers(), default=DEFAULT_PARSER,
+                        help=f"HTML parser backend (default: {DEFAULT_PARSER}; 'lxml' is faster)")
+    parser.add_argument('--min-delay', type=float, default=RATE_LIMIT_DELAY,
+                        help=f"Minimum seconds between requests to one host (default: {RATE_LIMIT_DELAY})")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Only re-scrape the pages most likely to have changed, keep the rest")
+    parser.add_argument('--refresh-budget', type=int, default=None,
+                        help=f"--refresh: maximum pages to request (default: {DEFAULT_REFRESH_BUDGET} "
+                             f"unless --refresh-time is given)")
+    parser.add_argument('--refresh-time', type=float, default=None,
+                        help="--refresh: fit the run into this many seconds at --min-delay per host")
+    args = parser.parse_args()
+    
     print("🏃 Parkrun Course Details Scraper")
     print("=" * 50)
     
     # Load silver data
     silver_data = load_silver_data()
     
-    # Create detail data by scraping
-    detail_data = create_detail_json(silver_data)
+    journal = ScrapeJournal(args.journal)
+    previous = load_previous_details(OUTPUT_FILE)
+    
+    if args.compact:
+        # Events missing from the journal (--refresh subsets, interrupted runs) keep their previous record
+        journalled = {e.get('slug'): e for e in compact_journal(silver_data, journal)['events']}
+        detail_data = build_detail_output(merge_with_previous(silver_data.get('events', []), journalled, previous))
+    else:
+        cache = None if args.no_cache or args.from_archive else ResponseCache(args.cache)
+        offline = args.from_archive or (args.cache_only and cache is not None)
+        archive = None if args.no_archive else PageArchive(args.archive)
+        rate_controller = RateController(min_delay=args.min_delay)
+        
+        events = silver_data.get('events', [])
+        to_scrape = silver_data
+        if args.refresh:
+            budget = args.refresh_budget
+            if budget is None and args.refresh_time is None:
+                budget = DEFAULT_REFRESH_BUDGET
+            selected = select_for_refresh(events, previous, budget=budget, time_budget=args.refresh_time,
+                                          min_delay=args.min_delay, per_host=args.parse_workers > 0)
+            print(f"\n🔄 Refresh: {len(selected)}/{len(events)} pages selected "
+                  f"({describe_selection(selected, previous)})")
+            to_scrape = {'events': selected}
+        
+        # Create detail data by scraping
+        detail_data = create_detail_json(to_scrape, cache=cache, offline=offline,
+                                         journal=journal, resume=args.resume, parse_workers=args.parse_workers,
+                                         parser=args.parser, rate_controller=rate_controller, archive=archive)
+        scraped = {e.get('slug'): e for e in detail_data['events']}
+        detail_data = build_detail_output(merge_with_previous(events, scraped, previous))
+        
+        if rate_controller.summary():
+            print(f"\n🚦 Rate control: {rate_controller.describe()}")
+        
+        if cache is not None:
+            print(f"\n📦 Cache: {cache.hits} served offline, {cache.revalidated} unchanged (304), {cache.misses} downloaded/missing")
+            cache.close()
+        
+        if archive is not None:
+            if not offline:
+                print(f"\n🗄️  Archive: {archive.appended} pages added, {archive.unchanged} unchanged "
+                      f"({len(archive)} in {archive.path})")
+            archive.close()
     
     # Save to file
     save_detail_json(detail_data)
@@ -313,7 +555,7 @@ def main():
     print(f"Successful scrapes: {summary['successful_scrapes']}")
     print(f"Postcodes found:    {summary['postcodes_found']}")
     print(f"Failed scrapes:     {summary['failed_scrapes']}")
-    print(f"Success rate:       {(summary['successful_scrapes'] / detail_data['metadata']['total_events'] * 100):.1f}%")
+    print(f"Success rate:       {(summary['successful_scrapes'] / max(detail_data['metadata']['total_events'], 1) * 100):.1f}%")
     print("=" * 50)
     print("\n✨ Done! You can now move on to the data analysis stage.\n")
 
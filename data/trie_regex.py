@@ -0,0 +1,66 @@
+"""
+Compile a list of literal phrases into one trie-shaped regular expression.
+
+A plain alternation ('phrase one|phrase two|...') makes the regex engine try
+every phrase in turn at every position, so its cost grows with the number of
+phrases. Merging the phrases into a prefix tree ('phrase (?:one|two)') means
+each position only follows the one branch that matches the next character,
+like walking an Aho-Corasick goto graph: the scan stays roughly linear in the
+text however many phrases there are.
+
+Where one phrase is a prefix of another the longer one is tried first, so a
+match at a position is always the longest phrase starting there.
+
+Usage:
+    pattern = re.compile(trie_pattern(['Course Map', 'Course Safety', 'Age Grading']))
+    pattern.findall(text)
+"""
+
+import re
+from typing import Dict, Iterable
+
+_END = ''  # Key marking that a phrase ends at a trie node
+
+
+def _build_trie(phrases: Iterable[str]) -> Dict:
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[_END] = {}
+    return trie
+
+
+def _node_pattern(node: Dict) -> str:
+    """Regex for the phrase suffixes below node."""
+    ends_here = _END in node
+    branches = []
+    for char in sorted(key for key in node if key != _END):
+        child = node[char]
+        # Follow single-child chains as one literal run (fewer groups to backtrack over)
+        run = re.escape(char)
+        while len(child) == 1 and _END not in child:
+            (char, child), = child.items()
+            run += re.escape(char)
+        branches.append(run + _node_pattern(child))
+
+    if not branches:
+        return ''
+    if len(branches) == 1 and not ends_here:
+        return branches[0]
+    group = '(?:' + '|'.join(branches) + ')'
+    return group + '?' if ends_here else group
+
+
+def trie_pattern(phrases: Iterable[str]) -> str:
+    """
+    Regex source matching any of phrases (literal, case-sensitive).
+
+    Raises:
+        ValueError: if phrases is empty or contains the empty string
+    """
+    phrases = set(phrases)
+    if not phrases or '' in phrases:
+        raise ValueError("trie_pattern needs at least one non-empty phrase")
+    return _node_pattern(_build_trie(phrases))